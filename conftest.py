@@ -0,0 +1,5 @@
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore += ["pyscaleio/aio.py", "tests/unit/test_aio.py"]
@@ -1,16 +1,19 @@
 from .client import ScaleIOSession, ScaleIOClient, inject  # noqa
 from .config import ScaleIOConfig
+from .inventory import Inventory
 from .manager import ScaleIOClientsManager
 from .models import (
     System, ProtectionDomain, StoragePool,
     VTree, Sdc, Volume
 )
+from .scheduler import priority  # noqa
+from .utils import deadline  # noqa
 
 __all__ = (
     ScaleIOSession.__name__, ScaleIOClient.__name__,
     System.__name__, ProtectionDomain.__name__,
     StoragePool.__name__, VTree.__name__, Sdc.__name__,
-    Volume.__name__
+    Volume.__name__, Inventory.__name__
 )
 
 __version__ = "0.1.7"
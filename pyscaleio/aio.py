@@ -0,0 +1,593 @@
+"""
+Asyncio client for ScaleIO.
+
+Requires Python 3.5+ and 'aiohttp' package.
+"""
+
+from __future__ import unicode_literals
+
+import asyncio
+import base64
+import logging
+import psys
+import time
+
+from six.moves.urllib.parse import urljoin
+
+from pyscaleio import codec as json_codec
+from pyscaleio import config
+from pyscaleio import exceptions
+from pyscaleio import retry
+from pyscaleio import tracing
+from pyscaleio import utils
+from pyscaleio.client import ScaleIOClient, __api_version__, inject
+from pyscaleio.client import _query_chunks, _query_results
+from pyscaleio.inventory import Inventory, RESOURCES, split_instances
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+log = logging.getLogger(__name__)
+"""Logger instance."""
+
+
+class AsyncScaleIOSession(object):
+    """ScaleIO asyncio session."""
+
+    __endpoint = "{scheme}://{host}/api/"
+    """Endpoint template."""
+
+    def __init__(self, host, user, passwd, is_secure=True,
+                 retries=None,
+                 timeout=None,
+                 connect_timeout=None,
+                 pool_maxsize=None, keep_alive=None,
+                 token_lifetime=None, token_idle_timeout=None,
+                 retry_policy=None, codec=None,
+                 compression=None):
+        if aiohttp is None:
+            raise psys.Error("AsyncScaleIOSession requires 'aiohttp' package.")
+
+        self.host = host
+        self.scheme = "https" if is_secure else "http"
+
+        self.user = user
+        self.passwd = passwd
+
+        self.timeout = config.NETWORK_TIMEOUT if timeout is None else timeout
+        self.connect_timeout = config.CONNECT_TIMEOUT \
+            if connect_timeout is None else connect_timeout
+        self.retries = config.REQUEST_RETRIES if retries is None else retries
+        self.retry_policy = retry_policy or retry.RetryPolicy(
+            retries=retries,
+            exceptions=retry.RETRY_EXCEPTIONS + (
+                aiohttp.ClientConnectionError, asyncio.TimeoutError),
+            connect_exceptions=retry.RETRY_CONNECT_EXCEPTIONS + (
+                aiohttp.ClientConnectorError,),
+        )
+
+        self.pool_maxsize = pool_maxsize or config.POOL_MAXSIZE
+        self.keep_alive = config.KEEP_ALIVE if keep_alive is None else keep_alive
+
+        self.codec = codec or json_codec.get_codec(config.JSON_CODEC)
+        self.__log = tracing.RequestLogger(log)
+
+        self.token = None
+        self.token_issued_at = None
+        self.token_used_at = None
+        self.token_lifetime = config.TOKEN_LIFETIME \
+            if token_lifetime is None else token_lifetime
+        self.token_idle_timeout = config.TOKEN_IDLE_TIMEOUT \
+            if token_idle_timeout is None else token_idle_timeout
+        self.__token_stats = {"logins": 0, "renewals": 0, "refreshes": 0}
+        self.__lock = None
+        if compression is None:
+            compression = config.COMPRESSION
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json; version={version}".format(
+                version=__api_version__
+            ),
+            "Accept-Encoding": "gzip, deflate" if compression else "identity",
+        }
+        self.__session = None
+
+    @property
+    def endpoint(self):
+        return self.__endpoint.format(
+            scheme=self.scheme, host=self.host)
+
+    @property
+    def token_stats(self):
+        """Returns counters of logins and token renewals."""
+
+        return dict(self.__token_stats)
+
+    @property
+    def retry_stats(self):
+        """Returns retry counters per API endpoint."""
+
+        return self.retry_policy.stats.as_dict()
+
+    def __token_expiring(self):
+        """Checks that token reached its lifetime or idle timeout."""
+
+        if self.token_issued_at is None:
+            return False
+
+        now = utils.monotonic()
+        if self.token_lifetime and now - self.token_issued_at >= self.token_lifetime:
+            return True
+        if self.token_idle_timeout and now - self.token_used_at >= self.token_idle_timeout:
+            return True
+
+        return False
+
+    def __get_session(self):
+        """Returns aiohttp session (created lazily inside event loop)."""
+
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                force_close=not self.keep_alive,
+                ssl=False)
+            self.__session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers)
+        return self.__session
+
+    def __deadline(self):
+        """Returns deadline of new request.
+
+        It is the nearest one of caller's deadline
+        (see utils.deadline) and deadline of retry policy.
+        """
+
+        deadline = utils.get_deadline()
+        if self.retry_policy.deadline:
+            own = utils.monotonic() + self.retry_policy.deadline
+            deadline = own if deadline is None else min(deadline, own)
+        return deadline
+
+    def __timeout(self, deadline=None, timeout=None):
+        """Returns timeout of request attempt bounded by deadline."""
+
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - utils.monotonic()
+            if remaining <= 0:
+                raise exceptions.ScaleIODeadlineExceeded()
+
+        return aiohttp.ClientTimeout(total=remaining,
+            connect=self.connect_timeout, sock_read=timeout or self.timeout)
+
+    @staticmethod
+    def __expired(deadline):
+        return deadline is not None and utils.monotonic() >= deadline
+
+    @staticmethod
+    def __auth(user, passwd):
+        credentials = psys.b("{0}:{1}".format(user, passwd))
+        return {"Authorization": "Basic " + psys.u(base64.b64encode(credentials))}
+
+    async def __refresh(self, stale_token=None, reason=None, deadline=None):
+        """Handle session expiring.
+
+        Only one coroutine logins again, other coroutines wait
+        for it and reuse the fresh token.
+        """
+
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+
+        async with self.__lock:
+            if self.token is None or self.token == stale_token:
+                self.token = None
+                await self.login(deadline=deadline)
+                if reason:
+                    self.__token_stats[reason] += 1
+            return self.token
+
+    def __error(self, response, payload, request_id):
+        """Handle request error."""
+
+        try:
+            error = self.__response(payload, request_id)
+        except exceptions.ScaleIOMalformedError:
+            raise exceptions.ScaleIOError(response.status, response.reason)
+
+        raise exceptions.ScaleIOError(error.get("httpStatusCode", response.status),
+                                      error.get("message"),
+                                      error.get("errorCode"))
+
+    def __response(self, payload, request_id, sensitive=False):
+        """Handle response payload."""
+
+        self.__log.response(request_id, payload, sensitive=sensitive)
+        try:
+            return self.codec.loads(payload)
+        except (ValueError, TypeError):
+            raise exceptions.ScaleIOMalformedError()
+
+    async def __retry(self, request_id, method, endpoint, attempt, deadline,
+                      status_code=None, exc=None):
+        """Waits before retry of failed request if it is allowed by policy."""
+
+        policy = self.retry_policy
+        if not policy.is_retryable(method, status_code=status_code, exc=exc):
+            return False
+
+        delay = policy.delay(endpoint, attempt, deadline)
+        if delay is None:
+            return False
+
+        self.__log.retry(request_id, endpoint, attempt, delay, exc or status_code)
+        await asyncio.sleep(delay)
+        return True
+
+    async def close(self):
+        """Closes underlying connections."""
+
+        if self.__session is not None:
+            await self.__session.close()
+        self.__session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def login(self, timeout=None, deadline=None):
+        """Logins to ScaleIO REST Gateway.
+
+        :param timeout: read timeout (optional)
+        :param deadline: monotonic time of deadline (optional),
+            by default deadline of caller's context is used
+        """
+
+        url = urljoin(self.endpoint, "login")
+
+        if deadline is None:
+            deadline = utils.get_deadline()
+
+        request_id = self.__log.login(url, self.user, timeout)
+
+        try:
+            async with self.__get_session().get(
+                url, headers=self.__auth(self.user, self.passwd),
+                allow_redirects=False, timeout=self.__timeout(deadline, timeout)
+            ) as response:
+                if response.status == 401:
+                    raise exceptions.ScaleIOAuthError()
+                response.raise_for_status()
+                payload = await response.read()
+        except asyncio.TimeoutError:
+            if self.__expired(deadline):
+                raise exceptions.ScaleIODeadlineExceeded()
+            raise
+
+        self.token = self.__response(payload, request_id, sensitive=True)
+        self.token_issued_at = self.token_used_at = utils.monotonic()
+        self.__token_stats["logins"] += 1
+
+    async def logout(self, timeout=None):
+        """Logout from ScaleIO REST Gateway and invalidates token."""
+
+        if self.__session and self.token:
+            async with self.__session.get(
+                urljoin(self.endpoint, "logout"),
+                headers=self.__auth(self.user, self.token),
+                allow_redirects=False,
+                timeout=self.__timeout(utils.get_deadline(), timeout)
+            ):
+                pass
+
+        self.token = None
+        self.token_issued_at = self.token_used_at = None
+
+    async def _send_request(self, method, path, params=None, data=None, headers=None):
+        """Base method for sending requests.
+
+        Login, all attempts and delays between them are bounded
+        by the deadline (see ScaleIOSession._send_request).
+        """
+
+        headers = headers or {}
+        policy = self.retry_policy
+        url = urljoin(self.endpoint, path)
+        endpoint = retry.endpoint_key(method, url)
+        deadline = self.__deadline()
+
+        token = self.token
+        if not token:
+            token = await self.__refresh(deadline=deadline)
+        elif self.__token_expiring():
+            token = await self.__refresh(token, reason="renewals", deadline=deadline)
+
+        request_id = self.__log.request(method, url, params, data)
+
+        policy.started(endpoint)
+
+        attempt = 0
+        while attempt < policy.retries:
+            attempt += 1
+            self.token_used_at = utils.monotonic()
+            try:
+                async with self.__get_session().request(
+                    method, url,
+                    params=params,
+                    data=data,
+                    headers=dict(headers, **self.__auth(self.user, token)),
+                    timeout=self.__timeout(deadline),
+                    allow_redirects=False,
+                ) as response:
+                    payload = await response.read()
+            except policy.exceptions as e:
+                if not await self.__retry(request_id, method, endpoint, attempt,
+                                          deadline, exc=e):
+                    if self.__expired(deadline):
+                        raise exceptions.ScaleIODeadlineExceeded()
+                    raise
+                continue
+
+            if response.status == 401:
+                token = await self.__refresh(token, reason="refreshes", deadline=deadline)
+            elif response.status >= 400:
+                if not await self.__retry(request_id, method, endpoint, attempt, deadline,
+                                          status_code=response.status):
+                    self.__error(response, payload, request_id)
+            else:
+                return self.__response(payload, request_id)
+
+    async def get(self, path, params=None):
+        return await self._send_request(method="get", path=path, params=params)
+
+    async def post(self, path, data):
+        return await self._send_request(method="post", path=path, data=data)
+
+
+class AsyncScaleIOClient(ScaleIOClient):
+    """Asyncio API Client for ScaleIO.
+
+    Model instances constructed with this client return awaitables
+    from 'perform' based methods (rename, resize, export, delete, etc.).
+    Other model methods send requests synchronously, so they have
+    counterparts in this module ('all', 'one', 'create', 'update',
+    'snapshot' and 'path').
+    """
+
+    __session_class__ = AsyncScaleIOSession
+    """Class of session that client works with."""
+
+    @property
+    def system(self):
+        if not self._system:
+            raise psys.Error("System is not loaded yet, use 'await client.get_system()'.")
+        return self._system
+
+    async def get_system(self):
+        """Returns System resource instance."""
+
+        from pyscaleio.models import System
+
+        if not self._system:
+            self._system = (await all(System, client=self))[0]
+        return self._system
+
+    async def close(self):
+        """Closes client session."""
+
+        await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_version(self):
+        """Returns ScaleIO REST API version."""
+
+        return await self._session.get("version")
+
+    async def get_all_instances(self):
+        """Returns all exists instances of all types."""
+
+        return await self._session.get("instances")
+
+    async def get_instances_of(self, resourse, params=None):
+        """Returns list of instances of specified resource."""
+
+        return utils._drop_none_results(await self._session.get(
+            "types/{type}/instances".format(type=resourse), params=params
+        ))
+
+    async def get_instance_of(self, resourse, resourse_id):
+        """Returns instance of specified resource type by id."""
+
+        return utils._drop_none_results(await self._session.get(
+            "instances/{type}::{id}".format(type=resourse, id=resourse_id)
+        ))
+
+    async def create_instance_of(self, resource, resource_data):
+        """Creates instance of specified resource."""
+
+        response = await self._session.post("types/{type}/instances".format(
+            type=resource), data=self._session.codec.dumps(resource_data)
+        )
+        return response["id"]
+
+    async def perform_action_on(self, resource, resource_id, action, action_data):
+        """Performs action on single instance of specified resource type."""
+
+        return await self._session.post("instances/{type}::{id}/action/{action}".format(
+            type=resource, id=resource_id, action=action),
+            data=self._session.codec.dumps(action_data)
+        )
+
+    async def perform_action_on_type(self, resource, action, action_data):
+        """Performs action on specified resource type."""
+
+        return utils._drop_none_results(await self._session.post(
+            "types/{type}/instances/action/{action}".format(
+                type=resource, action=action),
+            data=self._session.codec.dumps(action_data)
+        ))
+
+    async def query_instances_of(self, resource, instance_ids,
+                                 chunk_size=None, concurrency=None):
+        """Returns instances of specified resource by ids (in order of ids).
+
+        Ids are queried by chunks of 'chunk_size' with at most
+        'concurrency' requests in flight (see ScaleIOClient).
+        """
+
+        instance_ids, chunks = _query_chunks(instance_ids, chunk_size)
+        semaphore = asyncio.Semaphore(concurrency or config.QUERY_CONCURRENCY)
+
+        async def query(chunk):
+            async with semaphore:
+                try:
+                    return await self.perform_action_on_type(
+                        resource, "queryBySelectedIds", {"ids": chunk}), None
+                except Exception as e:
+                    return None, e
+
+        results = await asyncio.gather(*[query(chunk) for chunk in chunks])
+        return _query_results(resource, instance_ids, chunks, results)
+
+
+def _check_client(client):
+    """Checks that client is able to perform async requests."""
+
+    if not isinstance(client, AsyncScaleIOClient):
+        raise exceptions.ScaleIOInvalidClient()
+    return client
+
+
+@inject
+async def all(client, resource, instance_ids=None):
+    """Returns list of resource instances.
+
+    :param resource: resource model class
+    :param instance_ids: list of instance ids (optional)
+
+    :returns: list of resource instances
+    """
+
+    _check_client(client)
+
+    if not instance_ids:
+        instances = await client.get_instances_of(resource._get_name())
+    else:
+        instances = await client.query_instances_of(resource._get_name(), instance_ids)
+
+    return [resource(instance=instance, client=client)
+        for instance in instances
+    ]
+
+
+@inject
+async def inventory(client):
+    """Returns inventory (point-in-time view) of cluster resources."""
+
+    _check_client(client)
+
+    taken_at = time.time()
+    instances = split_instances(await client.get_all_instances())
+
+    missing = [resource._get_name() for resource in RESOURCES
+        if resource._get_name() not in instances]
+    results = await asyncio.gather(*[client.get_instances_of(name) for name in missing])
+    instances.update(zip(missing, results))
+
+    return Inventory(client, instances, taken_at)
+
+
+@inject
+async def one(client, resource, instance_id):
+    """Returns instance of resource.
+
+    :param resource: resource model class
+    :param instance_id: id of resource instance
+
+    :returns: instance of resource
+    """
+
+    _check_client(client)
+
+    instance = await client.get_instance_of(resource._get_name(), instance_id)
+    return resource(instance=instance, client=client)
+
+
+@inject
+async def create(client, resource, instance):
+    """Creates instance of resource.
+
+    :param resource: resource model class
+    :param instance: instance payload
+
+    :returns: instance of resource
+    """
+
+    _check_client(client)
+
+    instance_id = await client.create_instance_of(resource._get_name(), instance)
+    return await one(resource, instance_id, client=client)
+
+
+async def update(instance):
+    """Updates resource instance.
+
+    :param instance: instance of resource
+    """
+
+    client = _check_client(instance._client)
+
+    payload = await client.get_instance_of(instance._get_name(), instance["id"])
+    instance._update(payload)
+    return instance
+
+
+async def perform(instance, action, data):
+    """Performs action on resource instance.
+
+    :param instance: instance of resource
+    :param action: action name
+    :param data: action data payload
+    """
+
+    client = _check_client(instance._client)
+
+    return await client.perform_action_on(
+        instance._get_name(), instance["id"], action, data)
+
+
+async def snapshot(volume, name=None):
+    """Creates snapshot of volume.
+
+    :param volume: instance of volume
+    :param name: snapshot name (optional)
+
+    :returns: instance of snapshot volume
+    """
+
+    client = _check_client(volume._client)
+
+    system = await client.get_system()
+    result = await system.perform("snapshotVolumes", volume._snapshot_definition(name))
+    return await one(type(volume), result["volumeIdList"][0], client=client)
+
+
+async def path(volume):
+    """Returns path of volume device.
+
+    :param volume: instance of volume
+    """
+
+    client = _check_client(volume._client)
+
+    await client.get_system()
+    return volume.path
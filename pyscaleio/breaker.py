@@ -0,0 +1,105 @@
+from __future__ import unicode_literals
+
+import threading
+
+from pyscaleio import config
+from pyscaleio import utils
+
+
+CLOSED = "closed"
+"""Requests pass through the breaker."""
+
+OPEN = "open"
+"""Requests fail fast without touching the gateway."""
+
+HALF_OPEN = "half-open"
+"""Single trial request checks that the gateway has recovered."""
+
+
+class CircuitBreaker(object):
+    """Circuit breaker of REST Gateway.
+
+    Opens after 'failure_threshold' consecutive failures and becomes
+    half-open after 'recovery_timeout' seconds: the next request (or
+    a background probe) is a trial which closes the breaker on success
+    and opens it again on failure. Zero threshold disables the breaker.
+    Unspecified options are taken from config.
+    """
+
+    def __init__(self, failure_threshold=None, recovery_timeout=None):
+        self.failure_threshold = config.BREAKER_FAILURE_THRESHOLD \
+            if failure_threshold is None else failure_threshold
+        self.recovery_timeout = config.BREAKER_RECOVERY_TIMEOUT \
+            if recovery_timeout is None else recovery_timeout
+
+        self.__lock = threading.Lock()
+        self.__state = CLOSED
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_at = None
+        self.__stats = {"opened": 0, "rejected": 0}
+
+    def __current_state(self):
+        if self.__state == OPEN and \
+                utils.monotonic() >= self.__opened_at + self.recovery_timeout:
+            return HALF_OPEN
+        return self.__state
+
+    @property
+    def state(self):
+        with self.__lock:
+            return self.__current_state()
+
+    @property
+    def stats(self):
+        """Returns counters of breaker openings and rejected requests."""
+
+        with self.__lock:
+            return dict(self.__stats, state=self.__current_state())
+
+    def allow(self):
+        """Checks that request may be sent (takes the trial in half-open state)."""
+
+        with self.__lock:
+            state = self.__current_state()
+            if state == CLOSED:
+                return True
+
+            # Trial is taken once per recovery timeout, so a trial
+            # which never reported its result doesn't block the gateway.
+            now = utils.monotonic()
+            if state == HALF_OPEN and (
+                self.__trial_at is None or
+                now >= self.__trial_at + self.recovery_timeout
+            ):
+                self.__trial_at = now
+                return True
+
+            self.__stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self.__lock:
+            self.__state = CLOSED
+            self.__failures = 0
+            self.__opened_at = self.__trial_at = None
+
+    def record_failure(self):
+        """Accounts failure, returns True if the breaker has been opened."""
+
+        with self.__lock:
+            self.__failures += 1
+            if not self.failure_threshold:
+                return False
+
+            state = self.__current_state()
+            if state == HALF_OPEN or (
+                state == CLOSED and self.__failures >= self.failure_threshold
+            ):
+                self.__state = OPEN
+                self.__opened_at = utils.monotonic()
+                self.__trial_at = None
+                self.__stats["opened"] += 1
+                return True
+
+            return False
@@ -0,0 +1,146 @@
+from __future__ import unicode_literals
+
+import collections
+import threading
+
+from pyscaleio import codec as json_codec
+from pyscaleio import config
+from pyscaleio import utils
+
+
+INSTANCES = "instances"
+"""Cache key kind of resource listings ('types/<type>/instances')."""
+
+INSTANCE = "instance"
+"""Cache key kind of single instances ('instances/<type>::<id>')."""
+
+
+class ResponseCache(object):
+    """LRU cache of REST Gateway responses with TTL per resource type.
+
+    Only types with positive TTL are cached. Responses are kept encoded,
+    so every hit returns a fresh copy (models modify validated data) and
+    the size of entries is known. Cache is bounded by number of entries
+    and by total size of encoded responses, least recently used entries
+    are evicted first. Unspecified options are taken from config.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, max_bytes=None, codec=None):
+        self.ttl = dict(config.RESPONSE_CACHE_TTL if ttl is None else ttl)
+        self.max_entries = max_entries or config.RESPONSE_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.RESPONSE_CACHE_MAX_BYTES
+        self.codec = codec or json_codec.get_codec(config.JSON_CODEC)
+
+        self.__lock = threading.Lock()
+        self.__entries = collections.OrderedDict()
+        self.__bytes = 0
+        self.__generations = collections.defaultdict(int)
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def stats(self):
+        """Returns counters of hits, misses, evictions and invalidations."""
+
+        with self.__lock:
+            return dict(self.__stats, entries=len(self.__entries), bytes=self.__bytes)
+
+    def cacheable(self, resource):
+        """Checks that responses of resource type are cached."""
+
+        return self.ttl.get(resource, 0) > 0
+
+    def generation(self, resource):
+        """Returns counter of invalidations of resource type.
+
+        Response is cached only if the counter didn't change since
+        its request was sent (so it can't overwrite invalidation).
+        """
+
+        with self.__lock:
+            return self.__generations[resource]
+
+    def __remove(self, key):
+        data, _ = self.__entries.pop(key)
+        self.__bytes -= len(data)
+
+    def get(self, resource, kind, key=None):
+        """Returns copy of cached response or None if it is missing or expired."""
+
+        if not self.cacheable(resource):
+            return None
+
+        entry_key = (resource, kind, key)
+        with self.__lock:
+            entry = self.__entries.get(entry_key)
+            if entry is not None and entry[1] <= utils.monotonic():
+                self.__remove(entry_key)
+                entry = None
+
+            if entry is None:
+                self.__stats["misses"] += 1
+                return None
+
+            # Move entry to the end of LRU order
+            del self.__entries[entry_key]
+            self.__entries[entry_key] = entry
+            self.__stats["hits"] += 1
+
+        return self.codec.loads(entry[0])
+
+    def put(self, resource, kind, key, response, generation=None):
+        """Caches response (responses larger than the cache are skipped).
+
+        Size of response is known only after it is encoded, so large
+        responses of cached types cost extra encoding even if skipped.
+
+        :param generation: result of generation() taken before request (optional)
+        """
+
+        if not self.cacheable(resource) or response is None:
+            return
+
+        data = self.codec.dumps(response)
+        if len(data) > self.max_bytes:
+            return
+
+        entry_key = (resource, kind, key)
+        with self.__lock:
+            if generation is not None and generation != self.__generations[resource]:
+                return
+            if entry_key in self.__entries:
+                self.__remove(entry_key)
+
+            self.__entries[entry_key] = (data, utils.monotonic() + self.ttl[resource])
+            self.__bytes += len(data)
+
+            while len(self.__entries) > self.max_entries or self.__bytes > self.max_bytes:
+                self.__remove(next(iter(self.__entries)))
+                self.__stats["evictions"] += 1
+
+    def invalidate(self, resource=None, instance_id=None):
+        """Drops cached listings of resource type and its instance.
+
+        :param resource: changed resource type (optional),
+            by default responses of all types are dropped
+        :param instance_id: id of changed instance (optional),
+            by default all instances of the type are dropped
+        """
+
+        with self.__lock:
+            # Every type with request in flight has its generation (see 'generation')
+            for name in ([resource] if resource is not None else list(self.__generations)):
+                self.__generations[name] += 1
+
+            keys = [key for key in self.__entries
+                if resource is None or (key[0] == resource and (
+                    key[1] == INSTANCES or instance_id is None or key[2] == instance_id))]
+            for key in keys:
+                self.__remove(key)
+            self.__stats["invalidations"] += len(keys)
+
+    def clear(self):
+        """Drops all cached responses."""
+
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+import json
+import threading
+import time
+
+import psys
+
+from requests.adapters import BaseAdapter
+from six.moves.urllib.parse import urlparse
+
+from pyscaleio import exceptions
+from pyscaleio import utils
+from pyscaleio.transport import PoolStats, ScaleIOAdapter, _build_response
+
+
+SCRUBBED_TOKEN = "<scrubbed-token>"
+"""Placeholder of token in recorded login responses."""
+
+RECORDED_HEADERS = frozenset(["content-type"])
+"""Response headers kept in cassette."""
+
+
+def _request_path(url):
+    parsed = urlparse(url)
+    return parsed.path + ("?" + parsed.query if parsed.query else "")
+
+
+def _request_body(request):
+    if request.body is None:
+        return None
+    return psys.u(request.body)
+
+
+def scrub(interaction):
+    """Removes credentials and tokens from recorded interaction.
+
+    Requests are recorded without headers (so without credentials),
+    token is replaced in responses of login requests.
+    """
+
+    if interaction["path"].rstrip("/").endswith("/login"):
+        interaction["body"] = json.dumps(SCRUBBED_TOKEN)
+    return interaction
+
+
+class Cassette(object):
+    """Recorded interactions with REST Gateway."""
+
+    def __init__(self, interactions=None):
+        self.interactions = list(interactions or [])
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)["interactions"])
+
+    def save(self, path):
+        with self.__lock:
+            interactions = list(self.interactions)
+        with open(path, "w") as f:
+            json.dump({"version": 1, "interactions": interactions}, f, indent=1)
+
+    def append(self, interaction):
+        with self.__lock:
+            self.interactions.append(interaction)
+
+
+class RecordingAdapter(ScaleIOAdapter):
+    """Transport adapter that records traffic of session to cassette.
+
+    Interactions are passed through 'scrub' function before they
+    are stored (custom function may remove other sensitive data).
+    """
+
+    def __init__(self, cassette, scrub=scrub, **kwargs):
+        self.cassette = cassette
+        self.scrub = scrub
+        super(RecordingAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = utils.monotonic()
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        content = response.content
+        latency = utils.monotonic() - started
+
+        self.cassette.append(self.scrub({
+            "method": request.method,
+            "path": _request_path(request.url),
+            "request_body": _request_body(request),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": dict((name, value) for name, value in response.headers.items()
+                if name.lower() in RECORDED_HEADERS),
+            "body": content.decode(response.encoding or "utf-8"),
+            "latency": latency,
+        }))
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that serves responses from cassette.
+
+    Requests are matched by method, path (with query) and body, or by
+    method and path only. Responses recorded for the same request are
+    served in order and, with 'cycle', repeated from the beginning.
+
+    :param latency: False serves responses at full speed, True sleeps
+        for recorded latency, number scales recorded latency
+    """
+
+    def __init__(self, cassette, latency=False, cycle=True):
+        super(ReplayAdapter, self).__init__()
+        self.latency = float(latency)
+        self.cycle = cycle
+        self.stats = PoolStats()
+
+        self.__lock = threading.Lock()
+        self.__responses = {}
+        self.__positions = {}
+        for interaction in cassette.interactions:
+            method, path = interaction["method"], interaction["path"]
+            for key in ((method, path, interaction.get("request_body")), (method, path)):
+                self.__responses.setdefault(key, []).append(interaction)
+
+    def __next(self, request):
+        path = _request_path(request.url)
+        for key in ((request.method, path, _request_body(request)), (request.method, path)):
+            responses = self.__responses.get(key)
+            if not responses:
+                continue
+
+            with self.__lock:
+                position = self.__positions.get(key, 0)
+                if position >= len(responses):
+                    if not self.cycle:
+                        break
+                    position = 0
+                self.__positions[key] = position + 1
+            return responses[position]
+
+        raise exceptions.ScaleIOCassetteError(request.method, path)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self.stats.request_sent()
+        interaction = self.__next(request)
+
+        if self.latency:
+            time.sleep(interaction.get("latency", 0) * self.latency)
+
+        return _build_response(request, interaction["status"],
+            interaction["body"].encode("utf-8"), interaction.get("headers"),
+            reason=interaction.get("reason"), connection=self)
+
+    def close(self):
+        pass
@@ -1,19 +1,37 @@
 from __future__ import unicode_literals
 
-import json
+import codecs
+import collections
+import contextlib
+import copy
+import inspect
 import logging
 import psys
 import requests
-import uuid
+import threading
+import time
+import types
+import weakref
 
 from functools import wraps
-from six import text_type as str
+from six import string_types
 from six.moves.urllib.parse import urljoin
 
 import pyscaleio
+from pyscaleio import codec as json_codec
 from pyscaleio import config
 from pyscaleio import exceptions
+from pyscaleio import retry
+from pyscaleio import scheduler
+from pyscaleio import tracing
 from pyscaleio import utils
+from pyscaleio.breaker import CircuitBreaker, CLOSED
+from pyscaleio.cache import ResponseCache, INSTANCE, INSTANCES
+from pyscaleio.ratelimit import RateLimiter
+from pyscaleio.scheduler import RequestScheduler
+from pyscaleio.tokens import FileTokenStore
+from pyscaleio.transport import PoolStats, ScaleIOAdapter, _build_response  # noqa
+from pyscaleio.transport import RequestsTransport, TRANSPORTS
 
 try:
     from requests.packages import urllib3
@@ -29,83 +47,570 @@ __api_version__ = 2.0
 log = logging.getLogger(__name__)
 """Logger instance."""
 
+_iscoroutinefunction = getattr(inspect, "iscoroutinefunction", lambda function: False)
+"""Checks that function is a coroutine function (always False on Python 2)."""
 
-class ScaleIOSession(object):
-    """ScaleIO session base class."""
 
-    __session = None
-    """Session instance."""
+class _InflightRequest(object):
+    """GET request shared by coalesced callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class Gateway(object):
+    """REST Gateway of session with its own token and health statistics."""
 
     __endpoint = "{scheme}://{host}/api/"
     """Endpoint template."""
 
-    def __init__(self, host, user, passwd, is_secure=True,
-                 retries=config.REQUEST_RETRIES,
-                 timeout=config.NETWORK_TIMEOUT):
+    latency_decay = 0.3
+    """Weight of the last request in average latency."""
+
+    def __init__(self, host, scheme, breaker=None):
         self.host = host
+        self.endpoint = self.__endpoint.format(scheme=scheme, host=host)
+        self.breaker = breaker or CircuitBreaker()
+        self.probing = False
+
+        self.token = None
+        self.token_issued_at = None
+        self.token_used_at = None
+        self.lock = threading.Lock()
+
+        self.latency = None
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.down_until = None
+
+    @property
+    def healthy(self):
+        return self.down_until is None or utils.monotonic() >= self.down_until
+
+    def score(self):
+        """Returns sort key of gateway (the least is the healthiest)."""
+
+        return not self.healthy, self.failures, self.latency or 0
+
+    def succeeded(self, elapsed):
+        """Accounts successful request."""
+
+        self.requests += 1
+        self.recovered()
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += self.latency_decay * (elapsed - self.latency)
+
+    def failed(self, down_timeout):
+        """Accounts failed request and avoids gateway for 'down_timeout' seconds.
+
+        Returns True if circuit breaker of gateway has been opened.
+        """
+
+        self.requests += 1
+        self.errors += 1
+        self.failures += 1
+        self.down_until = utils.monotonic() + down_timeout
+        return self.breaker.record_failure()
+
+    def recovered(self):
+        """Marks gateway as working one."""
+
+        self.failures = 0
+        self.down_until = None
+        self.breaker.record_success()
+
+    def as_dict(self):
+        return {
+            "healthy": self.healthy,
+            "breaker": self.breaker.state,
+            "latency": self.latency,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class ScaleIOSession(object):
+    """ScaleIO session base class.
+
+    Session may work with several REST Gateways of the cluster:
+    reads are routed to the healthiest gateway, other requests
+    stick to the last working one, and failed requests fail over
+    to another gateway (with login to it) when allowed by retry policy.
+
+    Every gateway has circuit breaker: when it is open requests fail
+    fast with ScaleIOCircuitOpenError (if there is no other gateway)
+    and the gateway is probed for recovery in background.
+    """
+
+    __transport = None
+    """Transport instance."""
+
+    def __init__(self, host, user, passwd, is_secure=True,
+                 retries=None,
+                 timeout=None,
+                 connect_timeout=None,
+                 pool_connections=None, pool_maxsize=None,
+                 pool_block=None, keep_alive=None,
+                 token_lifetime=None, token_idle_timeout=None,
+                 retry_policy=None, codec=None,
+                 compression=None,
+                 gateway_down_timeout=None,
+                 breaker_failure_threshold=None,
+                 breaker_recovery_timeout=None,
+                 breaker_probe=None,
+                 coalesce=None,
+                 token_store=None, rate_limiter=None, scheduler=None,
+                 adapter=None, transport=None):
+        hosts = [host] if isinstance(host, string_types) else list(host)
+        if not hosts:
+            raise exceptions.ScaleIOInvalidParameters(
+                "At least one REST Gateway host must be specified.")
+
+        self.host = hosts[0]
+        self.hosts = tuple(hosts)
         self.scheme = "https" if is_secure else "http"
 
         self.user = user
         self.passwd = passwd
 
-        self.timeout = timeout
-        self.retries = retries
-
-        self.token = None
+        self.timeout = config.NETWORK_TIMEOUT if timeout is None else timeout
+        self.connect_timeout = config.CONNECT_TIMEOUT \
+            if connect_timeout is None else connect_timeout
+        self.retries = config.REQUEST_RETRIES if retries is None else retries
+        self.retry_policy = retry_policy or retry.RetryPolicy(retries=retries)
+
+        self.codec = codec or json_codec.get_codec(config.JSON_CODEC)
+        self.__log = tracing.RequestLogger(log)
+
+        self.__gateways = tuple(Gateway(h, self.scheme, CircuitBreaker(
+            failure_threshold=breaker_failure_threshold,
+            recovery_timeout=breaker_recovery_timeout)) for h in self.hosts)
+        self.__gateway = self.__gateways[0]
+        self.gateway_down_timeout = config.GATEWAY_DOWN_TIMEOUT \
+            if gateway_down_timeout is None else gateway_down_timeout
+        self.breaker_probe = config.BREAKER_PROBE if breaker_probe is None else breaker_probe
+        self.__probes_stop = threading.Event()
+
+        self.coalesce = config.COALESCE_REQUESTS if coalesce is None else coalesce
+        self.__inflight = {}
+        self.__inflight_lock = threading.Lock()
+        self.__coalesce_stats = {"requests": 0, "coalesced": 0}
+
+        self.token_lifetime = config.TOKEN_LIFETIME \
+            if token_lifetime is None else token_lifetime
+        self.token_idle_timeout = config.TOKEN_IDLE_TIMEOUT \
+            if token_idle_timeout is None else token_idle_timeout
+        self.__token_stats = {"logins": 0, "renewals": 0, "refreshes": 0, "restored": 0}
+        if token_store is None and config.TOKEN_STORE_PATH:
+            token_store = FileTokenStore(config.TOKEN_STORE_PATH)
+        self.token_store = token_store
+
+        if rate_limiter is None and (config.READ_RATE_LIMIT or config.ACTION_RATE_LIMIT):
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+
+        if scheduler is None and config.MAX_CONCURRENT_REQUESTS:
+            scheduler = RequestScheduler()
+        self.scheduler = scheduler
         self.headers = {
             "Content-Type": "application/json",
             "Accept": "application/json; version={version}".format(
                 version=__api_version__
             )
         }
-        self.__session = requests.Session()
-        self.__session.headers.update(self.headers)
+        if keep_alive is None:
+            keep_alive = config.KEEP_ALIVE
+        self.headers["Connection"] = "keep-alive" if keep_alive else "close"
+        if compression is None:
+            compression = config.COMPRESSION
+        self.headers["Accept-Encoding"] = "gzip, deflate" if compression else "identity"
+        self.__transfer_stats = utils.EndpointStats(
+            ("responses", "compressed", "compressed_bytes", "uncompressed_bytes"))
+
+        if transport is not None and adapter is not None:
+            raise exceptions.ScaleIONotBothParameters("transport", "adapter")
+
+        # Custom transport adapter of 'requests' (e.g. from pyscaleio.cassette)
+        # replaces the default one together with its connection pool options.
+        if adapter is not None:
+            transport = RequestsTransport(adapter)
+        elif transport is None:
+            transport = TRANSPORTS[config.TRANSPORT](
+                keep_alive=keep_alive,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+        self.__transport = transport
 
     @property
     def endpoint(self):
-        return self.__endpoint.format(
-            scheme=self.scheme, host=self.host)
+        """Endpoint of the current gateway."""
 
-    def __expired(self):
-        """Handle session expiring."""
+        return self.__gateway.endpoint
 
-        self.token = None
-        self.__session.auth = None
+    @property
+    def token(self):
+        """Token of the current gateway."""
+
+        return self.__gateway.token
+
+    @token.setter
+    def token(self, value):
+        self.__gateway.token = value
+
+    @property
+    def token_issued_at(self):
+        return self.__gateway.token_issued_at
+
+    @property
+    def token_used_at(self):
+        return self.__gateway.token_used_at
+
+    @property
+    def gateway_stats(self):
+        """Returns health statistics (and circuit breaker state) per gateway host."""
+
+        return dict((gateway.host, gateway.as_dict()) for gateway in self.__gateways)
+
+    @property
+    def pool_stats(self):
+        """Returns statistics of connection pool usage."""
+
+        return self.__transport.stats.as_dict()
+
+    @property
+    def token_stats(self):
+        """Returns counters of logins and token renewals.
+
+        'renewals' counts tokens renewed ahead of expiry,
+        'refreshes' counts tokens refreshed after 401 response,
+        'restored' counts tokens taken from token store instead of login.
+        """
+
+        return dict(self.__token_stats)
+
+    @property
+    def transfer_stats(self):
+        """Returns counters of transferred response bytes per API endpoint.
+
+        'compressed_bytes' counts bytes received from network,
+        'uncompressed_bytes' counts bytes of decoded content and
+        'compressed' counts responses with compressed content.
+        """
+
+        return self.__transfer_stats.as_dict()
+
+    @property
+    def coalesce_stats(self):
+        """Returns counters of sent GET requests and callers that joined them."""
 
-        self.login()
+        return dict(self.__coalesce_stats)
 
-    def __error(self, exc, request_uuid):
+    @property
+    def retry_stats(self):
+        """Returns retry counters per API endpoint."""
+
+        return self.retry_policy.stats.as_dict()
+
+    def __token_expiring(self, gateway):
+        """Checks that token reached its lifetime or idle timeout."""
+
+        if gateway.token_issued_at is None:
+            return False
+
+        now = utils.monotonic()
+        if self.token_lifetime and now - gateway.token_issued_at >= self.token_lifetime:
+            return True
+        if self.token_idle_timeout and now - gateway.token_used_at >= self.token_idle_timeout:
+            return True
+
+        return False
+
+    def __deadline(self):
+        """Returns deadline of new request.
+
+        It is the nearest one of caller's deadline
+        (see utils.deadline) and deadline of retry policy.
+        """
+
+        deadline = utils.get_deadline()
+        if self.retry_policy.deadline:
+            own = utils.monotonic() + self.retry_policy.deadline
+            deadline = own if deadline is None else min(deadline, own)
+        return deadline
+
+    def __timeout(self, deadline, timeout=None):
+        """Returns (connect, read) timeout of request attempt bounded by deadline."""
+
+        connect, read = self.connect_timeout, timeout or self.timeout
+        if deadline is None:
+            return connect, read
+
+        remaining = deadline - utils.monotonic()
+        if remaining <= 0:
+            raise exceptions.ScaleIODeadlineExceeded()
+        return min(connect, remaining), min(read, remaining)
+
+    @staticmethod
+    def __expired(deadline):
+        return deadline is not None and utils.monotonic() >= deadline
+
+    def __refresh(self, gateway, stale_token=None, reason=None, deadline=None):
+        """Handle session expiring.
+
+        Only one caller logins again, other callers wait
+        for it and reuse the fresh token.
+        """
+
+        with gateway.lock:
+            if gateway.token is None or gateway.token == stale_token:
+                gateway.token = None
+
+                if not self.__restore(gateway, stale_token):
+                    self.__login(gateway, deadline=deadline)
+                if reason:
+                    self.__token_stats[reason] += 1
+            return gateway.token
+
+    def __restore(self, gateway, stale_token=None):
+        """Takes valid token of gateway from token store."""
+
+        if self.token_store is None:
+            return False
+
+        try:
+            entry = self.token_store.load(gateway.host, self.user)
+            if entry and stale_token and entry.get("token") == stale_token:
+                self.token_store.delete(gateway.host, self.user, stale_token)
+                return False
+        except (IOError, OSError) as e:
+            log.warning("Token store is unavailable: %s", e)
+            return False
+
+        if not entry or not entry.get("token"):
+            return False
+
+        age = time.time() - entry.get("issued_at", 0)
+        if age < 0:
+            return False
+        for timeout in (self.token_lifetime, self.token_idle_timeout):
+            if timeout and age >= timeout:
+                return False
+
+        # Last usage of token is unknown, so idle timeout counts from login
+        gateway.token = entry["token"]
+        gateway.token_issued_at = gateway.token_used_at = utils.monotonic() - age
+        self.__token_stats["restored"] += 1
+        return True
+
+    def __token(self, gateway, deadline=None):
+        """Returns valid token of gateway (logins if needed)."""
+
+        token = gateway.token
+        if not token:
+            token = self.__refresh(gateway, deadline=deadline)
+        elif self.__token_expiring(gateway):
+            token = self.__refresh(gateway, token, reason="renewals", deadline=deadline)
+        return token
+
+    def __select(self, method, exclude=()):
+        """Selects gateway for request.
+
+        Reads go to the healthiest gateway, other requests stick
+        to the current gateway while it is healthy. Gateways with
+        open circuit breaker are skipped.
+        """
+
+        gateways = [g for g in self.__gateways if g not in exclude] or self.__gateways
+        candidates = sorted(gateways, key=Gateway.score)
+
+        current = self.__gateway
+        if method.lower() != "get" and current in gateways and current.healthy:
+            candidates.remove(current)
+            candidates.insert(0, current)
+
+        for gateway in candidates:
+            if gateway.breaker.allow():
+                self.__gateway = gateway
+                return gateway
+
+        raise exceptions.ScaleIOCircuitOpenError([g.host for g in gateways])
+
+    def __failed(self, gateway):
+        """Accounts failure of gateway and starts recovery probe if needed."""
+
+        if gateway.failed(self.gateway_down_timeout) and \
+                self.breaker_probe and not gateway.probing:
+            gateway.probing = True
+            # Probe doesn't keep session alive and stops with it
+            thread = threading.Thread(target=self.__probe,
+                args=(weakref.ref(self), gateway, self.__probes_stop))
+            thread.daemon = True
+            thread.start()
+
+    @staticmethod
+    def __probe(session_ref, gateway, stop):
+        """Probes gateway with open circuit breaker until it recovers.
+
+        Probe stops when session is closed, logged out or garbage collected.
+        """
+
+        breaker = gateway.breaker
+        try:
+            while breaker.state != CLOSED:
+                stop.wait(breaker.recovery_timeout)
+                session = session_ref()
+                if stop.is_set() or session is None:
+                    break
+
+                if breaker.allow():
+                    session.__probe_gateway(gateway)
+                del session
+        finally:
+            gateway.probing = False
+
+    def __probe_gateway(self, gateway):
+        """Sends probe request to gateway and accounts its result."""
+
+        try:
+            response = self.__transport.request("get",
+                urljoin(gateway.endpoint, "version"), headers=self.headers,
+                auth=(self.user, gateway.token or ""),
+                timeout=(self.connect_timeout, self.timeout))
+        except requests.RequestException:
+            gateway.failed(self.gateway_down_timeout)
+            return
+
+        response.close()
+        if response.status_code in self.retry_policy.status_codes:
+            gateway.failed(self.gateway_down_timeout)
+        else:
+            gateway.recovered()
+
+    def __stop_probes(self):
+        """Stops recovery probes of gateways started so far."""
+
+        self.__probes_stop.set()
+        self.__probes_stop = threading.Event()
+
+    def __error(self, exc, request_id):
         """Handle request error."""
 
-        error = self.__response(exc.response, request_uuid)
+        try:
+            error = self.__response(exc.response, request_id)
+        except exceptions.ScaleIOMalformedError:
+            raise exceptions.ScaleIOError(exc.response.status_code,
+                                          exc.response.reason)
+
         raise exceptions.ScaleIOError(error["httpStatusCode"],
                                       error["message"],
                                       error["errorCode"])
 
-    def __response(self, response, request_uuid):
+    def __retry(self, request_id, method, endpoint, attempt, deadline,
+                status_code=None, exc=None):
+        """Waits before retry of failed request if it is allowed by policy."""
+
+        policy = self.retry_policy
+        if not policy.is_retryable(method, status_code=status_code, exc=exc):
+            return False
+
+        delay = policy.delay(endpoint, attempt, deadline)
+        if delay is None:
+            return False
+
+        self.__log.retry(request_id, endpoint, attempt, delay, exc or status_code)
+        time.sleep(delay)
+        return True
+
+    def __transfer(self, endpoint, request_id, response, size):
+        """Accounts bytes transferred with response."""
+
+        raw = response.raw
+        if isinstance(raw, urllib3.response.HTTPResponse):
+            wire_size = raw.tell()
+        else:
+            wire_size = size
+
+        encoding = response.headers.get("Content-Encoding", "identity")
+
+        stats = self.__transfer_stats
+        stats.increment(endpoint, "responses")
+        stats.increment(endpoint, "compressed_bytes", wire_size)
+        stats.increment(endpoint, "uncompressed_bytes", size)
+        if encoding != "identity":
+            stats.increment(endpoint, "compressed")
+
+        self.__log.transfer(request_id, encoding, wire_size, size)
+
+    def __response(self, response, request_id, sensitive=False):
         """Handle response object."""
 
-        response_payload = response.text
+        self.__log.response(request_id, response.content, sensitive=sensitive)
+        try:
+            return self.codec.loads(response.content)
+        except (ValueError, TypeError):
+            raise exceptions.ScaleIOMalformedError()
+
+    def __iter_response(self, endpoint, response, request_id, deadline=None):
+        """Handle streamed response object with JSON array."""
+
+        self.__log.response(request_id, None)
+
+        size = [0]
+
+        def read():
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+            for chunk in response.iter_content(config.STREAM_CHUNK_SIZE):
+                if self.__expired(deadline):
+                    raise exceptions.ScaleIODeadlineExceeded()
+                size[0] += len(chunk)
+                yield decoder.decode(chunk)
 
-        log.debug("ScaleIO response (%s): %s", request_uuid, response_payload)
         try:
-            return json.loads(psys.u(response_payload))
+            for item in utils.iter_json_array(read()):
+                yield item
         except (ValueError, TypeError):
             raise exceptions.ScaleIOMalformedError()
+        finally:
+            self.__transfer(endpoint, request_id, response, size[0])
+            response.close()
+
+    def login(self, timeout=None, deadline=None):
+        """Logins to ScaleIO REST Gateway (the current one).
 
-    def login(self, timeout=None):
-        """Logins to ScaleIO REST Gateway."""
+        :param timeout: read timeout (optional)
+        :param deadline: monotonic time of deadline (optional),
+            by default deadline of caller's context is used
+        """
 
-        url = urljoin(self.endpoint, "login")
+        self.__login(self.__gateway, timeout, deadline)
+
+    def __login(self, gateway, timeout=None, deadline=None):
+        """Logins to specified REST Gateway."""
+
+        url = urljoin(gateway.endpoint, "login")
         auth = (self.user, self.passwd)
 
-        request_uuid = str(uuid.uuid4())
-        log.debug("ScaleIO login (%s): url=%s, auth=%s, timeout=%s",
-            request_uuid, url, auth, timeout)
+        if deadline is None:
+            deadline = utils.get_deadline()
+        timeout = self.__timeout(deadline, timeout)
+
+        request_id = self.__log.login(url, self.user, timeout)
 
-        response = self.__session.get(
-            url=url, auth=auth, allow_redirects=False,
-            verify=False, timeout=timeout or self.timeout)
+        try:
+            response = self.__transport.request("get", url,
+                headers=self.headers, auth=auth, timeout=timeout)
+        except requests.Timeout:
+            if self.__expired(deadline):
+                raise exceptions.ScaleIODeadlineExceeded()
+            raise
         try:
             response.raise_for_status()
         except requests.HTTPError as e:
@@ -114,69 +619,204 @@ class ScaleIOSession(object):
             else:
                 raise
 
-        self.token = self.__response(response, request_uuid)
-        self.__session.auth = (self.user, self.token)
+        gateway.token = self.__response(response, request_id, sensitive=True)
+        gateway.token_issued_at = gateway.token_used_at = utils.monotonic()
+        self.__token_stats["logins"] += 1
+
+        if self.token_store is not None:
+            try:
+                self.token_store.save(gateway.host, self.user, gateway.token)
+            except (IOError, OSError) as e:
+                log.warning("Token store is unavailable: %s", e)
 
     def logout(self, timeout=None):
-        """Logout from ScaleIO REST Gateway and invalidates token."""
+        """Logout from ScaleIO REST Gateways and invalidates tokens."""
 
-        if self.__session and self.token:
-            self.__session.get(
-                url=urljoin(self.endpoint, "logout"),
-                allow_redirects=False, verify=False,
-                timeout=timeout or self.timeout)
+        for gateway in self.__gateways:
+            if gateway.token:
+                self.__transport.request("get",
+                    urljoin(gateway.endpoint, "logout"), headers=self.headers,
+                    auth=(self.user, gateway.token),
+                    timeout=self.__timeout(utils.get_deadline(), timeout))
 
-        self.token = None
-        self.__session.auth = None
-
-    def _send_request(self, method, url, params=None, data=None, headers=None):
-        """Base method for sending requests."""
-
-        headers = headers or {}
-        retries = self.retries
-
-        if not self.token:
-            self.login()
-
-        request_uuid = str(uuid.uuid4())
-        log.debug("ScaleIO request (%s): method=%s, url=%s, params=%s, data=%s",
-            request_uuid, method, url, params, data)
-
-        response = None
-        while retries > 0:
-            response = self.__session.request(
-                method=method,
-                url=url,
-                params=params,
-                data=data,
-                timeout=self.timeout,
-                allow_redirects=False,
-                headers=headers,
-                verify=False,
-            )
+                if self.token_store is not None:
+                    try:
+                        self.token_store.delete(gateway.host, self.user, gateway.token)
+                    except (IOError, OSError) as e:
+                        log.warning("Token store is unavailable: %s", e)
+
+            gateway.token = None
+            gateway.token_issued_at = gateway.token_used_at = None
+
+        self.__stop_probes()
+
+    def close(self):
+        """Stops recovery probes of gateways and closes connections of transport."""
+
+        self.__stop_probes()
+        self.__transport.close()
+
+    def __failover(self, request_id, method, gateway):
+        """Selects another gateway for retry of failed request."""
+
+        target = self.__select(method, exclude=(gateway,))
+        if target is not gateway:
+            self.__log.failover(request_id, gateway.host, target.host)
+        return target
+
+    def _send_request(self, method, path, params=None, data=None, headers=None,
+                      stream=False):
+        """Base method for sending requests.
+
+        With 'stream' returns iterator of JSON array items
+        decoded incrementally from the response body.
+
+        Login, all attempts and delays between them are bounded
+        by the deadline, per attempt timeouts are clamped to the
+        remaining time (ScaleIODeadlineExceeded is raised when
+        it is over).
+
+        Retries go to another gateway (if there is a healthy one).
+        Every attempt waits for rate limiter and for slot
+        of request scheduler of session (if any).
+        """
+
+        headers = dict(self.headers, **headers) if headers else self.headers
+        policy = self.retry_policy
+        deadline = self.__deadline()
+
+        gateway = self.__select(method)
+        url = urljoin(gateway.endpoint, path)
+        endpoint = retry.endpoint_key(method, url)
+
+        request_id = self.__log.request(method, url, params, data)
+
+        policy.started(endpoint)
+
+        attempt = 0
+        while attempt < policy.retries:
+            attempt += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(method, deadline)
+
+            slot = None
+            if self.scheduler is not None:
+                slot = self.scheduler.acquire(deadline)
+
+            started = utils.monotonic()
             try:
-                response.raise_for_status()
+                # Slot is held during exchange with gateway only (not during backoff)
+                try:
+                    token = self.__token(gateway, deadline)
+                    gateway.token_used_at = utils.monotonic()
+
+                    response = self.__transport.request(
+                        method=method,
+                        url=urljoin(gateway.endpoint, path),
+                        params=params,
+                        data=data,
+                        headers=headers,
+                        auth=(self.user, token),
+                        timeout=self.__timeout(deadline),
+                        stream=stream,
+                    )
+                    response.raise_for_status()
+                finally:
+                    if slot is not None:
+                        self.scheduler.release(slot)
+            except policy.exceptions as e:
+                self.__failed(gateway)
+                if not self.__retry(request_id, method, endpoint, attempt, deadline, exc=e):
+                    if self.__expired(deadline):
+                        raise exceptions.ScaleIODeadlineExceeded()
+                    raise
+                gateway = self.__failover(request_id, method, gateway)
             except requests.HTTPError as e:
-                if e.response.status_code == 401:
-                    self.__expired()
-                    retries -= 1
-                    continue
+                status_code = e.response.status_code
+                if status_code in policy.status_codes:
+                    self.__failed(gateway)
                 else:
-                    self.__error(e, request_uuid)
-            else:
-                if not response:
-                    retries -= 1
-                    continue
+                    gateway.succeeded(utils.monotonic() - started)
+
+                if status_code == 401:
+                    e.response.close()
+                    self.__refresh(gateway, token, reason="refreshes", deadline=deadline)
+                elif not self.__retry(request_id, method, endpoint, attempt, deadline,
+                                      status_code=status_code):
+                    self.__error(e, request_id)
                 else:
-                    return self.__response(response, request_uuid)
+                    e.response.close()
+                    gateway = self.__failover(request_id, method, gateway)
+            else:
+                gateway.succeeded(utils.monotonic() - started)
+
+                if stream:
+                    return self.__iter_response(endpoint, response, request_id, deadline)
+
+                self.__transfer(endpoint, request_id, response, len(response.content))
+                return self.__response(response, request_id)
+
+    def __coalesced_get(self, path, params=None):
+        """Sends GET request or joins identical request in flight.
+
+        Callers that joined the request get deep copies of its result.
+        """
+
+        key = (path, repr(sorted(params.items())) if params else None)
+
+        with self.__inflight_lock:
+            call = self.__inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self.__inflight[key] = _InflightRequest()
+                self.__coalesce_stats["requests"] += 1
+            else:
+                call.waiters += 1
+                self.__coalesce_stats["coalesced"] += 1
+
+        if not leader:
+            deadline = utils.get_deadline()
+            timeout = None if deadline is None else max(deadline - utils.monotonic(), 0)
+            # Event.wait() returns None on Python 2.6, so the flag is checked
+            call.done.wait(timeout)
+            if not call.done.is_set():
+                raise exceptions.ScaleIODeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self._send_request(method="get", path=path, params=params)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.__inflight_lock:
+                del self.__inflight[key]
+                waiters = call.waiters
+            call.done.set()
+
+        return copy.deepcopy(call.result) if waiters else call.result
+
+    def get(self, path, params=None, stream=False, coalesce=None):
+        """Sends GET request.
+
+        :param stream: return iterator of JSON array items (optional)
+        :param coalesce: share response with identical concurrent requests
+            (optional), by default session 'coalesce' option is used
+        """
+
+        if coalesce is None:
+            coalesce = self.coalesce
+
+        if coalesce and not stream:
+            return self.__coalesced_get(path, params)
 
-    def get(self, path, params=None):
         return self._send_request(method="get",
-            url=urljoin(self.endpoint, path), params=params)
+            path=path, params=params, stream=stream)
 
     def post(self, path, data):
-        return self._send_request(method="post",
-            url=urljoin(self.endpoint, path), data=data)
+        return self._send_request(method="post", path=path, data=data)
 
 
 class ScaleIOClient(object):
@@ -185,23 +825,36 @@ class ScaleIOClient(object):
     _session = None
     """ScaleIO session instance."""
 
+    __session_class__ = ScaleIOSession
+    """Class of session that client works with."""
+
     @classmethod
     def from_args(cls, *args, **kwargs):
-        """Initialize from ScaleIOSession arguments."""
+        """Initialize from session arguments (and optional 'cache')."""
 
-        return cls(session=ScaleIOSession(*args, **kwargs))
+        cache = kwargs.pop("cache", None)
+        return cls(session=cls.__session_class__(*args, **kwargs), cache=cache)
 
-    def __init__(self, session):
-        if not isinstance(session, ScaleIOSession):
-            raise psys.Error(
-                "ScaleIOClient must be initialized with ScaleIOSession.")
+    def __init__(self, session, cache=None):
+        if not isinstance(session, self.__session_class__):
+            raise psys.Error("{0} must be initialized with {1}.",
+                type(self).__name__, self.__session_class__.__name__)
         self._session = session
         self._system = None
 
+        if cache is None and config.RESPONSE_CACHE_TTL:
+            cache = ResponseCache(codec=session.codec)
+        self.cache = cache
+
     @property
     def session(self):
         return self._session
 
+    def close(self):
+        """Closes client session."""
+
+        self._session.close()
+
     @property
     def system(self):
         from pyscaleio.models import System
@@ -220,45 +873,180 @@ class ScaleIOClient(object):
 
         return self._session.get("instances")
 
+    @property
+    def cache_stats(self):
+        """Returns counters of response cache (empty if cache is disabled)."""
+
+        return self.cache.stats if self.cache is not None else {}
+
+    def __cached(self, resource, kind, key):
+        """Returns (cached response, generation of resource type in cache)."""
+
+        if self.cache is None or not self.cache.cacheable(resource):
+            return None, None
+        return self.cache.get(resource, kind, key), self.cache.generation(resource)
+
+    def __invalidate(self):
+        """Drops cached responses of all types.
+
+        Actions change instances of other types too (e.g. 'snapshotVolumes'
+        of System creates volumes, 'removeVolume' changes storage pool),
+        so the whole cache is dropped.
+        """
+
+        if self.cache is not None:
+            self.cache.invalidate()
+
     @utils.drop_none
-    def get_instances_of(self, resourse, params=None):
-        """Returns list of instances of specified resource."""
+    def get_instances_of(self, resourse, params=None, stream=False):
+        """Returns list of instances of specified resource.
+
+        With 'stream' returns iterator of instances decoded
+        incrementally from the response (streamed responses aren't
+        cached, so memory stays bounded, but cached listing is used).
+        """
 
-        return self._session.get("types/{type}/instances".format(
-            type=resourse), params=params
+        key = repr(sorted(params.items())) if params else None
+        instances, generation = self.__cached(resourse, INSTANCES, key)
+        if instances is not None:
+            return (instance for instance in instances) if stream else instances
+
+        instances = self._session.get("types/{type}/instances".format(
+            type=resourse), params=params, stream=stream
         )
+        if generation is not None and not stream:
+            self.cache.put(resourse, INSTANCES, key, instances, generation)
+        return instances
 
     @utils.drop_none
     def get_instance_of(self, resourse, resourse_id):
         """Returns instance of specified resource type by id."""
 
-        return self._session.get("instances/{type}::{id}".format(
+        instance, generation = self.__cached(resourse, INSTANCE, resourse_id)
+        if instance is not None:
+            return instance
+
+        instance = self._session.get("instances/{type}::{id}".format(
             type=resourse, id=resourse_id)
         )
+        if generation is not None:
+            self.cache.put(resourse, INSTANCE, resourse_id, instance, generation)
+        return instance
+
+    @utils.drop_none
+    def get_related_instances_of(self, resource, resource_id, related):
+        """Returns instances of 'related' resource type related
+        to instance of specified resource (e.g. volumes of storage pool).
+        """
+
+        return self._session.get("instances/{type}::{id}/relationships/{related}".format(
+            type=resource, id=resource_id, related=related)
+        )
 
     def create_instance_of(self, resource, resource_data):
         """Creates instance of specified resource."""
 
-        response = self._session.post("types/{type}/instances".format(
-            type=resource), data=psys.u(json.dumps(resource_data))
-        )
+        try:
+            response = self._session.post("types/{type}/instances".format(
+                type=resource), data=self._session.codec.dumps(resource_data)
+            )
+        finally:
+            self.__invalidate()
         return response["id"]
 
     def perform_action_on(self, resource, resource_id, action, action_data):
         """Performs action on single instance of specified resource type."""
 
-        return self._session.post("instances/{type}::{id}/action/{action}".format(
-            type=resource, id=resource_id, action=action),
-            data=psys.u(json.dumps(action_data))
-        )
+        try:
+            return self._session.post("instances/{type}::{id}/action/{action}".format(
+                type=resource, id=resource_id, action=action),
+                data=self._session.codec.dumps(action_data)
+            )
+        finally:
+            self.__invalidate()
 
     @utils.drop_none
     def perform_action_on_type(self, resource, action, action_data):
-        """Performs action on specified resource type."""
+        """Performs action on specified resource type.
+
+        Actions other than queries (e.g. 'queryBySelectedIds')
+        invalidate cached responses.
+        """
+
+        try:
+            return self._session.post("types/{type}/instances/action/{action}".format(
+                type=resource, action=action), data=self._session.codec.dumps(action_data)
+            )
+        finally:
+            if not action.startswith("query"):
+                self.__invalidate()
+
+    def query_instances_of(self, resource, instance_ids, chunk_size=None, concurrency=None):
+        """Returns instances of specified resource by ids (in order of ids).
+
+        Ids are queried by chunks of 'chunk_size' with at most 'concurrency'
+        requests in flight (duplicated ids are requested once, but returned
+        for every occurrence). If some of chunks fail or some ids aren't
+        returned, ScaleIOQueryError with instances of succeeded chunks,
+        errors of failed ones and missing ids is raised.
+        """
+
+        instance_ids, chunks = _query_chunks(instance_ids, chunk_size)
+        results = utils.parallel_map(
+            lambda chunk: self.perform_action_on_type(
+                resource, "queryBySelectedIds", {"ids": chunk}),
+            chunks, concurrency or config.QUERY_CONCURRENCY)
+
+        return _query_results(resource, instance_ids, chunks, results)
 
-        return self._session.post("types/{type}/instances/action/{action}".format(
-            type=resource, action=action), data=psys.u(json.dumps(action_data))
-        )
+
+def _query_chunks(instance_ids, chunk_size=None):
+    """
+    Splits ids to chunks of 'queryBySelectedIds' requests
+    (duplicated ids are requested once).
+    Attention: for internal use only!
+
+    :returns: tuple of (list of requested ids, list of chunks)
+    """
+
+    if isinstance(instance_ids, string_types):
+        instance_ids = (instance_ids,)
+    instance_ids = list(instance_ids)
+    unique_ids = list(collections.OrderedDict.fromkeys(instance_ids))
+
+    chunk_size = chunk_size or config.QUERY_CHUNK_SIZE
+    return instance_ids, [unique_ids[index:index + chunk_size]
+        for index in range(0, len(unique_ids), chunk_size)]
+
+
+def _query_results(resource, instance_ids, chunks, results):
+    """
+    Merges results of chunks in order of requested ids (one instance per id),
+    raises error of failed chunks or of ids missing in responses.
+    Attention: for internal use only!
+    """
+
+    by_id, errors, missing_ids = {}, [], []
+    for chunk, (result, error) in zip(chunks, results):
+        if error is not None:
+            errors.append((chunk, error))
+            continue
+
+        returned = dict((instance["id"], instance) for instance in result)
+        for instance_id in chunk:
+            if instance_id in returned:
+                by_id[instance_id] = returned[instance_id]
+            else:
+                missing_ids.append(instance_id)
+
+    instances = [by_id[instance_id] for instance_id in instance_ids if instance_id in by_id]
+
+    if len(errors) == 1 and len(chunks) == 1:
+        raise errors[0][1]
+    if errors or missing_ids:
+        raise exceptions.ScaleIOQueryError(
+            resource, instances, errors, len(chunks), missing_ids)
+    return instances
 
 
 def _get_client(kwargs):
@@ -284,10 +1072,39 @@ def inject(function):
     """
     Decorates and injects ScaleIOClient instance
     into decorated method or function.
+
+    Optional 'deadline' argument (in seconds) limits total time
+    of requests sent by decorated function (see utils.deadline)
+    and 'priority' argument sets their priority class
+    (see scheduler.priority).
     """
 
     @wraps(function)
     def wrapper(*args, **kwargs):
         client = _get_client(kwargs)
-        return function(client, *args, **kwargs)
+
+        timeout = kwargs.pop("deadline", None)
+        priority = kwargs.pop("priority", None)
+        if timeout is None and priority is None:
+            return function(client, *args, **kwargs)
+
+        if _iscoroutinefunction(function):
+            raise exceptions.ScaleIOInvalidParameters(
+                "'deadline' and 'priority' are not supported by coroutines, "
+                "use 'pyscaleio.deadline' and 'pyscaleio.priority' context managers instead.")
+
+        at = None if timeout is None else utils.monotonic() + timeout
+
+        @contextlib.contextmanager
+        def context():
+            with utils.deadline(at=at):
+                with scheduler.priority(priority):
+                    yield
+
+        with context():
+            result = function(client, *args, **kwargs)
+
+        if isinstance(result, types.GeneratorType):
+            return utils._iter_within(result, context)
+        return result
     return wrapper
@@ -0,0 +1,93 @@
+from __future__ import unicode_literals
+
+import json
+import psys
+
+from pyscaleio import exceptions
+
+
+class JSONCodec(object):
+    """JSON codec based on standard library."""
+
+    name = "json"
+    """Codec name."""
+
+    def dumps(self, obj):
+        """Returns JSON document (as text or UTF-8 bytes)."""
+
+        return psys.u(json.dumps(obj))
+
+    def loads(self, data):
+        """Decodes JSON document from text or UTF-8 bytes."""
+
+        return json.loads(psys.u(data))
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON codec based on 'orjson' package."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._module = orjson
+
+    def dumps(self, obj):
+        return self._module.dumps(obj)
+
+    def loads(self, data):
+        return self._module.loads(data)
+
+
+class SimdjsonCodec(JSONCodec):
+    """JSON codec based on 'pysimdjson' package (decoding only)."""
+
+    name = "simdjson"
+
+    def __init__(self):
+        import simdjson
+        self._module = simdjson
+
+    def loads(self, data):
+        return self._module.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """JSON codec based on 'ujson' package."""
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._module = ujson
+
+    def dumps(self, obj):
+        return self._module.dumps(obj)
+
+    def loads(self, data):
+        return self._module.loads(data)
+
+
+CODECS = (OrjsonCodec, SimdjsonCodec, UjsonCodec, JSONCodec)
+"""Available codecs in order of preference."""
+
+
+def get_codec(name=None):
+    """Returns JSON codec instance.
+
+    :param name: codec name (optional), by default the fastest
+        installed codec is used with fallback to standard library
+    """
+
+    if name:
+        for codec in CODECS:
+            if codec.name == name:
+                return codec()
+        raise exceptions.ScaleIOInvalidParameters(
+            "Unknown JSON codec: {0}", name)
+
+    for codec in CODECS:
+        try:
+            return codec()
+        except ImportError:
+            continue
@@ -2,20 +2,143 @@ from __future__ import unicode_literals
 
 from six import add_metaclass
 
-from object_validator import validate, ValidationError
-from object_validator import Integer, String, DictScheme
+from object_validator import validate, InvalidValueError, ValidationError
+from object_validator import Bool, Dict, Float, Integer, String, DictScheme
 
 import pyscaleio.config
+from pyscaleio import constants
 from pyscaleio import exceptions
 from pyscaleio import utils
 
 
 NETWORK_TIMEOUT = 30
-"""Timeout for all network operations."""
+"""Timeout for all network operations (read timeout of requests)."""
+
+CONNECT_TIMEOUT = 10
+"""Timeout for establishing connection with REST Gateway."""
 
 REQUEST_RETRIES = 3
 """Default retries count for HTTP request."""
 
+RETRY_BACKOFF_FACTOR = 0.5
+"""Base delay (in seconds) of exponential backoff between retries."""
+
+RETRY_BACKOFF_MAX = 10
+"""Maximum delay (in seconds) between retries."""
+
+RETRY_BUDGET_RATIO = 0.2
+"""Ratio of retries to requests allowed by retry budget."""
+
+RETRY_BUDGET_MIN_PER_SECOND = 1
+"""Retries per second always allowed by retry budget."""
+
+GATEWAY_DOWN_TIMEOUT = 30
+"""Seconds during which failed REST Gateway is avoided by request routing."""
+
+BREAKER_FAILURE_THRESHOLD = 5
+"""
+Consecutive failures of REST Gateway which open its circuit breaker.
+Zero disables circuit breaker.
+"""
+
+BREAKER_RECOVERY_TIMEOUT = 10
+"""Seconds after which open circuit breaker allows trial request."""
+
+BREAKER_PROBE = True
+"""Probe REST Gateway with open circuit breaker for recovery in background."""
+
+READ_RATE_LIMIT = 0
+"""Maximum rate (per second) of read (GET) requests of session, zero is no limit."""
+
+ACTION_RATE_LIMIT = 0
+"""Maximum rate (per second) of action (POST) requests of session, zero is no limit."""
+
+MAX_CONCURRENT_REQUESTS = 0
+"""
+Maximum number of concurrent requests of session scheduled
+by priority classes, zero disables request scheduler.
+"""
+
+SCHEDULER_AGING = 5
+"""Seconds of waiting that raise priority of queued request by one class."""
+
+COALESCE_REQUESTS = False
+"""Share single in-flight request between identical concurrent GET requests."""
+
+COMPRESSION = True
+"""Negotiate compressed (gzip/deflate) responses with REST Gateway."""
+
+QUERY_CHUNK_SIZE = 1000
+"""Maximum number of ids in single 'queryBySelectedIds' request."""
+
+QUERY_CONCURRENCY = 4
+"""Maximum number of 'queryBySelectedIds' requests of single query sent in parallel."""
+
+RESPONSE_CACHE_TTL = {}
+"""
+Seconds responses of resource types are cached by client
+(e.g. {"StoragePool": 60, "ProtectionDomain": 300}).
+Empty disables response cache.
+"""
+
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+"""Maximum number of responses kept in response cache."""
+
+RESPONSE_CACHE_MAX_BYTES = 16 * constants.MEGABYTE
+"""Maximum total size (in bytes) of encoded responses kept in response cache."""
+
+TRANSPORT = "requests"
+"""
+HTTP transport of session: 'requests' or 'urllib3'
+(connection pools of urllib3 without 'requests' overhead).
+"""
+
+POOL_CONNECTIONS = 10
+"""Number of connection pools (one per host) to cache."""
+
+POOL_MAXSIZE = 10
+"""Maximum number of connections to keep in pool per host."""
+
+POOL_BLOCK = False
+"""Block when no free connections are available in pool."""
+
+KEEP_ALIVE = True
+"""Keep connections alive and reuse them between requests."""
+
+JSON_CODEC = None
+"""
+Name of JSON codec (json, orjson, simdjson or ujson).
+By default the fastest installed codec is used.
+"""
+
+LOG_BODY_LIMIT = 1024
+"""Maximum length of request/response payload written to debug log."""
+
+LOG_BODY_SAMPLE_RATE = 1.0
+"""Fraction of responses which payloads are written to debug log."""
+
+STREAM_CHUNK_SIZE = 64 * constants.KILOBYTE
+"""Size of chunks (in bytes) read from streamed responses."""
+
+TOKEN_LIFETIME = 8 * constants.HOUR_SECONDS - 5 * constants.MINUTE_SECONDS
+"""
+Seconds after login when token is renewed ahead of expiry
+(REST Gateway token expires in 8 hours). Zero disables renewal.
+"""
+
+TOKEN_IDLE_TIMEOUT = 9 * constants.MINUTE_SECONDS
+"""
+Seconds of inactivity after which token is renewed ahead of expiry
+(REST Gateway token expires after 10 minutes of inactivity).
+Zero disables renewal.
+"""
+
+TOKEN_STORE_PATH = None
+"""
+Path of file where tokens are shared between processes of the host
+(e.g. "~/.cache/pyscaleio-tokens.json"). Disabled by default.
+"""
+
 VOLUME_PREFIX = "/dev/disk/by-id"
 """Default prefix for volume path."""
 
@@ -26,13 +149,65 @@ Must be parametrized with system_id and volume_id.
 """
 
 
+class _Float(Float):
+    """Float type validator with optional bounds."""
+
+    def __init__(self, min=None, max=None, **kwargs):
+        super(_Float, self).__init__(**kwargs)
+        self.__min = min
+        self.__max = max
+
+    def validate(self, obj):
+        obj = super(_Float, self).validate(obj)
+
+        if (
+            self.__min is not None and obj < self.__min or
+            self.__max is not None and obj > self.__max
+        ):
+            raise InvalidValueError(obj)
+
+        return obj
+
+
 @add_metaclass(utils.singleton)
 class ScaleIOConfig(object):
     """ScaleIO config manager."""
 
     __scheme__ = {
-        "network_timeout": Integer(min=0, optional=True),
+        "network_timeout": Integer(min=1, optional=True),
+        "connect_timeout": Integer(min=1, optional=True),
         "request_retries": Integer(min=0, optional=True),
+        "retry_backoff_factor": _Float(min=0, optional=True),
+        "retry_backoff_max": Integer(min=0, optional=True),
+        "retry_budget_ratio": _Float(min=0, max=1, optional=True),
+        "retry_budget_min_per_second": Integer(min=0, optional=True),
+        "gateway_down_timeout": Integer(min=0, optional=True),
+        "breaker_failure_threshold": Integer(min=0, optional=True),
+        "breaker_recovery_timeout": Integer(min=1, optional=True),
+        "breaker_probe": Bool(optional=True),
+        "read_rate_limit": Integer(min=0, optional=True),
+        "action_rate_limit": Integer(min=0, optional=True),
+        "max_concurrent_requests": Integer(min=0, optional=True),
+        "scheduler_aging": Integer(min=0, optional=True),
+        "coalesce_requests": Bool(optional=True),
+        "compression": Bool(optional=True),
+        "query_chunk_size": Integer(min=1, optional=True),
+        "query_concurrency": Integer(min=1, optional=True),
+        "response_cache_ttl": Dict(String(), Integer(min=0), optional=True),
+        "response_cache_max_entries": Integer(min=1, optional=True),
+        "response_cache_max_bytes": Integer(min=1, optional=True),
+        "transport": String(choices=["requests", "urllib3"], optional=True),
+        "pool_connections": Integer(min=1, optional=True),
+        "pool_maxsize": Integer(min=1, optional=True),
+        "pool_block": Bool(optional=True),
+        "keep_alive": Bool(optional=True),
+        "json_codec": String(optional=True),
+        "log_body_limit": Integer(min=0, optional=True),
+        "log_body_sample_rate": _Float(min=0, max=1, optional=True),
+        "stream_chunk_size": Integer(min=1, optional=True),
+        "token_lifetime": Integer(min=0, optional=True),
+        "token_idle_timeout": Integer(min=0, optional=True),
+        "token_store_path": String(optional=True),
         "volume_prefix": String(optional=True),
         "volume_name": String(optional=True),
     }
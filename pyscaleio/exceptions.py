@@ -20,6 +20,45 @@ class ScaleIOMalformedError(ScaleIOError):
         super(ScaleIOMalformedError, self).__init__(500, "Malformed response")
 
 
+class ScaleIODeadlineExceeded(ScaleIOError):
+    def __init__(self):
+        super(ScaleIODeadlineExceeded, self).__init__(504, "Deadline exceeded")
+
+
+class ScaleIOCircuitOpenError(ScaleIOError):
+    def __init__(self, hosts):
+        super(ScaleIOCircuitOpenError, self).__init__(503,
+            "Circuit breaker is open for gateway(s): {0}".format(", ".join(hosts)))
+        self.hosts = tuple(hosts)
+
+
+class ScaleIOQueryError(ScaleIOError):
+    def __init__(self, resource, instances, errors, chunks, missing_ids=()):
+        if errors:
+            code = getattr(errors[0][1], "status_code", 500)
+            message = "Query of {0} instances failed for {1} of {2} chunk(s): {3}".format(
+                resource, len(errors), chunks, errors[0][1])
+        else:
+            code = 500
+            message = "Query of {0} instances didn't return {1} id(s): {2}".format(
+                resource, len(missing_ids), ", ".join(missing_ids))
+        super(ScaleIOQueryError, self).__init__(code, message)
+        self.resource = resource
+        self.instances = instances
+        self.errors = errors
+        self.missing_ids = list(missing_ids)
+
+    @property
+    def failed_ids(self):
+        return [instance_id for ids, _ in self.errors for instance_id in ids]
+
+
+class ScaleIOCassetteError(Error):
+    def __init__(self, method, path):
+        super(ScaleIOCassetteError, self).__init__(
+            "No recorded response for request: {0} {1}", method, path)
+
+
 class ScaleIOInvalidClient(Error):
     def __init__(self):
         super(ScaleIOInvalidClient, self).__init__("Invalid ScaleIO client instance.")
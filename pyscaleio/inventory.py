@@ -0,0 +1,140 @@
+from __future__ import unicode_literals
+
+import time
+
+from collections import OrderedDict
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import pyscaleio
+from pyscaleio import config
+from pyscaleio import utils
+from pyscaleio.models import System, ProtectionDomain, StoragePool, VTree, Sdc, Volume
+
+
+RESOURCES = OrderedDict([
+    (System, "System"),
+    (ProtectionDomain, "protectionDomainList"),
+    (StoragePool, "storagePoolList"),
+    (VTree, "vTreeList"),
+    (Sdc, "sdcList"),
+    (Volume, "volumeList"),
+])
+"""Resource models of inventory and their keys in 'instances' payload."""
+
+
+def split_instances(payload):
+    """Splits 'instances' payload by resource types.
+
+    :returns: dict of resource name to list of instances
+        (types missing in payload are missing in result)
+    """
+
+    instances = {}
+    for resource, key in RESOURCES.items():
+        if key not in payload:
+            continue
+        items = payload[key]
+        if isinstance(items, dict):
+            items = [items]
+        instances[resource._get_name()] = utils._drop_none_results(items or [])
+    return instances
+
+
+class Inventory(Mapping):
+    """Point-in-time view of cluster resources.
+
+    Inventory maps resource name (e.g. 'Volume') to tuple of validated
+    models. It is built from single 'instances' response, types missing
+    in the response are fetched concurrently right after it.
+    """
+
+    def __init__(self, client, instances, taken_at=None):
+        self._client = client
+        self.taken_at = time.time() if taken_at is None else taken_at
+
+        self.__resources = OrderedDict()
+        for resource in RESOURCES:
+            name = resource._get_name()
+            self.__resources[name] = tuple(resource(instance=instance, client=client)
+                for instance in instances.get(name, ()))
+        self.__index = None
+
+    @pyscaleio.inject
+    @classmethod
+    def fetch(cls, client, concurrency=None):
+        """Fetches inventory of cluster.
+
+        :param concurrency: maximum number of concurrent requests
+            for types missing in 'instances' response
+        """
+
+        taken_at = time.time()
+        instances = split_instances(client.get_all_instances())
+
+        missing = [resource._get_name() for resource in RESOURCES
+            if resource._get_name() not in instances]
+        results = utils.parallel_map(client.get_instances_of, missing,
+            concurrency or config.QUERY_CONCURRENCY)
+        for name, (result, error) in zip(missing, results):
+            if error is not None:
+                raise error
+            instances[name] = result
+
+        return cls(client, instances, taken_at)
+
+    def __getitem__(self, resource):
+        if isinstance(resource, type):
+            resource = resource._get_name()
+        return self.__resources[resource]
+
+    def __iter__(self):
+        return iter(self.__resources)
+
+    def __len__(self):
+        return len(self.__resources)
+
+    @property
+    def system(self):
+        systems = self["System"]
+        return systems[0] if systems else None
+
+    @property
+    def protection_domains(self):
+        return self["ProtectionDomain"]
+
+    @property
+    def storage_pools(self):
+        return self["StoragePool"]
+
+    @property
+    def vtrees(self):
+        return self["VTree"]
+
+    @property
+    def sdcs(self):
+        return self["Sdc"]
+
+    @property
+    def volumes(self):
+        return self["Volume"]
+
+    def one(self, resource, instance_id):
+        """Returns instance of resource by id.
+
+        :param resource: resource model class or name
+
+        :raises KeyError: if there is no such instance
+        """
+
+        if self.__index is None:
+            self.__index = dict(((name, instance["id"]), instance)
+                for name, instances in self.__resources.items()
+                for instance in instances)
+
+        if isinstance(resource, type):
+            resource = resource._get_name()
+        return self.__index[(resource, instance_id)]
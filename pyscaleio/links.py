@@ -0,0 +1,285 @@
+"""
+HATEOAS links of resource instances.
+
+Links are followed lazily: following a link returns a proxy which is
+fetched on first access. Pending proxies of one client are resolved
+together, so proxies of the same resource type are fetched with a bulk
+'queryBySelectedIds' request and related collections of the same kind
+are fetched with concurrent relationship requests.
+"""
+
+from __future__ import unicode_literals
+
+import collections
+import re
+import threading
+import weakref
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+from pyscaleio import config
+from pyscaleio import exceptions
+from pyscaleio import utils
+
+
+SELF = "self"
+"""Relation of link to the instance itself."""
+
+PARENT_REL = "/api/parent/relationship/{field}"
+"""Relation of link to parent instance referenced by field."""
+
+RELATED_REL = "/api/{resource}/relationship/{related}"
+"""Relation of link to instances of related resource type."""
+
+_INSTANCE_HREF = re.compile(r"^/api/instances/(\w+)::([^/]+)$")
+"""Reference of resource instance."""
+
+_RELATED_HREF = re.compile(r"^/api/instances/(\w+)::([^/]+)/relationships/(\w+)$")
+"""Reference of instances related to resource instance."""
+
+
+class Link(dict):
+    """Link of resource instance ({"rel": ..., "href": ...} dict)."""
+
+    def __init__(self, link, client=None):
+        super(Link, self).__init__(link)
+        self._client = client
+
+    @property
+    def rel(self):
+        return self["rel"]
+
+    @property
+    def href(self):
+        return self["href"]
+
+    def follow(self):
+        """Returns LazyResource or LazyRelated referenced by link."""
+
+        match = _INSTANCE_HREF.match(self.href)
+        if match:
+            resource, instance_id = match.groups()
+            return reference(self._client, _get_resource(resource), instance_id)
+
+        match = _RELATED_HREF.match(self.href)
+        if match:
+            resource, instance_id, related_resource = match.groups()
+            return related(self._client, _get_resource(resource), instance_id,
+                _get_resource(related_resource))
+
+        raise exceptions.ScaleIOInvalidParameters("Unsupported link: {0}.", self.href)
+
+
+def _get_resource(name):
+    from pyscaleio import models
+
+    resource = models._get_resource(name)
+    if resource is None:
+        raise exceptions.ScaleIOInvalidParameters("Unknown resource type: {0}.", name)
+    return resource
+
+
+class LazyResource(Mapping):
+    """Reference to resource instance fetched on first access.
+
+    Proxy behaves like resource model (items and attributes are taken
+    from the model), its id is available without fetching.
+    """
+
+    def __init__(self, client, resolver, resource, instance_id):
+        self._client = client
+        self._resolver = resolver
+        self._resource = resource
+        self._instance_id = instance_id
+        self._model = None
+        self._error = None
+
+    @property
+    def resolved(self):
+        """Checks that instance is already fetched."""
+
+        return self._model is not None
+
+    def resolve(self):
+        """Returns resource model (pending proxies of the type are fetched with it)."""
+
+        if self._model is None:
+            if self._error is None:
+                self._resolver.resolve_references(self)
+            if self._error is not None:
+                raise self._error
+        return self._model
+
+    def _set(self, model=None, error=None):
+        self._model = model
+        self._error = error
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self._instance_id
+        return self.resolve()[key]
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __len__(self):
+        return len(self.resolve())
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return "<{0} {1}::{2}{3}>".format(type(self).__name__, self._resource._get_name(),
+            self._instance_id, "" if self.resolved else " (pending)")
+
+
+class LazyRelated(Sequence):
+    """Instances of resource type related to instance, fetched on first access."""
+
+    def __init__(self, client, resolver, resource, instance_id, related_resource):
+        self._client = client
+        self._resolver = resolver
+        self._resource = resource
+        self._instance_id = instance_id
+        self._related = related_resource
+        self._models = None
+        self._error = None
+
+    @property
+    def resolved(self):
+        """Checks that instances are already fetched."""
+
+        return self._models is not None
+
+    def resolve(self):
+        """Returns list of related models (pending collections of the kind are fetched with it)."""
+
+        if self._models is None:
+            if self._error is None:
+                self._resolver.resolve_related(self)
+            if self._error is not None:
+                raise self._error
+        return self._models
+
+    def _set(self, models=None, error=None):
+        self._models = models
+        self._error = error
+
+    def __getitem__(self, index):
+        return self.resolve()[index]
+
+    def __len__(self):
+        return len(self.resolve())
+
+    def __repr__(self):
+        return "<{0} {1} of {2}::{3}{4}>".format(type(self).__name__, self._related._get_name(),
+            self._resource._get_name(), self._instance_id, "" if self.resolved else " (pending)")
+
+
+class _Resolver(object):
+    """Pending lazy references of client grouped by resource type.
+
+    Resolver doesn't reference its client (it is taken from references),
+    so it is dropped together with the client.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        # Pending items are keyed by id() as proxies compare by fetched data
+        self.__references = collections.defaultdict(weakref.WeakValueDictionary)
+        self.__related = collections.defaultdict(weakref.WeakValueDictionary)
+
+    def add_reference(self, reference):
+        with self.__lock:
+            self.__references[reference._resource][id(reference)] = reference
+
+    def add_related(self, collection):
+        with self.__lock:
+            self.__related[(collection._resource, collection._related)][id(collection)] = collection
+
+    def __pop(self, pending, key, item):
+        with self.__lock:
+            items = pending.pop(key, {})
+            items = [i for i in items.values() if not i.resolved]
+        # Item may be taken by concurrent resolution, it is fetched once more then
+        if not any(i is item for i in items):
+            items.append(item)
+        return items
+
+    def resolve_references(self, reference):
+        client, resource = reference._client, reference._resource
+        references = self.__pop(self.__references, resource, reference)
+
+        ids = list(collections.OrderedDict.fromkeys(r._instance_id for r in references))
+        errors = {}
+        try:
+            models = resource.all(instance_ids=ids, client=client)
+        except exceptions.ScaleIOQueryError as e:
+            models = [resource(instance=instance, client=client) for instance in e.instances]
+            errors = dict((instance_id, e) for instance_id in e.failed_ids + e.missing_ids)
+        except Exception as e:
+            if len(ids) > 1:
+                raise
+            models, errors = [], {ids[0]: e}
+
+        by_id = dict((model["id"], model) for model in models)
+        for item in references:
+            item._set(by_id.get(item._instance_id), errors.get(item._instance_id))
+
+    def resolve_related(self, collection):
+        client, key = collection._client, (collection._resource, collection._related)
+        collections_ = self.__pop(self.__related, key, collection)
+
+        # Requests per collection cost less than listing of the whole related type
+        ids = list(collections.OrderedDict.fromkeys(c._instance_id for c in collections_))
+        results = utils.parallel_map(
+            lambda instance_id: client.get_related_instances_of(
+                collection._resource._get_name(), instance_id, collection._related._get_name()),
+            ids, config.QUERY_CONCURRENCY)
+
+        by_id = dict(zip(ids, results))
+        for item in collections_:
+            instances, error = by_id[item._instance_id]
+            if error is not None:
+                item._set(error=error)
+            else:
+                item._set([item._related(instance=instance, client=client)
+                    for instance in instances])
+
+
+_resolvers = weakref.WeakKeyDictionary()
+"""Resolvers of pending references by clients."""
+
+_resolvers_lock = threading.Lock()
+"""Lock of resolvers registry."""
+
+
+def _get_resolver(client):
+    with _resolvers_lock:
+        resolver = _resolvers.get(client)
+        if resolver is None:
+            resolver = _resolvers[client] = _Resolver()
+        return resolver
+
+
+def reference(client, resource, instance_id):
+    """Returns LazyResource of resource instance."""
+
+    resolver = _get_resolver(client)
+    proxy = LazyResource(client, resolver, resource, instance_id)
+    resolver.add_reference(proxy)
+    return proxy
+
+
+def related(client, resource, instance_id, related_resource):
+    """Returns LazyRelated instances of 'related_resource' type related to instance."""
+
+    resolver = _get_resolver(client)
+    collection = LazyRelated(client, resolver, resource, instance_id, related_resource)
+    resolver.add_related(collection)
+    return collection
@@ -1,9 +1,9 @@
 from __future__ import unicode_literals
 
+import itertools
 import os
-from six import text_type as str
-from six import string_types
-from collections import Mapping, Sequence
+from six import string_types, text_type as str
+from collections import Mapping, OrderedDict, Sequence
 
 from inflection import camelize, underscore
 from object_validator import validate, ValidationError
@@ -13,6 +13,7 @@ import pyscaleio
 from pyscaleio import config
 from pyscaleio import constants
 from pyscaleio import exceptions
+from pyscaleio import links as hateoas
 from pyscaleio import utils
 
 
@@ -88,30 +89,75 @@ class BaseResource(Mapping):
 
     @pyscaleio.inject
     @classmethod
-    def all(cls, client, instance_ids=None, **kwargs):
+    def all(cls, client, instance_ids=None, prefetch=None, **kwargs):
         """Returns list of resource instances.
 
+        Instances selected by ids are queried by chunks in parallel
+        (see 'query_chunk_size' and 'query_concurrency' options).
+
         :param instance_ids: list of instance ids (optional)
+        :param prefetch: list of parent fields (see '__parents__') to resolve
+            in advance, nested parents are separated by dots
+            (e.g. ["storagePoolId", "storagePoolId.protectionDomainId"]),
+            parents are available with 'parent' method
 
-        :returns: list of resource instances
+        :returns: list of resource instances (in order of ids)
         """
 
         if not instance_ids:
             instances = client.get_instances_of(cls._get_name())
         else:
-            if isinstance(instance_ids, string_types):
-                instance_ids = (instance_ids,)
-            instances = client.perform_action_on_type(
-                cls._get_name(), "queryBySelectedIds", {"ids": instance_ids})
+            instances = client.query_instances_of(cls._get_name(), instance_ids)
 
-        return [cls(instance=instance, client=client)
+        resources = [cls(instance=instance, client=client)
             for instance in instances
         ]
+        if prefetch:
+            _prefetch(client, cls, resources, _prefetch_tree(prefetch))
+        return resources
+
+    @pyscaleio.inject
+    @classmethod
+    def iter_all(cls, client, instance_ids=None, prefetch=None, **kwargs):
+        """Returns generator of resource instances.
+
+        Instances are decoded incrementally from the response
+        and validated one by one. Instances selected by ids are
+        queried lazily by chunks (next chunk is requested when
+        the previous one is consumed), so the request of the first
+        chunk is the only one before the first instance and stopping
+        iteration early saves the rest of requests.
+
+        :param instance_ids: iterable of instance ids (optional)
+        :param prefetch: list of parent fields to resolve in advance
+            (see 'all'), parents are resolved for chunks of instances
+
+        :returns: generator of resource instances
+        """
+
+        if not instance_ids:
+            instances = client.get_instances_of(cls._get_name(), stream=True)
+        else:
+            instances = _iter_query(client, cls._get_name(), instance_ids)
+
+        resources = (cls(instance=instance, client=client) for instance in instances)
+        if prefetch:
+            resources = _iter_prefetched(client, cls, resources, _prefetch_tree(prefetch))
+
+        try:
+            for resource in resources:
+                yield resource
+        finally:
+            # Releases connection of streamed response on early termination
+            close = getattr(instances, "close", None)
+            if close is not None:
+                close()
 
     @pyscaleio.inject
     def __init__(self, client, instance_id=None, instance=None):
         self._client = client
         self._scheme = {}
+        self._parents = {}
 
         if instance_id and instance:
             raise exceptions.ScaleIONotBothParameters("instance_id", "instance")
@@ -132,7 +178,69 @@ class BaseResource(Mapping):
 
     @property
     def links(self):
-        return self["links"]
+        """Returns links of instance (see pyscaleio.links.Link)."""
+
+        return [hateoas.Link(link, self._client) for link in self["links"]]
+
+    def follow(self, rel):
+        """Follows link of instance by its relation.
+
+        :param rel: relation of link (e.g. "/api/parent/relationship/storagePoolId")
+
+        :returns: LazyResource for link to instance or
+            LazyRelated for link to related instances
+        """
+
+        for link in self.get("links", ()):
+            if link["rel"] == rel:
+                return hateoas.Link(link, self._client).follow()
+
+        raise exceptions.ScaleIOInvalidParameters(
+            "{0} has no link '{1}'.", self._get_name(), rel)
+
+    def related(self, resource):
+        """Returns instances of resource type related to instance
+        (e.g. volumes of storage pool), they are fetched on first access.
+
+        :param resource: resource model class or name
+
+        :returns: LazyRelated
+        """
+
+        if not isinstance(resource, type):
+            resource = hateoas._get_resource(resource)
+        return hateoas.related(self._client, type(self), self["id"], resource)
+
+    @classmethod
+    def _get_parent_resource(cls, field):
+        """Returns model class of parent referenced by field.
+
+        Attention: for internal use only!
+        """
+
+        parents = dict(cls.__parents__ or ())
+        if field not in parents:
+            raise exceptions.ScaleIOInvalidParameters(
+                "{0} has no parent referenced by '{1}'.", cls._get_name(), field)
+        return globals()[parents[field]]
+
+    def parent(self, field):
+        """Returns parent resource referenced by field (see '__parents__').
+
+        Parent is fetched on first access unless it was prefetched.
+
+        :returns: parent resource instance or None if field is empty
+        """
+
+        resource = self._get_parent_resource(field)
+        parent_id = self.get(field)
+        if not parent_id:
+            return None
+
+        parent = self._parents.get(field)
+        if parent is None or parent["id"] != parent_id:
+            parent = self._parents[field] = resource(parent_id, client=self._client)
+        return parent
 
     def _validate(self, instance):
         """Validates the instance if resource according to scheme.
@@ -149,6 +257,14 @@ class BaseResource(Mapping):
         """Updates resource instance."""
 
         instance = self._client.get_instance_of(self._get_name(), self["id"])
+        self._update(instance)
+
+    def _update(self, instance):
+        """Updates resource instance with specified payload.
+
+        Attention: for internal use only!
+        """
+
         instance = self._validate(instance)
 
         fields = set(list(instance) + list(self._instance))
@@ -195,7 +311,7 @@ class MutableResource(EditableResource):
         :param data: action data payload (optional)
         """
 
-        self.perform("remove{0}".format(self._get_name()), data or {})
+        return self.perform("remove{0}".format(self._get_name()), data or {})
 
 
 class System(EditableResource):
@@ -522,14 +638,22 @@ class Volume(MutableResource):
         :param name: snapshot name
         """
 
+        result = self._client.system.perform(
+            "snapshotVolumes", self._snapshot_definition(name))
+
+        return Volume(result["volumeIdList"][0])
+
+    def _snapshot_definition(self, name=None):
+        """Returns payload of 'snapshotVolumes' action for current volume.
+
+        Attention: for internal use only!
+        """
+
         snapshot = {"volumeId": self["id"]}
         if name:
             snapshot["snapshotName"] = name
 
-        result = self._client.system.perform(
-            "snapshotVolumes", {"snapshotDefs": [snapshot]})
-
-        return Volume(result["volumeIdList"][0])
+        return {"snapshotDefs": [snapshot]}
 
     def throttle(self, sdc_id=None, sdc_guid=None, iops=None, mbps=None):
         """Throttles I/O on current volume.
@@ -614,3 +738,113 @@ class Volume(MutableResource):
         """
 
         return super(Volume, self).delete({"removeMode": mode})
+
+
+def _get_resource(name):
+    """
+    Returns resource model class by resource name (or None).
+    Attention: for internal use only!
+
+    >>> _get_resource("StoragePool") is StoragePool
+    True
+    """
+
+    for value in list(globals().values()):
+        if isinstance(value, type) and issubclass(value, BaseResource) and \
+                value.__module__ == __name__ and value._get_name() == name:
+            return value
+    return None
+
+
+def _prefetch_tree(paths):
+    """
+    Converts dotted parent fields to tree of fields.
+    Attention: for internal use only!
+
+    >>> _prefetch_tree(["a.b", "a.c", "d"]) == {"a": {"b": {}, "c": {}}, "d": {}}
+    True
+    """
+
+    tree = {}
+    for path in paths:
+        node = tree
+        for field in path.split("."):
+            node = node.setdefault(field, {})
+    return tree
+
+
+def _prefetch(client, resource, instances, tree):
+    """
+    Resolves parents of instances by tree of parent fields.
+    Parents of every type are queried once per level of tree.
+    Attention: for internal use only!
+    """
+
+    fields = dict((field, resource._get_parent_resource(field)) for field in tree)
+
+    ids = {}
+    for field, parent_resource in fields.items():
+        type_ids = ids.setdefault(parent_resource, OrderedDict())
+        type_ids.update((instance[field], None) for instance in instances if instance.get(field))
+
+    parents = {}
+    for parent_resource, parent_ids in ids.items():
+        if not parent_ids:
+            continue
+
+        # Parents removed since listing are left for lazy fetch by 'parent'
+        try:
+            found = parent_resource.all(instance_ids=list(parent_ids), client=client)
+        except exceptions.ScaleIOQueryError as e:
+            if e.failed_ids:
+                raise
+            found = [parent_resource(instance=instance, client=client)
+                for instance in e.instances]
+
+        for parent in found:
+            parents[(parent_resource, parent["id"])] = parent
+
+    for field, parent_resource in fields.items():
+        children = []
+        for instance in instances:
+            parent = parents.get((parent_resource, instance.get(field)))
+            if parent is not None:
+                instance._parents[field] = parent
+                children.append(parent)
+
+        if tree[field]:
+            unique = list(dict((id(parent), parent) for parent in children).values())
+            _prefetch(client, parent_resource, unique, tree[field])
+
+
+def _iter_query(client, resource, instance_ids):
+    """
+    Queries instances by ids lazily, chunk by chunk.
+    Attention: for internal use only!
+    """
+
+    if isinstance(instance_ids, string_types):
+        instance_ids = (instance_ids,)
+
+    instance_ids = iter(instance_ids)
+    while True:
+        chunk = list(itertools.islice(instance_ids, config.QUERY_CHUNK_SIZE))
+        if not chunk:
+            return
+        for instance in client.query_instances_of(resource, chunk):
+            yield instance
+
+
+def _iter_prefetched(client, resource, resources, tree):
+    """
+    Resolves parents of resource instances by chunks.
+    Attention: for internal use only!
+    """
+
+    while True:
+        chunk = list(itertools.islice(resources, config.QUERY_CHUNK_SIZE))
+        if not chunk:
+            return
+        _prefetch(client, resource, chunk, tree)
+        for instance in chunk:
+            yield instance
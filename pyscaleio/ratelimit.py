@@ -0,0 +1,100 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from pyscaleio import config
+from pyscaleio import exceptions
+from pyscaleio import utils
+
+
+class TokenBucket(object):
+    """Token bucket with 'rate' tokens per second and 'burst' capacity.
+
+    Callers reserve tokens in order of arrival and sleep exactly
+    until their token becomes available (no busy-waiting).
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = max(burst or rate, 1)
+
+        self.__lock = threading.Lock()
+        self.__tokens = float(self.burst)
+        self.__updated = utils.monotonic()
+        self.__stats = {"acquired": 0, "delayed": 0, "wait_time": 0.0, "max_wait_time": 0.0}
+
+    @property
+    def stats(self):
+        """Returns counters of acquired tokens and time spent waiting for them."""
+
+        with self.__lock:
+            return dict(self.__stats)
+
+    def reserve(self, deadline=None):
+        """Reserves token, returns seconds to wait until it is available.
+
+        :param deadline: monotonic time of deadline (optional),
+            ScaleIODeadlineExceeded is raised if token isn't
+            available before it (nothing is reserved then)
+        """
+
+        with self.__lock:
+            now = utils.monotonic()
+            self.__tokens = min(self.burst,
+                self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+
+            wait = max(0.0, (1 - self.__tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                raise exceptions.ScaleIODeadlineExceeded()
+            self.__tokens -= 1
+
+            stats = self.__stats
+            stats["acquired"] += 1
+            if wait:
+                stats["delayed"] += 1
+                stats["wait_time"] += wait
+                stats["max_wait_time"] = max(stats["max_wait_time"], wait)
+            return wait
+
+    def acquire(self, deadline=None):
+        """Waits for token, returns seconds spent waiting."""
+
+        wait = self.reserve(deadline)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter(object):
+    """Rate limiter of REST Gateway requests.
+
+    Reads (GET) and actions (other methods) have separate budgets.
+    Zero rate means no limit, unspecified rates are taken from config.
+    One limiter may be shared by several sessions to keep their total rate.
+    """
+
+    def __init__(self, read_rate=None, action_rate=None,
+                 read_burst=None, action_burst=None):
+        if read_rate is None:
+            read_rate = config.READ_RATE_LIMIT
+        if action_rate is None:
+            action_rate = config.ACTION_RATE_LIMIT
+
+        self.read = TokenBucket(read_rate, read_burst) if read_rate else None
+        self.action = TokenBucket(action_rate, action_burst) if action_rate else None
+
+    @property
+    def stats(self):
+        return dict((name, bucket.stats)
+            for name, bucket in (("read", self.read), ("action", self.action))
+            if bucket is not None)
+
+    def acquire(self, method, deadline=None):
+        """Waits until request may be sent, returns seconds spent waiting."""
+
+        bucket = self.read if method.lower() == "get" else self.action
+        if bucket is None:
+            return 0
+        return bucket.acquire(deadline)
@@ -0,0 +1,184 @@
+from __future__ import unicode_literals
+
+import random
+import re
+import requests
+import threading
+
+from six.moves.urllib.parse import urlparse
+
+from pyscaleio import config
+from pyscaleio import utils
+
+
+RETRY_STATUS_CODES = frozenset([502, 503, 504])
+"""HTTP status codes of overloaded or restarting gateway."""
+
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+"""Network errors that may be retried."""
+
+RETRY_CONNECT_EXCEPTIONS = (requests.ConnectTimeout,)
+"""Network errors that occur before request is sent (safe to retry)."""
+
+RETRY_METHODS = frozenset(["get"])
+"""Idempotent methods that are retried on any retryable error."""
+
+
+def endpoint_key(method, url):
+    """Returns key of API endpoint for statistics.
+
+    >>> endpoint_key("get", "https://host/api/instances/Volume::1a2b")
+    'GET /api/instances/Volume::*'
+    >>> endpoint_key("post", "http://host/api/types/Volume/instances")
+    'POST /api/types/Volume/instances'
+    """
+
+    path = re.sub(r"::[^/]+", "::*", urlparse(url).path)
+    return str("{0} {1}").format(method.upper(), path)
+
+
+class RetryBudget(object):
+    """Client-wide retry budget.
+
+    Every request deposits 'ratio' of retry and the budget refills
+    with 'min_per_second' retries per second, so retries never exceed
+    the ratio of the traffic during brownout of the gateway.
+    """
+
+    def __init__(self, ratio=None, min_per_second=None, capacity=None):
+        self.ratio = config.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.min_per_second = config.RETRY_BUDGET_MIN_PER_SECOND \
+            if min_per_second is None else min_per_second
+        self.capacity = capacity or max(10, 10 * self.min_per_second)
+
+        self.__lock = threading.Lock()
+        self.__balance = float(self.capacity)
+        self.__updated = utils.monotonic()
+
+    def __refill(self):
+        now = utils.monotonic()
+        self.__balance = min(self.capacity,
+            self.__balance + (now - self.__updated) * self.min_per_second)
+        self.__updated = now
+
+    @property
+    def balance(self):
+        with self.__lock:
+            self.__refill()
+            return self.__balance
+
+    def deposit(self):
+        """Deposits retries for sent request."""
+
+        with self.__lock:
+            self.__refill()
+            self.__balance = min(self.capacity, self.__balance + self.ratio)
+
+    def withdraw(self):
+        """Withdraws one retry, returns False if budget is exhausted."""
+
+        with self.__lock:
+            self.__refill()
+            if self.__balance < 1:
+                return False
+            self.__balance -= 1
+            return True
+
+
+_budgets = {}
+"""Retry budgets shared by policies by (ratio, min_per_second) of config."""
+
+_budgets_lock = threading.Lock()
+"""Lock of shared retry budgets."""
+
+
+def shared_budget():
+    """Returns retry budget shared by policies without their own budget.
+
+    Budget is taken by current config options, so policies created
+    with the same options share the same budget.
+    """
+
+    key = (config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_MIN_PER_SECOND)
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = _budgets[key] = RetryBudget(*key)
+        return budget
+
+
+class RetryPolicy(object):
+    """Policy of retrying failed requests.
+
+    Retries are delayed with exponential backoff and full jitter, bounded
+    by per-request deadline and by retry budget. Unless policy has its own
+    budget (or budget=False disables it), the budget is shared between all
+    sessions of the process (see 'shared_budget').
+    Non-idempotent methods are retried only on connect errors.
+    """
+
+    def __init__(self, retries=None, backoff_factor=None, backoff_max=None,
+                 status_codes=RETRY_STATUS_CODES,
+                 exceptions=RETRY_EXCEPTIONS,
+                 connect_exceptions=RETRY_CONNECT_EXCEPTIONS,
+                 methods=RETRY_METHODS,
+                 deadline=None, budget=None):
+        self.retries = config.REQUEST_RETRIES if retries is None else retries
+        self.backoff_factor = config.RETRY_BACKOFF_FACTOR \
+            if backoff_factor is None else backoff_factor
+        self.backoff_max = config.RETRY_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.status_codes = frozenset(status_codes)
+        self.exceptions = tuple(exceptions)
+        self.connect_exceptions = tuple(connect_exceptions)
+        self.methods = frozenset(method.lower() for method in methods)
+        self.deadline = deadline
+        self.budget = budget if budget is not None else shared_budget()
+        self.stats = utils.EndpointStats(
+            ("requests", "retries", "exhausted", "denied"))
+
+    def backoff(self, attempt):
+        """Returns delay before specified retry attempt (starts from 1)."""
+
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** (attempt - 1)))
+        return random.uniform(0, delay)
+
+    def is_retryable(self, method, status_code=None, exc=None):
+        """Checks that failed request may be retried."""
+
+        if exc is not None:
+            if isinstance(exc, self.connect_exceptions):
+                return True
+            return isinstance(exc, self.exceptions) and method.lower() in self.methods
+
+        return status_code in self.status_codes and method.lower() in self.methods
+
+    def started(self, endpoint):
+        """Accounts new request."""
+
+        self.stats.increment(endpoint, "requests")
+        if self.budget:
+            self.budget.deposit()
+
+    def delay(self, endpoint, attempt, deadline=None):
+        """Returns delay before retry or None if request must not be retried.
+
+        :param endpoint: endpoint key
+        :param attempt: number of failed attempts
+        :param deadline: monotonic time of request deadline (optional)
+        """
+
+        if attempt >= self.retries:
+            self.stats.increment(endpoint, "exhausted")
+            return None
+
+        delay = self.backoff(attempt)
+        if deadline is not None and utils.monotonic() + delay >= deadline:
+            self.stats.increment(endpoint, "exhausted")
+            return None
+
+        if self.budget and not self.budget.withdraw():
+            self.stats.increment(endpoint, "denied")
+            return None
+
+        self.stats.increment(endpoint, "retries")
+        return delay
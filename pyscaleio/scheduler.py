@@ -0,0 +1,164 @@
+from __future__ import unicode_literals
+
+import contextlib
+import itertools
+import threading
+
+from pyscaleio import config
+from pyscaleio import exceptions
+from pyscaleio import utils
+
+
+INTERACTIVE = "interactive"
+"""Latency-critical requests (e.g. of user-facing API)."""
+
+NORMAL = "normal"
+"""Default priority class."""
+
+BACKGROUND = "background"
+"""Bulk requests (e.g. inventory sweeps)."""
+
+PRIORITIES = {INTERACTIVE: 0, NORMAL: 1, BACKGROUND: 2}
+"""Priority classes (lower value is more urgent)."""
+
+_priority = utils.ContextLocal("pyscaleio_priority")
+
+
+def get_priority():
+    """Returns priority class of current context."""
+
+    return _priority.get() or NORMAL
+
+
+@contextlib.contextmanager
+def priority(name):
+    """Marks requests sent inside context with priority class.
+
+    :param name: priority class (interactive, normal or background),
+        None keeps priority of outer context
+    """
+
+    if name is None:
+        yield get_priority()
+        return
+
+    if name not in PRIORITIES:
+        raise exceptions.ScaleIOInvalidParameters(
+            "Unknown priority class: {0}", name)
+
+    with _priority.scope(name) as value:
+        yield value
+
+
+class RequestScheduler(object):
+    """Scheduler of concurrent requests by priority classes.
+
+    At most 'max_concurrency' requests are in flight and every class
+    is bounded by its own limit. Free slot goes to the most urgent
+    waiting request, but waiting request gains one class of priority
+    every 'aging' seconds, so background requests still make progress.
+    Unspecified options are taken from config.
+    """
+
+    def __init__(self, max_concurrency=None, limits=None, aging=None):
+        max_concurrency = max_concurrency or config.MAX_CONCURRENT_REQUESTS
+        if not max_concurrency:
+            raise exceptions.ScaleIOInvalidParameters(
+                "Request scheduler requires positive 'max_concurrency'.")
+
+        self.max_concurrency = max_concurrency
+        self.limits = {
+            INTERACTIVE: max_concurrency,
+            NORMAL: max_concurrency,
+            BACKGROUND: max(1, max_concurrency // 2),
+        }
+        self.limits.update(limits or {})
+        self.aging = config.SCHEDULER_AGING if aging is None else aging
+
+        self.__cond = threading.Condition(threading.Lock())
+        self.__seq = itertools.count()
+        self.__waiters = []
+        self.__active = dict.fromkeys(PRIORITIES, 0)
+        self.__stats = dict((name, {"requests": 0, "delayed": 0, "wait_time": 0.0})
+            for name in PRIORITIES)
+
+    @property
+    def stats(self):
+        """Returns counters of requests and time spent in queue per priority class."""
+
+        with self.__cond:
+            return dict((name, dict(stats, active=self.__active[name]))
+                for name, stats in self.__stats.items())
+
+    def __urgency(self, waiter, now):
+        name, seq, enqueued = waiter
+        urgency = PRIORITIES[name]
+        if self.aging:
+            urgency -= (now - enqueued) / float(self.aging)
+        return urgency, seq
+
+    def __runnable(self, waiter):
+        if sum(self.__active.values()) >= self.max_concurrency:
+            return False
+
+        now = utils.monotonic()
+        eligible = [w for w in self.__waiters
+            if self.__active[w[0]] < self.limits[w[0]]]
+        return bool(eligible) and \
+            min(eligible, key=lambda w: self.__urgency(w, now)) is waiter
+
+    def acquire(self, deadline=None):
+        """Waits for request slot of priority class of current context.
+
+        :param deadline: monotonic time of deadline (optional)
+
+        :returns: priority class of acquired slot
+        """
+
+        name = get_priority()
+        with self.__cond:
+            waiter = (name, next(self.__seq), utils.monotonic())
+            self.__waiters.append(waiter)
+            delayed = False
+            try:
+                while not self.__runnable(waiter):
+                    delayed = True
+                    timeout = None
+                    if deadline is not None:
+                        timeout = deadline - utils.monotonic()
+                        if timeout <= 0:
+                            raise exceptions.ScaleIODeadlineExceeded()
+                    # Aging may change the order of waiters, so wake up periodically
+                    if self.aging:
+                        timeout = min(timeout or self.aging, self.aging)
+                    self.__cond.wait(timeout)
+            finally:
+                self.__waiters.remove(waiter)
+                self.__cond.notify_all()
+
+            self.__active[name] += 1
+
+            stats = self.__stats[name]
+            stats["requests"] += 1
+            if delayed:
+                stats["delayed"] += 1
+                stats["wait_time"] += utils.monotonic() - waiter[2]
+
+        return name
+
+    def release(self, name):
+        """Releases request slot of priority class."""
+
+        with self.__cond:
+            self.__active[name] -= 1
+            self.__cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, deadline=None):
+        """Holds request slot inside context."""
+
+        name = self.acquire(deadline)
+        try:
+            yield name
+        finally:
+            self.release(name)
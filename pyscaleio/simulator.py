@@ -0,0 +1,844 @@
+"""
+Simulator of ScaleIO REST Gateway for load and functional testing.
+
+Simulator keeps state of a cluster (protection domains, storage pools,
+volumes with their VTrees, SDCs and mappings) in memory and serves
+endpoints used by ScaleIOClient. It may be plugged into a session as
+transport adapter (in-process) or served by local HTTP server:
+
+    python -m pyscaleio.simulator --port 8080 --volumes 100000
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import base64
+import collections
+import gzip
+import io
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+
+import psys
+
+from requests.adapters import BaseAdapter
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import urlparse
+
+from pyscaleio import constants
+from pyscaleio.transport import PoolStats, _build_response
+
+
+log = logging.getLogger(__name__)
+
+
+VERSION = "2.0"
+"""Version of REST API reported by simulator."""
+
+VOLUME_GRANULARITY_GB = 8
+"""Volume sizes are rounded up to multiple of this size (in GB)."""
+
+NOT_FOUND_ERROR_CODE = 3
+"""Error code of responses for unknown instances."""
+
+PARENTS = {
+    "ProtectionDomain": (("systemId", "System"),),
+    "StoragePool": (("protectionDomainId", "ProtectionDomain"),),
+    "Sdc": (("systemId", "System"),),
+    "VTree": (("baseVolumeId", "Volume"), ("storagePoolId", "StoragePool")),
+    "Volume": (("ancestorVolumeId", "Volume"), ("storagePoolId", "StoragePool"),
+               ("vtreeId", "VTree")),
+}
+"""References to parent instances by fields (as in 'links' of instances)."""
+
+TYPES = ("System", "ProtectionDomain", "StoragePool", "Sdc", "VTree", "Volume")
+"""Simulated resource types."""
+
+_INSTANCES_KEYS = {
+    "System": "System",
+    "ProtectionDomain": "protectionDomainList",
+    "StoragePool": "storagePoolList",
+    "Sdc": "sdcList",
+    "VTree": "vTreeList",
+    "Volume": "volumeList",
+}
+
+
+class SimulatorError(Exception):
+    """Error response of simulated REST Gateway."""
+
+    def __init__(self, status, message, error_code=0):
+        super(SimulatorError, self).__init__(message)
+        self.status = status
+        self.message = message
+        self.error_code = error_code
+
+    def as_dict(self):
+        return {
+            "message": self.message,
+            "httpStatusCode": self.status,
+            "errorCode": self.error_code,
+        }
+
+
+def _bad_request(message, *args):
+    return SimulatorError(400, message.format(*args) if args else message)
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return psys.u(value).lower() == "true"
+
+
+class Cluster(object):
+    """State of simulated ScaleIO cluster."""
+
+    def __init__(self, name="simulator", restricted=False):
+        self.__ids = itertools.count(1)
+        self.instances = dict((name, collections.OrderedDict()) for name in TYPES)
+        self.__names = dict((name, {}) for name in TYPES)
+        self.__children = {}
+
+        self.system = self.add("System", {
+            "name": name,
+            "restrictedSdcModeEnabled": restricted,
+        })
+
+    @classmethod
+    def generate(cls, volumes=1000, pools=4, domains=1, sdcs=100,
+                 mapped_ratio=0.5, size_gb=VOLUME_GRANULARITY_GB, **kwargs):
+        """Generates cluster with specified number of objects.
+
+        Volumes are spread over pools in round-robin order and
+        'mapped_ratio' of them are mapped to SDCs.
+        """
+
+        cluster = cls(**kwargs)
+        domain_ids = [cluster.add_protection_domain("domain{0}".format(i))["id"]
+            for i in range(domains)]
+        pool_ids = [cluster.add_storage_pool(domain_ids[i % domains], "pool{0}".format(i))["id"]
+            for i in range(pools)]
+        sdc_list = [cluster.add_sdc("10.{0}.{1}.{2}".format(i >> 16 & 255, i >> 8 & 255, i & 255),
+                                    name="sdc{0}".format(i))
+            for i in range(sdcs)]
+
+        mapped_every = int(round(1 / mapped_ratio)) if mapped_ratio and sdc_list else 0
+        for i in range(volumes):
+            volume = cluster.add_volume(pool_ids[i % pools], size_gb, name="volume{0}".format(i))
+            if mapped_every and i % mapped_every == 0:
+                cluster.map_volume(volume, sdc_list[i // mapped_every % sdcs])
+
+        return cluster
+
+    def new_id(self):
+        return "{0:016x}".format(next(self.__ids))
+
+    def add(self, name, instance):
+        """Adds instance of resource type, returns the instance."""
+
+        instance.setdefault("id", self.new_id())
+        for field, parent in PARENTS.get(name, ()):
+            parent_id = instance.get(field)
+            if parent_id is not None:
+                self.__children.setdefault((parent, parent_id), {}).setdefault(
+                    name, set()).add(instance["id"])
+        if instance.get("name"):
+            self.__names[name].setdefault(instance["name"], set()).add(instance["id"])
+        self.instances[name][instance["id"]] = instance
+        return instance
+
+    def remove(self, name, instance_id):
+        instance = self.instances[name].pop(instance_id)
+        for field, parent in PARENTS.get(name, ()):
+            parent_id = instance.get(field)
+            children = self.__children.get((parent, parent_id), {})
+            children.get(name, set()).discard(instance_id)
+        self.__children.pop((name, instance_id), None)
+        self.__unname(name, instance)
+        return instance
+
+    def rename(self, name, instance, new_name):
+        self.__unname(name, instance)
+        instance["name"] = new_name
+        self.__names[name].setdefault(new_name, set()).add(instance["id"])
+
+    def __unname(self, name, instance):
+        ids = self.__names[name].get(instance.get("name"))
+        if ids is not None:
+            ids.discard(instance["id"])
+            if not ids:
+                del self.__names[name][instance["name"]]
+
+    def get(self, name, instance_id):
+        try:
+            return self.instances[name][instance_id]
+        except KeyError:
+            raise SimulatorError(500, "Could not find the {0}".format(
+                _readable(name)), NOT_FOUND_ERROR_CODE)
+
+    def by_name(self, name, instance_name):
+        return [self.instances[name][instance_id]
+            for instance_id in sorted(self.__names[name].get(instance_name, ()))]
+
+    def children(self, parent, parent_id, name):
+        children = self.__children.get((parent, parent_id), {})
+        return [self.instances[name][instance_id]
+            for instance_id in sorted(children.get(name, ()))]
+
+    def add_protection_domain(self, name):
+        if self.by_name("ProtectionDomain", name):
+            raise _bad_request("Protection Domain name already in use")
+        return self.add("ProtectionDomain", {"name": name, "systemId": self.system["id"]})
+
+    def add_storage_pool(self, domain_id, name=None, checksum=False, rfcache=False):
+        self.get("ProtectionDomain", domain_id)
+        if name and any(pool["protectionDomainId"] == domain_id
+                        for pool in self.by_name("StoragePool", name)):
+            raise _bad_request("Storage Pool name already in use")
+        return self.add("StoragePool", {
+            "name": name,
+            "protectionDomainId": domain_id,
+            "checksumEnabled": checksum,
+            "useRfcache": rfcache,
+        })
+
+    def add_sdc(self, ip, name=None, approved=True, connected=True):
+        state = constants.SDC_MDM_STATE_CONNECTED if connected \
+            else constants.SDC_MDM_STATE_DISCONNECTED
+        return self.add("Sdc", {
+            "name": name,
+            "sdcIp": ip,
+            "sdcGuid": "{0}".format(uuid.UUID(int=int(self.new_id(), 16))).upper(),
+            "sdcApproved": approved,
+            "mdmConnectionState": state,
+        })
+
+    def add_volume(self, pool_id, size_gb, name=None, thin=True, rmcache=False):
+        self.get("StoragePool", pool_id)
+        if size_gb <= 0:
+            raise _bad_request("Volume size must be positive")
+        if name and self.by_name("Volume", name):
+            raise _bad_request("Volume name already in use")
+
+        size_gb = -(-size_gb // VOLUME_GRANULARITY_GB) * VOLUME_GRANULARITY_GB
+        volume_id, vtree_id = self.new_id(), self.new_id()
+        self.add("VTree", {
+            "id": vtree_id,
+            "name": name,
+            "baseVolumeId": volume_id,
+            "storagePoolId": pool_id,
+        })
+        return self.add("Volume", {
+            "id": volume_id,
+            "name": name,
+            "sizeInKb": size_gb * constants.GIGABYTE // constants.KILOBYTE,
+            "storagePoolId": pool_id,
+            "vtreeId": vtree_id,
+            "volumeType": constants.VOLUME_TYPE_THIN if thin else constants.VOLUME_TYPE_THICK,
+            "useRmcache": rmcache,
+            "mappedSdcInfo": [],
+        })
+
+    def add_snapshot(self, volume_id, name=None):
+        volume = self.get("Volume", volume_id)
+        if name and self.by_name("Volume", name):
+            raise _bad_request("Volume name already in use")
+
+        return self.add("Volume", {
+            "name": name,
+            "sizeInKb": volume["sizeInKb"],
+            "storagePoolId": volume["storagePoolId"],
+            "vtreeId": volume["vtreeId"],
+            "ancestorVolumeId": volume["id"],
+            "volumeType": constants.VOLUME_TYPE_SNAPSHOT,
+            "useRmcache": volume["useRmcache"],
+            "mappedSdcInfo": [],
+        })
+
+    def map_volume(self, volume, sdc, multiple=False):
+        if self.system["restrictedSdcModeEnabled"] and not sdc["sdcApproved"]:
+            raise _bad_request("SDC is not approved")
+
+        exports = volume["mappedSdcInfo"]
+        if any(export["sdcId"] == sdc["id"] for export in exports):
+            raise _bad_request("The volume is already mapped to this SDC")
+        if exports and not multiple:
+            raise _bad_request("The volume is already mapped to another SDC")
+
+        exports.append({
+            "sdcId": sdc["id"],
+            "sdcIp": sdc["sdcIp"],
+            "limitIops": 0,
+            "limitBwInMbps": 0,
+        })
+
+
+def _readable(name):
+    return re.sub(r"(?<=[a-z])(?=[A-Z])", " ", name).lower()
+
+
+class Simulator(object):
+    """Simulated ScaleIO REST Gateway.
+
+    :param latency: seconds of delay of every response, or
+        (min, max) tuple for uniformly distributed delay
+    :param error_rate: probability of injected error response
+    :param errors: status codes of injected errors
+    :param seed: seed of random generator (for reproducible runs)
+    """
+
+    def __init__(self, cluster=None, user="admin", password="password",
+                 latency=0, error_rate=0, errors=(503,), seed=None):
+        self.cluster = cluster or Cluster()
+        self.user = user
+        self.password = password
+        self.latency = latency
+        self.error_rate = error_rate
+        self.errors = tuple(errors)
+
+        self.__lock = threading.RLock()
+        self.__random = random.Random(seed)
+        self.__tokens = set()
+        self.__failures = collections.deque()
+        self.__stats = {"requests": 0, "logins": 0, "injected_errors": 0}
+
+        self.__routes = [
+            ("GET", re.compile(r"^/api/logout$"), self.__logout),
+            ("GET", re.compile(r"^/api/version$"), lambda body: VERSION),
+            ("GET", re.compile(r"^/api/instances$"), self.__all_instances),
+            ("GET", re.compile(r"^/api/types/(\w+)/instances$"), self.__instances),
+            ("POST", re.compile(r"^/api/types/(\w+)/instances$"), self.__create),
+            ("POST", re.compile(r"^/api/types/(\w+)/instances/action/(\w+)$"), self.__type_action),
+            ("GET", re.compile(r"^/api/instances/(\w+)::([^/]+)$"), self.__instance),
+            ("GET", re.compile(r"^/api/instances/(\w+)::([^/]+)/relationships/(\w+)$"),
+                self.__relationship),
+            ("POST", re.compile(r"^/api/instances/(\w+)::([^/]+)/action/(\w+)$"), self.__action),
+        ]
+
+    @property
+    def stats(self):
+        """Returns counters of handled requests and injected errors."""
+
+        with self.__lock:
+            return dict(self.__stats)
+
+    def fail_next(self, count=1, status=503):
+        """Makes the next 'count' requests fail with 'status'."""
+
+        with self.__lock:
+            self.__failures.extend([status] * count)
+
+    def expire_tokens(self):
+        """Invalidates all issued tokens (clients have to login again)."""
+
+        with self.__lock:
+            self.__tokens.clear()
+
+    def handle(self, method, path, body=None, auth=None):
+        """Handles request to REST Gateway.
+
+        :param path: path of request (query is ignored)
+        :param body: decoded JSON body of request
+        :param auth: (user, password or token) tuple of basic authentication
+
+        :returns: (status, payload) tuple
+        """
+
+        path = urlparse(path).path
+        self.__sleep()
+
+        with self.__lock:
+            self.__stats["requests"] += 1
+            try:
+                self.__inject_error()
+                if path == "/api/login":
+                    return 200, self.__login(auth)
+                handler, args = self.__route(method.upper(), path)
+                self.__authorize(auth)
+                return 200, handler(*args + (body or {},))
+            except SimulatorError as e:
+                return e.status, e.as_dict()
+
+    def __sleep(self):
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            with self.__lock:
+                latency = self.__random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+    def __inject_error(self):
+        status = None
+        if self.__failures:
+            status = self.__failures.popleft()
+        elif self.error_rate and self.__random.random() < self.error_rate:
+            status = self.__random.choice(self.errors)
+
+        if status is not None:
+            self.__stats["injected_errors"] += 1
+            raise SimulatorError(status, "Injected error")
+
+    def __route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in self.__routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return handler, match.groups()
+            allowed = True
+
+        if allowed:
+            raise SimulatorError(405, "Method not allowed")
+        raise SimulatorError(404, "Not found")
+
+    def __authorize(self, auth):
+        if not auth or auth[0] != self.user or auth[1] not in self.__tokens:
+            raise SimulatorError(401, "Unauthorized")
+
+    def __login(self, auth):
+        if not auth or tuple(auth) != (self.user, self.password):
+            raise SimulatorError(401, "Unauthorized")
+
+        token = "{0:032x}".format(self.__random.getrandbits(128))
+        self.__tokens.add(token)
+        self.__stats["logins"] += 1
+        return token
+
+    def __logout(self, body):
+        return None
+
+    def __type(self, name):
+        if name not in self.cluster.instances:
+            raise SimulatorError(500, "Unknown type {0}".format(name))
+        return name
+
+    def _render(self, name, instance):
+        """Returns representation of instance with links."""
+
+        # Mutable state is copied, response is encoded outside of the lock
+        instance = dict(
+            (key, [dict(item) for item in value] if isinstance(value, list) else value)
+            for key, value in instance.items() if value is not None)
+        self_href = "/api/instances/{0}::{1}".format(name, instance["id"])
+
+        links = [{"rel": "self", "href": self_href}]
+        for field, parent in PARENTS.get(name, ()):
+            if field in instance:
+                links.append({
+                    "rel": "/api/parent/relationship/{0}".format(field),
+                    "href": "/api/instances/{0}::{1}".format(parent, instance[field]),
+                })
+        for child, relations in sorted(PARENTS.items()):
+            if child != name and any(parent == name for _, parent in relations):
+                links.append({
+                    "rel": "/api/{0}/relationship/{1}".format(name, child),
+                    "href": "{0}/relationships/{1}".format(self_href, child),
+                })
+
+        instance["links"] = links
+        return instance
+
+    def __render_all(self, name, instances):
+        return [self._render(name, instance) for instance in instances]
+
+    def __all_instances(self, body):
+        result = {}
+        for name, key in _INSTANCES_KEYS.items():
+            instances = self.__render_all(name, self.cluster.instances[name].values())
+            result[key] = instances[0] if name == "System" else instances
+        return result
+
+    def __instances(self, name, body):
+        name = self.__type(name)
+        return self.__render_all(name, self.cluster.instances[name].values())
+
+    def __instance(self, name, instance_id, body):
+        name = self.__type(name)
+        return self._render(name, self.cluster.get(name, instance_id))
+
+    def __relationship(self, name, instance_id, child, body):
+        name, child = self.__type(name), self.__type(child)
+        self.cluster.get(name, instance_id)
+        return self.__render_all(child, self.cluster.children(name, instance_id, child))
+
+    def __create(self, name, body):
+        name, cluster = self.__type(name), self.cluster
+        try:
+            if name == "Volume":
+                size_kb = int(body["volumeSizeInKb"])
+                volume_type = body.get("volumeType", constants.VOLUME_TYPE_THIN)
+                instance = cluster.add_volume(
+                    body["storagePoolId"],
+                    -(-size_kb * constants.KILOBYTE // constants.GIGABYTE),
+                    name=body.get("name"),
+                    thin=volume_type != constants.VOLUME_TYPE_THICK,
+                    rmcache=_bool(body.get("useRmcache", False)))
+            elif name == "StoragePool":
+                instance = cluster.add_storage_pool(
+                    body["protectionDomainId"], name=body.get("name"),
+                    checksum=_bool(body.get("checksumEnabled", False)),
+                    rfcache=_bool(body.get("useRfcache", False)))
+            elif name == "ProtectionDomain":
+                instance = cluster.add_protection_domain(body["name"])
+            else:
+                raise SimulatorError(405, "Method not allowed")
+        except (KeyError, ValueError, TypeError) as e:
+            raise _bad_request("Invalid request: {0}", e)
+
+        return {"id": instance["id"]}
+
+    def __type_action(self, name, action, body):
+        name = self.__type(name)
+        cluster = self.cluster
+
+        if action == "queryBySelectedIds":
+            return self.__render_all(name,
+                [cluster.get(name, instance_id) for instance_id in body.get("ids", ())])
+
+        if action == "queryAllApprovedSdc" and name == "Sdc":
+            return self.__render_all(name,
+                [sdc for sdc in cluster.instances[name].values() if sdc["sdcApproved"]])
+
+        if action == "queryIdByKey":
+            return self.__query_id(name, body)
+
+        raise _bad_request("Unknown action {0} of {1}", action, name)
+
+    def __query_id(self, name, body):
+        cluster = self.cluster
+        if "name" in body:
+            instances = cluster.by_name(name, body["name"])
+            domain_name = body.get("protectionDomainName")
+            if domain_name is not None:
+                domain_ids = set(domain["id"]
+                    for domain in cluster.by_name("ProtectionDomain", domain_name))
+                instances = [instance for instance in instances
+                    if instance.get("protectionDomainId") in domain_ids]
+        elif "ip" in body:
+            instances = [instance for instance in cluster.instances[name].values()
+                if instance.get("sdcIp") == body["ip"]]
+        else:
+            raise _bad_request("Invalid request: unknown key")
+
+        if not instances:
+            raise SimulatorError(500, "Could not find the {0}".format(
+                _readable(name)), NOT_FOUND_ERROR_CODE)
+        return instances[0]["id"]
+
+    def __action(self, name, instance_id, action, body):
+        name = self.__type(name)
+        instance = self.cluster.get(name, instance_id)
+
+        handler = getattr(self, "_action_{0}".format(action), None)
+        if action == "remove{0}".format(name):
+            handler = getattr(self, "_remove_{0}".format(name), None)
+        if handler is None:
+            raise _bad_request("Unknown action {0} of {1}", action, name)
+
+        try:
+            return handler(instance, body)
+        except (KeyError, ValueError, TypeError) as e:
+            raise _bad_request("Invalid request: {0}", e)
+
+    def __sdc(self, body):
+        if body.get("sdcId"):
+            return self.cluster.get("Sdc", body["sdcId"])
+        for sdc in self.cluster.instances["Sdc"].values():
+            if sdc["sdcGuid"] == body.get("guid"):
+                return sdc
+        raise SimulatorError(500, "Could not find the SDC", NOT_FOUND_ERROR_CODE)
+
+    def __export(self, volume, sdc):
+        for export in volume["mappedSdcInfo"]:
+            if export["sdcId"] == sdc["id"]:
+                return export
+        raise _bad_request("The volume is not mapped to this SDC")
+
+    def _action_snapshotVolumes(self, system, body):
+        volume_ids = [self.cluster.add_snapshot(snapshot["volumeId"],
+                                                snapshot.get("snapshotName"))["id"]
+            for snapshot in body["snapshotDefs"]]
+        return {"volumeIdList": volume_ids, "snapshotGroupId": self.cluster.new_id()}
+
+    def _action_setVolumeName(self, volume, body):
+        name = body["newName"]
+        if self.cluster.by_name("Volume", name):
+            raise _bad_request("Volume name already in use")
+        self.cluster.rename("Volume", volume, name)
+        return {}
+
+    def _action_setVolumeSize(self, volume, body):
+        size_kb = int(body["sizeInGB"]) * constants.GIGABYTE // constants.KILOBYTE
+        if int(body["sizeInGB"]) % VOLUME_GRANULARITY_GB:
+            raise _bad_request("Volume size must be granular to {0} GB", VOLUME_GRANULARITY_GB)
+        if size_kb < volume["sizeInKb"]:
+            raise _bad_request("Volume size cannot be decreased")
+        volume["sizeInKb"] = size_kb
+        return {}
+
+    def _action_addMappedSdc(self, volume, body):
+        self.cluster.map_volume(volume, self.__sdc(body),
+            multiple=_bool(body.get("allowMultipleMappings", False)))
+        return {}
+
+    def _action_removeMappedSdc(self, volume, body):
+        if "allSdcs" in body:
+            if not volume["mappedSdcInfo"]:
+                raise _bad_request("The volume is not mapped to any SDC")
+            del volume["mappedSdcInfo"][:]
+        else:
+            volume["mappedSdcInfo"].remove(self.__export(volume, self.__sdc(body)))
+        return {}
+
+    def _action_setMappedSdcLimits(self, volume, body):
+        export = self.__export(volume, self.__sdc(body))
+        iops = body.get("iopsLimit")
+        bandwidth = body.get("bandwidthLimitInKbps")
+
+        if iops is not None:
+            iops = int(iops)
+            if 0 < iops <= 10:
+                raise _bad_request("IOPS limit must be greater than 10")
+        if bandwidth is not None:
+            bandwidth = int(bandwidth)
+            if bandwidth % constants.KILOBYTE:
+                raise _bad_request("Bandwidth limit must be granular to 1024 Kbps")
+        # Gateway rejects request which removes both limits at once
+        if iops == 0 and bandwidth == 0:
+            raise _bad_request("Invalid limits")
+
+        if iops is not None:
+            export["limitIops"] = iops
+        if bandwidth is not None:
+            export["limitBwInMbps"] = bandwidth // constants.KILOBYTE
+        return {}
+
+    def _remove_Volume(self, volume, body):
+        mode = body.get("removeMode", constants.VOLUME_REMOVE_ONLY_ME)
+        if mode not in constants.VOLUME_REMOVE_MODES:
+            raise _bad_request("Invalid remove mode {0}", mode)
+
+        if mode == constants.VOLUME_REMOVE_VTREE:
+            removed = self.cluster.children("VTree", volume["vtreeId"], "Volume")
+        else:
+            removed, queue = [], [volume]
+            while queue:
+                current = queue.pop()
+                removed.append(current)
+                queue.extend(self.cluster.children("Volume", current["id"], "Volume"))
+            if mode == constants.VOLUME_REMOVE_ONLY_ME:
+                removed = [volume]
+            elif mode == constants.VOLUME_REMOVE_DESCENDANTS_ONLY:
+                removed = removed[1:]
+
+        if any(instance["mappedSdcInfo"] for instance in removed):
+            raise _bad_request("Only a volume which is not mapped to any SDC can be removed")
+
+        for instance in removed:
+            # Snapshots of removed volume stay in the VTree without ancestor
+            for snapshot in self.cluster.children("Volume", instance["id"], "Volume"):
+                del snapshot["ancestorVolumeId"]
+            self.cluster.remove("Volume", instance["id"])
+
+        vtree_id = volume["vtreeId"]
+        if not self.cluster.children("VTree", vtree_id, "Volume"):
+            self.cluster.remove("VTree", vtree_id)
+        return {}
+
+    def _remove_StoragePool(self, pool, body):
+        if self.cluster.children("StoragePool", pool["id"], "Volume"):
+            raise _bad_request("Storage Pool has volumes")
+        self.cluster.remove("StoragePool", pool["id"])
+        return {}
+
+    def _remove_ProtectionDomain(self, domain, body):
+        if self.cluster.children("ProtectionDomain", domain["id"], "StoragePool"):
+            raise _bad_request("Protection Domain has storage pools")
+        self.cluster.remove("ProtectionDomain", domain["id"])
+        return {}
+
+    def _remove_Sdc(self, sdc, body):
+        if any(export["sdcId"] == sdc["id"]
+               for volume in self.cluster.instances["Volume"].values()
+               for export in volume["mappedSdcInfo"]):
+            raise _bad_request("SDC has mapped volumes")
+        self.cluster.remove("Sdc", sdc["id"])
+        return {}
+
+
+def _decode_auth(header):
+    if not header or not header.startswith("Basic "):
+        return None
+    try:
+        user, _, password = psys.u(base64.b64decode(header[len("Basic "):])).partition(":")
+    except (TypeError, ValueError):
+        return None
+    return user, password
+
+
+def _decode_body(body):
+    if not body:
+        return None
+    try:
+        return json.loads(psys.u(body))
+    except ValueError:
+        return None
+
+
+def _encode_payload(payload):
+    return b"" if payload is None else json.dumps(payload).encode("utf-8")
+
+
+class SimulatorAdapter(BaseAdapter):
+    """Transport adapter that sends requests of session to simulator in-process."""
+
+    def __init__(self, simulator):
+        super(SimulatorAdapter, self).__init__()
+        self.simulator = simulator
+        self.stats = PoolStats()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self.stats.request_sent()
+        status, payload = self.simulator.handle(
+            request.method, request.path_url, _decode_body(request.body),
+            _decode_auth(request.headers.get("Authorization")))
+
+        return _build_response(request, status, _encode_payload(payload),
+            {"Content-Type": "application/json"}, connection=self)
+
+    def close(self):
+        pass
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.__handle()
+
+    def do_POST(self):
+        self.__handle()
+
+    def __handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+
+        status, payload = self.server.simulator.handle(
+            self.command, self.path, _decode_body(body),
+            _decode_auth(self.headers.get("Authorization")))
+
+        content = _encode_payload(payload)
+        encoding = None
+        if len(content) >= self.server.compress_min_size and \
+                "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            buf = io.BytesIO()
+            with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=1) as f:
+                f.write(content)
+            content, encoding = buf.getvalue(), "gzip"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        log.debug("%s - %s", self.address_string(), format % args)
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SimulatorServer(object):
+    """Local HTTP server of simulator (plain HTTP, so clients use is_secure=False).
+
+    :param port: port to listen on, zero binds random free port
+    :param compress_min_size: responses of this size and bigger
+        are compressed if client accepts gzip encoding
+    """
+
+    def __init__(self, simulator, host="127.0.0.1", port=0, compress_min_size=1024):
+        self.simulator = simulator
+        self.__server = _HTTPServer((host, port), _RequestHandler)
+        self.__server.simulator = simulator
+        self.__server.compress_min_size = compress_min_size
+        self.__thread = None
+
+    @property
+    def address(self):
+        """Returns 'host:port' of the server (suitable as REST Gateway host)."""
+
+        host, port = self.__server.server_address[:2]
+        return "{0}:{1}".format(host, port)
+
+    def start(self):
+        """Starts serving requests in background thread."""
+
+        self.__thread = threading.Thread(target=self.__server.serve_forever,
+                                         name="pyscaleio-simulator")
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def serve_forever(self):
+        self.__server.serve_forever()
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ScaleIO REST Gateway simulator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--volumes", type=int, default=1000)
+    parser.add_argument("--pools", type=int, default=4)
+    parser.add_argument("--domains", type=int, default=1)
+    parser.add_argument("--sdcs", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0, help="response delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0,
+                        help="probability of injected 503 response")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    cluster = Cluster.generate(volumes=args.volumes, pools=args.pools,
+                               domains=args.domains, sdcs=args.sdcs)
+    simulator = Simulator(cluster, user=args.user, password=args.password,
+                          latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    server = SimulatorServer(simulator, args.host, args.port)
+
+    log.info("Serving simulated REST Gateway on %s", server.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from __future__ import unicode_literals
+
+import contextlib
+import errno
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FileTokenStore(object):
+    """Token store shared by processes of the host.
+
+    Tokens are kept in JSON file (readable only by its owner) keyed
+    by user and REST Gateway host. Access is serialized with exclusive
+    lock of '<path>.lock' file (locking is not available on Windows).
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+
+    @staticmethod
+    def _key(host, user):
+        return "{0}@{1}".format(user, host)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                tokens = json.load(f)
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return {}
+            raise
+        except ValueError:
+            return {}
+
+        return tokens if isinstance(tokens, dict) else {}
+
+    def _write(self, tokens):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, path = tempfile.mkstemp(dir=directory, prefix=".pyscaleio-tokens-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(tokens, f)
+            os.rename(path, self.path)
+        except Exception:
+            os.unlink(path)
+            raise
+
+    def load(self, host, user):
+        """Returns stored token entry (dict with 'token' and 'issued_at') or None."""
+
+        with self._locked():
+            return self._read().get(self._key(host, user))
+
+    def save(self, host, user, token, issued_at=None):
+        """Stores token issued at 'issued_at' (Unix time, now by default)."""
+
+        with self._locked():
+            tokens = self._read()
+            tokens[self._key(host, user)] = {
+                "token": token,
+                "issued_at": time.time() if issued_at is None else issued_at,
+            }
+            self._write(tokens)
+
+    def delete(self, host, user, token=None):
+        """Deletes stored token (only if it is 'token' when specified)."""
+
+        with self._locked():
+            tokens = self._read()
+            entry = tokens.get(self._key(host, user))
+            if entry is None or (token is not None and entry.get("token") != token):
+                return
+            del tokens[self._key(host, user)]
+            self._write(tokens)
@@ -0,0 +1,166 @@
+from __future__ import unicode_literals
+
+import logging
+import random
+import uuid
+
+from six.moves.urllib.parse import urlparse, urlunparse
+
+from pyscaleio import config
+from pyscaleio import utils
+
+
+REDACTED = "<redacted>"
+"""Placeholder for sensitive data."""
+
+_correlation_id = utils.ContextLocal("pyscaleio_correlation_id")
+
+
+def get_correlation_id():
+    """Returns correlation id of current context."""
+
+    return _correlation_id.get()
+
+
+def correlation_id(value):
+    """Marks log records of requests sent inside context with correlation id.
+
+    Context is local for thread (and for asyncio task on Python 3.7+).
+
+    :param value: correlation id (e.g. id of caller's own request)
+    """
+
+    return _correlation_id.scope(value)
+
+
+def _redact_url(url):
+    """Removes credentials from URL."""
+
+    parsed = urlparse(url)
+    if parsed.password is None and parsed.username is None:
+        return url
+    netloc = parsed.netloc.rpartition("@")[2]
+    return urlunparse(parsed._replace(netloc=netloc))
+
+
+def _truncate(payload, limit):
+    """Truncates request/response payload for logging."""
+
+    if payload is None:
+        return None
+
+    if isinstance(payload, bytes):
+        size = len(payload)
+        payload = payload[:limit].decode("utf-8", "replace")
+    else:
+        size = len(payload)
+        payload = payload[:limit]
+
+    if size > limit:
+        payload = "{0}...<{1} total>".format(payload, size)
+    return payload
+
+
+class RequestLogger(object):
+    """Logger of session requests and responses.
+
+    All methods do nothing (and do not generate request ids)
+    unless DEBUG level is enabled for the logger.
+    """
+
+    def __init__(self, logger, body_limit=None, sample_rate=None):
+        self.logger = logger
+        self.body_limit = body_limit
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self):
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def __body_limit(self):
+        if self.body_limit is not None:
+            return self.body_limit
+        return config.LOG_BODY_LIMIT
+
+    def __sampled(self):
+        sample_rate = self.sample_rate
+        if sample_rate is None:
+            sample_rate = config.LOG_BODY_SAMPLE_RATE
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    def request_id(self):
+        """Returns correlation id of current context or generates new one."""
+
+        return get_correlation_id() or uuid.uuid4().hex
+
+    def login(self, url, user, timeout=None):
+        """Logs login request and returns its id."""
+
+        if not self.enabled:
+            return None
+
+        request_id = self.request_id()
+        self.logger.debug("ScaleIO login (%s): url=%s, user=%s, timeout=%s",
+            request_id, _redact_url(url), user, timeout)
+        return request_id
+
+    def request(self, method, url, params=None, data=None):
+        """Logs request and returns its id."""
+
+        if not self.enabled:
+            return None
+
+        request_id = self.request_id()
+        self.logger.debug("ScaleIO request (%s): method=%s, url=%s, params=%s, data=%s",
+            request_id, method, _redact_url(url), params,
+            _truncate(data, self.__body_limit()))
+        return request_id
+
+    def response(self, request_id, payload, sensitive=False):
+        """Logs response payload (truncated and sampled).
+
+        :param payload: response payload or None for streamed response
+        :param sensitive: payload must be redacted (optional)
+        """
+
+        if not self.enabled:
+            return
+
+        if sensitive:
+            payload = REDACTED
+        elif payload is None:
+            payload = "<streamed>"
+        elif not self.__sampled():
+            payload = "<{0} bytes not sampled>".format(len(payload))
+        else:
+            payload = _truncate(payload, self.__body_limit())
+
+        self.logger.debug("ScaleIO response (%s): %s", request_id, payload)
+
+    def retry(self, request_id, endpoint, attempt, delay, error):
+        """Logs retry of failed request."""
+
+        if not self.enabled:
+            return
+
+        self.logger.debug(
+            "ScaleIO retry (%s): endpoint=%s, attempt=%s, delay=%.3f, error=%s",
+            request_id, endpoint, attempt, delay, error)
+
+    def failover(self, request_id, source, target):
+        """Logs failover of request to another gateway."""
+
+        if not self.enabled:
+            return
+
+        self.logger.debug("ScaleIO failover (%s): %s -> %s", request_id, source, target)
+
+    def transfer(self, request_id, encoding, compressed, uncompressed):
+        """Logs sizes of transferred response."""
+
+        if not self.enabled:
+            return
+
+        self.logger.debug(
+            "ScaleIO transfer (%s): encoding=%s, compressed=%s, uncompressed=%s",
+            request_id, encoding, compressed, uncompressed)
@@ -0,0 +1,364 @@
+"""
+HTTP transports of ScaleIOSession.
+
+Transport is any object with the following interface:
+
+* request(method, url, params=None, data=None, headers=None, auth=None,
+  timeout=None, stream=False) - sends single request (redirects aren't
+  followed, certificates aren't verified), 'auth' is (user, password)
+  tuple, 'timeout' is (connect, read) tuple or single timeout. Returns
+  response with the subset of 'requests.Response' interface used by
+  session (status_code, reason, headers, encoding, raw, content,
+  iter_content, raise_for_status and close). Network errors are raised
+  as 'requests' exceptions, so retry policies work with any transport.
+* stats - statistics of connection pool (PoolStats).
+* close() - closes pooled connections.
+"""
+
+from __future__ import unicode_literals
+
+import base64
+import collections
+import io
+import json
+import socket
+import threading
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from six import binary_type, text_type
+from six.moves import http_client
+from six.moves.urllib.parse import urlencode, urlparse
+
+from pyscaleio import config
+
+try:
+    from requests.packages import urllib3
+except ImportError:
+    import urllib3
+
+
+class PoolStats(object):
+    """Connection pool statistics."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__requests = 0
+        self.__created = 0
+
+    def request_sent(self):
+        with self.__lock:
+            self.__requests += 1
+
+    def connection_created(self):
+        with self.__lock:
+            self.__created += 1
+
+    @property
+    def requests(self):
+        return self.__requests
+
+    @property
+    def created(self):
+        return self.__created
+
+    @property
+    def reused(self):
+        return max(self.__requests - self.__created, 0)
+
+    def as_dict(self):
+        with self.__lock:
+            return {
+                "requests": self.__requests,
+                "created": self.__created,
+                "reused": max(self.__requests - self.__created, 0),
+            }
+
+
+def _counting_pool(pool_class, stats):
+    """Returns connection pool class that counts new connections."""
+
+    class CountingPool(pool_class):
+        def _new_conn(self):
+            stats.connection_created()
+            return super(CountingPool, self)._new_conn()
+
+    return CountingPool
+
+
+def _build_response(request, status, content, headers=None, reason=None, connection=None):
+    """Builds response object of transport adapter without network.
+
+    Attention: for internal use only!
+    """
+
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason or http_client.responses.get(status)
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = "utf-8"
+    response.raw = io.BytesIO(content)
+    response._content = content
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.connection = connection
+    return response
+
+
+class ScaleIOAdapter(HTTPAdapter):
+    """Transport adapter with tunable connection pool and keep-alive."""
+
+    def __init__(self, keep_alive=True, **kwargs):
+        self.keep_alive = keep_alive
+        self.stats = PoolStats()
+        super(ScaleIOAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keep_alive:
+            kwargs.setdefault("socket_options",
+                urllib3.connection.HTTPConnection.default_socket_options +
+                [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)])
+
+        super(ScaleIOAdapter, self).init_poolmanager(*args, **kwargs)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(urllib3.HTTPConnectionPool, self.stats),
+            "https": _counting_pool(urllib3.HTTPSConnectionPool, self.stats),
+        }
+
+    def send(self, request, **kwargs):
+        self.stats.request_sent()
+        return super(ScaleIOAdapter, self).send(request, **kwargs)
+
+
+def _pool_options(keep_alive=None, pool_connections=None, pool_maxsize=None, pool_block=None):
+    """Returns connection pool options (unspecified ones are taken from config)."""
+
+    return {
+        "keep_alive": config.KEEP_ALIVE if keep_alive is None else keep_alive,
+        "pool_connections": pool_connections or config.POOL_CONNECTIONS,
+        "pool_maxsize": pool_maxsize or config.POOL_MAXSIZE,
+        "pool_block": config.POOL_BLOCK if pool_block is None else pool_block,
+    }
+
+
+class RequestsTransport(object):
+    """Transport based on 'requests.Session' and its transport adapter."""
+
+    def __init__(self, adapter=None, keep_alive=None, pool_connections=None,
+                 pool_maxsize=None, pool_block=None):
+        self.adapter = adapter or ScaleIOAdapter(**_pool_options(
+            keep_alive, pool_connections, pool_maxsize, pool_block))
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    @property
+    def stats(self):
+        return self.adapter.stats
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                auth=None, timeout=None, stream=False):
+        return self.session.request(
+            method=method, url=url, params=params, data=data,
+            headers=headers, auth=auth, timeout=timeout,
+            allow_redirects=False, verify=False, stream=stream)
+
+    def close(self):
+        self.session.close()
+
+
+def _basic_auth(user, password):
+    credentials = "{0}:{1}".format(user, password).encode("latin1")
+    return "Basic " + base64.b64encode(credentials).decode("ascii")
+
+
+def _request_error(exc):
+    """Converts urllib3 error to 'requests' exception."""
+
+    errors = urllib3.exceptions
+    if isinstance(exc, errors.NewConnectionError):
+        return requests.ConnectionError(exc)
+    if isinstance(exc, errors.ConnectTimeoutError):
+        return requests.ConnectTimeout(exc)
+    if isinstance(exc, errors.ReadTimeoutError):
+        return requests.ReadTimeout(exc)
+    if isinstance(exc, errors.SSLError):
+        return requests.exceptions.SSLError(exc)
+    return requests.ConnectionError(exc)
+
+
+class Response(object):
+    """Response of transport.
+
+    :param raw: urllib3 response or file-like object with body
+    :param content: body of response (if it is already read)
+    """
+
+    def __init__(self, status_code, headers, raw, url, reason=None, content=None):
+        self.status_code = status_code
+        self.reason = reason or http_client.responses.get(status_code)
+        self.headers = headers
+        self.encoding = get_encoding_from_headers(headers) or "utf-8"
+        self.raw = raw
+        self.url = url
+        self._content = content
+
+    @property
+    def content(self):
+        if self._content is None:
+            try:
+                self._content = self.raw.read(decode_content=True)
+            except urllib3.exceptions.HTTPError as e:
+                raise _request_error(e)
+        return self._content
+
+    def iter_content(self, chunk_size=1):
+        if self._content is not None:
+            for offset in range(0, len(self._content), chunk_size):
+                yield self._content[offset:offset + chunk_size]
+            return
+
+        try:
+            for chunk in self.raw.stream(chunk_size, decode_content=True):
+                yield chunk
+        except urllib3.exceptions.HTTPError as e:
+            raise _request_error(e)
+        self._content = b""
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            raise requests.HTTPError("{0} Error: {1} for url: {2}".format(
+                self.status_code, self.reason, self.url), response=self)
+
+    def close(self):
+        if self._content is None and hasattr(self.raw, "close"):
+            self.raw.close()
+        release_conn = getattr(self.raw, "release_conn", None)
+        if release_conn is not None:
+            release_conn()
+
+
+class Urllib3Transport(object):
+    """Transport based on urllib3 connection pools (without 'requests' machinery)."""
+
+    def __init__(self, keep_alive=None, pool_connections=None,
+                 pool_maxsize=None, pool_block=None):
+        self.stats = PoolStats()
+        options = _pool_options(keep_alive, pool_connections, pool_maxsize, pool_block)
+
+        kwargs = {}
+        if options["keep_alive"]:
+            kwargs["socket_options"] = \
+                urllib3.connection.HTTPConnection.default_socket_options + \
+                [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+        self.pool = urllib3.PoolManager(
+            num_pools=options["pool_connections"], maxsize=options["pool_maxsize"],
+            block=options["pool_block"], cert_reqs="CERT_NONE", assert_hostname=False,
+            **kwargs)
+        self.pool.pool_classes_by_scheme = {
+            "http": _counting_pool(urllib3.HTTPConnectionPool, self.stats),
+            "https": _counting_pool(urllib3.HTTPSConnectionPool, self.stats),
+        }
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                auth=None, timeout=None, stream=False):
+        if params:
+            url += ("&" if "?" in url else "?") + urlencode(params, doseq=True)
+
+        headers = dict(headers or {})
+        if auth is not None:
+            headers["Authorization"] = _basic_auth(*auth)
+        if isinstance(data, text_type):
+            data = data.encode("utf-8")
+
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+        self.stats.request_sent()
+        try:
+            raw = self.pool.urlopen(
+                method.upper(), url, body=data, headers=headers,
+                timeout=urllib3.Timeout(connect=connect, read=read),
+                retries=False, redirect=False,
+                preload_content=not stream, decode_content=True)
+        except urllib3.exceptions.HTTPError as e:
+            raise _request_error(e)
+
+        return Response(raw.status, raw.headers, raw, url, reason=raw.reason,
+            content=None if stream else raw.data)
+
+    def close(self):
+        # urllib3 2.x doesn't close pools on clear(), so close them explicitly
+        pools = self.pool.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                pool.close()
+        self.pool.clear()
+
+
+class StubRequest(collections.namedtuple("StubRequest",
+                  ("method", "url", "params", "data", "headers", "auth", "timeout"))):
+    """Request sent to StubTransport."""
+
+    @property
+    def path(self):
+        return urlparse(self.url).path
+
+    @property
+    def json(self):
+        """Decoded JSON body of request (or None)."""
+
+        if not self.data:
+            return None
+        data = self.data
+        return json.loads(data.decode("utf-8") if isinstance(data, binary_type) else data)
+
+
+class StubTransport(object):
+    """In-process transport that serves requests with handler (for tests).
+
+    Handler gets StubRequest and returns (status, payload) or (status,
+    payload, headers) tuple, payload is encoded to JSON unless it is bytes.
+    Handler may raise 'requests' exceptions to emulate network errors.
+    Sent requests are kept in 'requests' list.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self.stats = PoolStats()
+        self.__lock = threading.Lock()
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                auth=None, timeout=None, stream=False):
+        self.stats.request_sent()
+
+        request = StubRequest(method.upper(), url, dict(params or {}), data,
+            CaseInsensitiveDict(headers or {}), auth, timeout)
+        with self.__lock:
+            self.requests.append(request)
+
+        result = self.handler(request)
+        status, payload = result[:2]
+        headers = CaseInsensitiveDict(result[2] if len(result) > 2 else {})
+        headers.setdefault("Content-Type", "application/json")
+
+        content = payload if isinstance(payload, binary_type) else \
+            json.dumps(payload).encode("utf-8")
+        return Response(status, headers, io.BytesIO(content), url, content=content)
+
+    def close(self):
+        pass
+
+
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "urllib3": Urllib3Transport,
+}
+"""Transports available by name (see 'transport' option)."""
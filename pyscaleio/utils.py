@@ -1,8 +1,176 @@
 from __future__ import unicode_literals
 
+import contextlib
+import json
+import threading
+import time
+import types
+
 from collections import MutableMapping, MutableSequence
 from functools import wraps
 
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+
+monotonic = getattr(time, "monotonic", time.time)
+"""Monotonic clock (falls back to wall clock on old Pythons)."""
+
+
+_context_locals = []
+
+
+class ContextLocal(object):
+    """Value local for thread (and for asyncio task on Python 3.7+)."""
+
+    def __init__(self, name, default=None):
+        _context_locals.append(self)
+        self.__default = default
+        if contextvars is not None:
+            self.__var = contextvars.ContextVar(name, default=default)
+        else:
+            self.__local = threading.local()
+
+    def get(self):
+        if contextvars is not None:
+            return self.__var.get()
+        return getattr(self.__local, "value", self.__default)
+
+    @contextlib.contextmanager
+    def scope(self, value):
+        """Sets value inside context."""
+
+        if contextvars is not None:
+            token = self.__var.set(value)
+            try:
+                yield value
+            finally:
+                self.__var.reset(token)
+        else:
+            previous = self.get()
+            self.__local.value = value
+            try:
+                yield value
+            finally:
+                self.__local.value = previous
+
+
+def bind_context(function):
+    """Binds function to context-local values of the caller.
+
+    Values (deadline, priority, correlation id, ...) are captured
+    at binding time and restored around every call of the function,
+    so the function may run in another thread.
+    """
+
+    values = [(local, local.get()) for local in _context_locals]
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        scopes = [local.scope(value) for local, value in values]
+        for scope in scopes:
+            scope.__enter__()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            for scope in reversed(scopes):
+                scope.__exit__(None, None, None)
+    return wrapper
+
+
+def parallel_map(function, items, concurrency):
+    """Applies function to items in at most 'concurrency' threads.
+
+    :returns: list of (result, exception) pairs in order of items
+
+    >>> parallel_map(lambda x: 10 // x, [1, 2, 5], 2)
+    [(10, None), (5, None), (2, None)]
+    """
+
+    items = list(items)
+    results = [None] * len(items)
+
+    def call(index):
+        try:
+            results[index] = (function(items[index]), None)
+        except Exception as e:
+            results[index] = (None, e)
+
+    if concurrency <= 1 or len(items) <= 1:
+        for index in range(len(items)):
+            call(index)
+        return results
+
+    call = bind_context(call)
+    indexes = iter(range(len(items)))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                index = next(indexes, None)
+            if index is None:
+                return
+            call(index)
+
+    threads = [threading.Thread(target=worker, name="pyscaleio-worker")
+        for _ in range(min(concurrency, len(items)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+_deadline = ContextLocal("pyscaleio_deadline")
+
+
+def get_deadline():
+    """Returns monotonic time of deadline of current context (or None)."""
+
+    return _deadline.get()
+
+
+@contextlib.contextmanager
+def deadline(timeout=None, at=None):
+    """Limits total time of requests sent inside context.
+
+    The deadline covers logins, retries and all requests
+    of multi-request operations. Nested contexts can only
+    shorten the deadline of outer context.
+
+    :param timeout: seconds from now
+    :param at: monotonic time of deadline (instead of 'timeout')
+
+    :returns: monotonic time of effective deadline
+    """
+
+    if at is None and timeout is not None:
+        at = monotonic() + timeout
+
+    outer = get_deadline()
+    if at is None or (outer is not None and outer < at):
+        at = outer
+
+    with _deadline.scope(at):
+        yield at
+
+
+def _iter_within(iterator, context):
+    """Advances iterator inside context created by 'context' callable."""
+
+    while True:
+        with context():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
 
 class singleton(type):
     """Singleton meta-class."""
@@ -38,16 +206,43 @@ def drop_none(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        results = func(*args, **kwargs)
-        if isinstance(results, MutableSequence):
-            return [_drop_none(result) for result in results]
-        elif isinstance(results, MutableMapping):
-            return _drop_none(results)
-        else:
-            return results
+        return _drop_none_results(func(*args, **kwargs))
     return wrapper
 
 
+def _drop_none_results(results):
+    """Removes keys that points to None values from API results."""
+
+    if isinstance(results, MutableSequence):
+        return [_drop_none(result) for result in results]
+    elif isinstance(results, MutableMapping):
+        return _drop_none(results)
+    elif isinstance(results, types.GeneratorType):
+        return (_drop_none(result) for result in results)
+    else:
+        return results
+
+
+class EndpointStats(object):
+    """Counters per API endpoint."""
+
+    def __init__(self, counters):
+        self.__counters = tuple(counters)
+        self.__lock = threading.Lock()
+        self.__stats = {}
+
+    def increment(self, endpoint, counter, value=1):
+        with self.__lock:
+            stats = self.__stats.setdefault(
+                endpoint, dict.fromkeys(self.__counters, 0))
+            stats[counter] += value
+
+    def as_dict(self):
+        with self.__lock:
+            return dict((endpoint, dict(stats))
+                for endpoint, stats in self.__stats.items())
+
+
 def bool_to_str(value):
     """Converts bool value to string."""
 
@@ -74,3 +269,72 @@ def decorator(decorator):
     def wrapper(func):
         return _decorator(decorator, func)
     return wrapper
+
+
+_WHITESPACE = frozenset(" \t\n\r")
+"""JSON insignificant whitespace characters."""
+
+
+def iter_json_array(chunks):
+    """Iterates over items of JSON array decoded incrementally from text chunks.
+
+    Only the array item being decoded is kept in memory.
+
+    >>> chunks = ['[{"a": 1},', ' {"b"', ': [2]}, 3', '4]']
+    >>> list(iter_json_array(chunks)) == [{"a": 1}, {"b": [2]}, 34]
+    True
+    >>> list(iter_json_array([" [ ", "]"])) == []
+    True
+    """
+
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+
+    buffer, position, expect = "", 0, "["
+    while True:
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+
+        if position == len(buffer):
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("Unexpected end of JSON array")
+            buffer, position = chunk, 0
+            continue
+
+        char = buffer[position]
+        if expect == "[":
+            if char != "[":
+                raise ValueError("Expecting JSON array")
+            position, expect = position + 1, "first"
+        elif expect == ",":
+            if char == "]":
+                return
+            elif char != ",":
+                raise ValueError("Expecting ',' delimiter in JSON array")
+            position, expect = position + 1, "item"
+        elif expect == "first" and char == "]":
+            return
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                item, end = None, None
+
+            # Item may be truncated in the middle, so read more data
+            # (scalars are checked too, as '12' may be the start of '12.5').
+            truncated = end is None
+            if not truncated and not isinstance(item, (dict, list)):
+                rest = buffer[end:].lstrip()
+                truncated = not rest or rest[0] not in ",]"
+
+            if truncated:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    buffer, position = buffer[position:] + chunk, 0
+                    continue
+                elif end is None:
+                    raise ValueError("Unexpected end of JSON array")
+
+            yield item
+            position, expect = end, ","
@@ -0,0 +1,34 @@
+from __future__ import unicode_literals
+
+import pytest
+
+import pyscaleio
+from pyscaleio import retry
+from pyscaleio import simulator
+from pyscaleio import ScaleIOClient, ScaleIOClientsManager
+
+
+@pytest.fixture(autouse=True)
+def retry_budgets(request):
+    """Isolates retry budget shared by sessions between tests."""
+
+    request.addfinalizer(retry._budgets.clear)
+    retry._budgets.clear()
+
+
+@pytest.fixture
+def gateway():
+    """Simulator of REST Gateway with small generated cluster."""
+
+    return simulator.Simulator(simulator.Cluster.generate(volumes=10, pools=2, sdcs=2), seed=1)
+
+
+@pytest.fixture
+def client(request, gateway):
+    """Client of simulated REST Gateway registered as the default one."""
+
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway))
+    pyscaleio.add_client(client)
+    request.addfinalizer(ScaleIOClientsManager().deregister)
+    return client
@@ -6,13 +6,27 @@ import pytest
 
 import pyscaleio
 from pyscaleio import ScaleIOClient, ScaleIOClientsManager
+from pyscaleio import simulator
 
 from . import cleanup_volumes, cleanup_pools
 
 
 @pytest.fixture(scope="module", autouse=True)
 def client(request):
-    """ScaleIO client fixture."""
+    """ScaleIO client fixture.
+
+    With 'scaleio_simulator' environment variable tests run
+    against local simulator instead of live cluster.
+    """
+
+    if os.getenv("scaleio_simulator"):
+        server = simulator.SimulatorServer(simulator.Simulator(
+            simulator.Cluster.generate(volumes=10, sdcs=2))).start()
+        request.addfinalizer(server.stop)
+        client = ScaleIOClient.from_args(server.address, "admin", "password", False)
+        pyscaleio.add_client(client)
+        request.addfinalizer(ScaleIOClientsManager().deregister)
+        return client
 
     client = ScaleIOClient.from_args(
         os.getenv("scaleio_host"),
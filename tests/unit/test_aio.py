@@ -0,0 +1,268 @@
+from __future__ import unicode_literals
+
+import asyncio
+
+import pytest
+
+from object_validator import String
+
+import pyscaleio
+
+from pyscaleio import aio
+from pyscaleio import exceptions
+from pyscaleio import retry
+from pyscaleio import simulator
+from pyscaleio import ScaleIOClient
+from pyscaleio.models import EditableResource, Volume
+
+web = pytest.importorskip("aiohttp.web")
+
+
+@pytest.fixture
+def run():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def gateway(run, request):
+    """Starts aiohttp application that emulates REST Gateway."""
+
+    state = {"logins": 0, "expired": 0, "unavailable": 0, "volumes": {
+        "test1": {"id": "test1", "name": "test_volume1", "links": []},
+        "test2": {"id": "test2", "name": "test_volume2", "links": []},
+    }}
+
+    async def login(req):
+        state["logins"] += 1
+        return web.json_response("token{0}".format(state["logins"]))
+
+    def authorized(handler):
+        async def wrapper(req):
+            if state["unavailable"]:
+                state["unavailable"] -= 1
+                return web.Response(status=503, text="<html>Unavailable</html>")
+            if state["expired"]:
+                state["expired"] -= 1
+                return web.json_response({
+                    "message": "Unauthorized", "httpStatusCode": 401
+                }, status=401)
+            return await handler(req)
+        return wrapper
+
+    @authorized
+    async def instances(req):
+        return web.json_response(list(state["volumes"].values()))
+
+    @authorized
+    async def instance(req):
+        volume_id = req.match_info["id"]
+        if volume_id not in state["volumes"]:
+            return web.json_response({
+                "message": "Not found", "httpStatusCode": 500, "errorCode": 3
+            }, status=500)
+        return web.json_response(state["volumes"][volume_id])
+
+    @authorized
+    async def create(req):
+        data = await req.json()
+        state["volumes"]["test3"] = dict(data, id="test3", links=[])
+        return web.json_response({"id": "test3"})
+
+    @authorized
+    async def query(req):
+        data = await req.json()
+        return web.json_response([
+            state["volumes"][i] for i in data["ids"]])
+
+    @authorized
+    async def action(req):
+        data = await req.json()
+        state["volumes"][req.match_info["id"]]["name"] = data["newName"]
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/api/login", login)
+    app.router.add_get("/api/types/Volume/instances", instances)
+    app.router.add_post("/api/types/Volume/instances", create)
+    app.router.add_post(
+        "/api/types/Volume/instances/action/queryBySelectedIds", query)
+    app.router.add_get("/api/instances/Volume::{id}", instance)
+    app.router.add_post(
+        "/api/instances/Volume::{id}/action/setVolumeName", action)
+
+    runner = web.AppRunner(app)
+    run(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    run(site.start())
+    request.addfinalizer(lambda: run(runner.cleanup()))
+
+    state["host"] = "127.0.0.1:{0}".format(
+        runner.addresses[0][1])
+    return state
+
+
+@pytest.fixture
+def klass(request):
+    return type(str("Volume"), (EditableResource,), {
+        "__scheme__": {"name": String(optional=True)}
+    })
+
+
+@pytest.fixture
+def client(gateway, run, request):
+    client = aio.AsyncScaleIOClient.from_args(
+        gateway["host"], "admin", "passwd", is_secure=False)
+    request.addfinalizer(lambda: run(client.close()))
+    return client
+
+
+def test_async_client_initialize(client):
+
+    assert isinstance(client, ScaleIOClient)
+    assert isinstance(client.session, aio.AsyncScaleIOSession)
+
+    with pytest.raises(exceptions.Error) as e:
+        aio.AsyncScaleIOClient(object())
+    assert "must be initialized with AsyncScaleIOSession" in str(e)
+
+
+def test_async_session_relogin(gateway, client, run):
+
+    assert run(client.get_instances_of("Volume"))
+    assert client.session.token == "token1"
+
+    gateway["expired"] = 1
+    assert run(client.get_instance_of("Volume", "test1"))["id"] == "test1"
+    assert client.session.token == "token2"
+    assert gateway["logins"] == 2
+
+
+def test_async_session_single_refresh(gateway, client, run):
+
+    client.session.token = "expired_token"
+    gateway["expired"] = 16
+
+    async def fetch_all():
+        return await asyncio.gather(*[
+            client.get_instance_of("Volume", "test1") for _ in range(16)])
+
+    assert [r["id"] for r in run(fetch_all())] == ["test1"] * 16
+    assert gateway["logins"] == 1
+
+
+def test_async_session_retry(gateway, run):
+
+    client = aio.AsyncScaleIOClient.from_args(
+        gateway["host"], "admin", "passwd", is_secure=False,
+        retry_policy=retry.RetryPolicy(backoff_factor=0))
+
+    gateway["unavailable"] = 2
+    assert run(client.get_instance_of("Volume", "test1"))["id"] == "test1"
+    assert client.session.retry_stats["GET /api/instances/Volume::*"]["retries"] == 2
+
+    gateway["unavailable"] = 3
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        run(client.get_instance_of("Volume", "test1"))
+    assert e.value.status_code == 503
+
+    run(client.close())
+
+
+def test_async_session_error(client, run):
+
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        run(client.get_instance_of("Volume", "unknown"))
+    assert e.value.status_code == 500
+    assert e.value.error_code == 3
+
+
+def test_async_models(client, klass, run):
+
+    volumes = run(aio.all(klass, client=client))
+    assert sorted(v["id"] for v in volumes) == ["test1", "test2"]
+
+    volumes = run(aio.all(klass, client=client, instance_ids="test2"))
+    assert [v["id"] for v in volumes] == ["test2"]
+
+    volume = run(aio.one(klass, "test1", client=client))
+    assert volume["name"] == "test_volume1"
+
+    run(volume.perform("setVolumeName", {"newName": "renamed"}))
+    assert volume["name"] == "test_volume1"
+    assert run(aio.update(volume))["name"] == "renamed"
+
+    run(aio.perform(volume, "setVolumeName", {"newName": "renamed2"}))
+    run(aio.update(volume))
+    assert volume["name"] == "renamed2"
+
+    volume = run(aio.create(klass, {"name": "created"}, client=client))
+    assert volume == {"id": "test3", "name": "created", "links": []}
+
+
+def test_async_models_sync_client(klass, run):
+
+    client = ScaleIOClient.from_args("localhost", "admin", "passwd")
+    with pytest.raises(exceptions.ScaleIOInvalidClient):
+        run(aio.all(klass, client=client))
+
+
+def test_async_deadline(gateway, client, klass, run):
+
+    with pyscaleio.deadline(0):
+        with pytest.raises(exceptions.ScaleIODeadlineExceeded):
+            run(client.get_instances_of("Volume"))
+    assert gateway["logins"] == 0
+
+    with pyscaleio.deadline(10):
+        assert len(run(aio.all(klass, client=client))) == 2
+
+    with pytest.raises(exceptions.ScaleIOInvalidParameters):
+        aio.all(klass, client=client, deadline=10)
+
+
+def test_async_inventory(run):
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=20, pools=2, sdcs=3))
+
+    async def fetch(address):
+        client = aio.AsyncScaleIOClient.from_args(address, "admin", "password", is_secure=False)
+        try:
+            return await aio.inventory(client=client)
+        finally:
+            await client.close()
+
+    with simulator.SimulatorServer(gateway) as server:
+        inventory = run(fetch(server.address))
+
+    assert len(inventory.volumes) == 20
+    assert inventory.system["id"] == gateway.cluster.system["id"]
+
+
+def test_async_volume_helpers(run):
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=3, pools=1, sdcs=0))
+
+    async def manage(address):
+        client = aio.AsyncScaleIOClient.from_args(address, "admin", "password", is_secure=False)
+        try:
+            volume = (await aio.all(Volume, client=client))[0]
+
+            snapshot = await aio.snapshot(volume, name="snapshot")
+            assert isinstance(snapshot, Volume)
+            assert snapshot["ancestorVolumeId"] == volume["id"]
+            assert (await aio.path(snapshot)).endswith(snapshot["id"])
+            assert len(await aio.all(Volume, client=client)) == 4
+
+            await snapshot.delete()
+            await volume.delete()
+            return await aio.all(Volume, client=client)
+        finally:
+            await client.close()
+
+    with simulator.SimulatorServer(gateway) as server:
+        volumes = run(manage(server.address))
+
+    assert len(volumes) == 2
+    assert len(gateway.cluster.instances["Volume"]) == 2
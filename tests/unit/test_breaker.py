@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+
+import mock
+
+from pyscaleio import breaker
+
+
+def test_breaker_states():
+
+    clock = [0]
+    with mock.patch("pyscaleio.utils.monotonic", side_effect=lambda: clock[0]):
+        cb = breaker.CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+        assert cb.state == breaker.CLOSED
+
+        assert not cb.record_failure()
+        assert cb.allow()
+        assert cb.record_failure()
+        assert cb.state == breaker.OPEN
+        assert not cb.allow()
+
+        clock[0] = 10
+        assert cb.state == breaker.HALF_OPEN
+        assert cb.allow()
+        assert not cb.allow()
+
+        assert cb.record_failure()
+        assert cb.state == breaker.OPEN
+
+        clock[0] = 20
+        assert cb.allow()
+        cb.record_success()
+        assert cb.state == breaker.CLOSED
+        assert cb.allow()
+
+        assert cb.stats == {"state": breaker.CLOSED, "opened": 2, "rejected": 2}
+
+
+def test_breaker_lost_trial():
+
+    clock = [0]
+    with mock.patch("pyscaleio.utils.monotonic", side_effect=lambda: clock[0]):
+        cb = breaker.CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+        assert cb.record_failure()
+
+        clock[0] = 10
+        assert cb.allow()
+        assert not cb.allow()
+
+        clock[0] = 20
+        assert cb.allow()
+
+
+def test_breaker_disabled():
+
+    cb = breaker.CircuitBreaker(failure_threshold=0)
+    for _ in range(100):
+        assert not cb.record_failure()
+    assert cb.allow()
+    assert cb.state == breaker.CLOSED
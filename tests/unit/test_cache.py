@@ -0,0 +1,166 @@
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+import pyscaleio
+from pyscaleio import simulator
+from pyscaleio import ScaleIOClient, ScaleIOClientsManager
+from pyscaleio.cache import ResponseCache, INSTANCE, INSTANCES
+from pyscaleio.models import StoragePool, Volume
+
+
+@pytest.fixture
+def gateway():
+    return simulator.Simulator(simulator.Cluster.generate(volumes=5, pools=2))
+
+
+@pytest.fixture
+def client(request, gateway):
+
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway),
+        cache=ResponseCache(ttl={"StoragePool": 60, "Volume": 60}))
+    pyscaleio.add_client(client)
+    request.addfinalizer(ScaleIOClientsManager().deregister)
+    return client
+
+
+def test_cache_ttl():
+
+    cache = ResponseCache(ttl={"Volume": 10, "Sdc": 0})
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=1000):
+        cache.put("Volume", INSTANCE, "1", {"id": "1"})
+        cache.put("Sdc", INSTANCE, "1", {"id": "1"})
+
+        instance = cache.get("Volume", INSTANCE, "1")
+        assert instance == {"id": "1"}
+        instance["name"] = "changed"
+        assert cache.get("Volume", INSTANCE, "1") == {"id": "1"}
+        assert cache.get("Sdc", INSTANCE, "1") is None
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=1010):
+        assert cache.get("Volume", INSTANCE, "1") is None
+
+    stats = cache.stats
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (2, 1, 0, 0)
+
+
+def test_cache_lru():
+
+    cache = ResponseCache(ttl={"Volume": 10}, max_entries=2, max_bytes=40)
+
+    cache.put("Volume", INSTANCE, "1", {"id": "1"})
+    cache.put("Volume", INSTANCE, "2", {"id": "2"})
+    assert cache.get("Volume", INSTANCE, "1") is not None
+    cache.put("Volume", INSTANCE, "3", {"id": "3"})
+    assert cache.get("Volume", INSTANCE, "2") is None
+    assert cache.stats["evictions"] == 1
+
+    cache.put("Volume", INSTANCES, None, [{"id": "1"}, {"id": "2"}, {"id": "3"}])
+    assert cache.get("Volume", INSTANCE, "1") is None
+    assert cache.get("Volume", INSTANCE, "3") is None
+    assert cache.stats["entries"] == 1
+    assert cache.stats["bytes"] <= 40
+
+    cache.put("Volume", INSTANCES, "large", [{"id": "x" * 100}])
+    assert cache.get("Volume", INSTANCES, "large") is None
+
+
+def test_cache_invalidate():
+
+    cache = ResponseCache(ttl={"Volume": 10, "Sdc": 10})
+    for instance_id in ("1", "2"):
+        cache.put("Volume", INSTANCE, instance_id, {"id": instance_id})
+    cache.put("Volume", INSTANCES, None, [{"id": "1"}, {"id": "2"}])
+    cache.put("Sdc", INSTANCES, None, [])
+
+    generation = cache.generation("Volume")
+    cache.invalidate("Volume", "1")
+    assert cache.get("Volume", INSTANCE, "1") is None
+    assert cache.get("Volume", INSTANCES) is None
+    assert cache.get("Volume", INSTANCE, "2") == {"id": "2"}
+    assert cache.get("Sdc", INSTANCES) == []
+
+    # Response requested before invalidation isn't cached
+    cache.put("Volume", INSTANCE, "1", {"id": "1"}, generation)
+    assert cache.get("Volume", INSTANCE, "1") is None
+
+    cache.invalidate("Volume")
+    assert cache.get("Volume", INSTANCE, "2") is None
+    assert cache.stats["invalidations"] == 3
+
+    generation = cache.generation("Sdc")
+    cache.invalidate()
+    assert cache.get("Sdc", INSTANCES) is None
+    cache.put("Sdc", INSTANCES, None, [], generation)
+    assert cache.get("Sdc", INSTANCES) is None
+    assert cache.stats["invalidations"] == 4
+
+
+def test_client_cache(gateway, client):
+
+    pools = StoragePool.all(client=client)
+    requests = gateway.stats["requests"]
+    assert [p["id"] for p in StoragePool.all(client=client)] == [p["id"] for p in pools]
+    assert StoragePool(pools[0]["id"], client=client).name == pools[0].name
+    assert StoragePool(pools[0]["id"], client=client).name == pools[0].name
+    assert gateway.stats["requests"] == requests + 1
+
+    # Streamed listing isn't cached, but it is served from cache
+    volumes = list(Volume.iter_all(client=client))
+    volume = Volume(volumes[0]["id"], client=client)
+    requests = gateway.stats["requests"]
+    assert len(Volume.all(client=client)) == len(volumes)
+    assert Volume.all(client=client, instance_ids=[volume["id"]])[0]["id"] == volume["id"]
+    assert len(list(Volume.iter_all(client=client))) == len(volumes)
+    assert Volume(volume["id"], client=client).name == volume.name
+    assert gateway.stats["requests"] == requests + 2  # listing and queryBySelectedIds
+
+    volume.rename("renamed")
+    assert Volume(volume["id"], client=client).name == "renamed"
+    assert Volume.all(client=client)[0].name == "renamed"
+
+    pools[1].create_volume(8)
+    assert len(Volume.all(client=client)) == len(volumes) + 1
+
+    stats = client.cache_stats
+    assert stats["hits"] == 4
+    assert stats["invalidations"] == 6
+
+
+def test_client_cache_cross_type(gateway, client):
+
+    volumes = Volume.all(client=client)
+    pool = StoragePool(volumes[0]["storagePoolId"], client=client)
+
+    # Action of System creates volume
+    snapshot = volumes[0].snapshot("snapshot")
+    assert len(Volume.all(client=client)) == len(volumes) + 1
+
+    requests = gateway.stats["requests"]
+    assert StoragePool(pool["id"], client=client).name == pool.name
+    assert gateway.stats["requests"] == requests + 1
+
+    # Action of Volume drops cached storage pools
+    snapshot.delete()
+    assert StoragePool(pool["id"], client=client).name == pool.name
+    assert len(Volume.all(client=client)) == len(volumes)
+    assert gateway.stats["requests"] == requests + 4
+
+
+def test_client_cache_configure(gateway):
+
+    with mock.patch("pyscaleio.config.RESPONSE_CACHE_TTL", {"System": 60}):
+        client = ScaleIOClient.from_args("simulator", "admin", "password",
+            adapter=simulator.SimulatorAdapter(gateway))
+    assert client.cache.ttl == {"System": 60}
+
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway))
+    assert client.cache is None
+    assert client.cache_stats == {}
+
+    with pytest.raises(pyscaleio.exceptions.ScaleIOConfigError):
+        pyscaleio.configure(response_cache_ttl={"System": -1})
@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import json
+
+import httmock
+import mock
+import pytest
+import requests
+
+from pyscaleio import cassette
+from pyscaleio import exceptions
+from pyscaleio import ScaleIOClient
+
+
+@httmock.urlmatch(path=r".*login")
+def login_payload(url, request):
+    return httmock.response(200, json.dumps("secret_token"), request=request)
+
+
+@httmock.urlmatch(path=r"/api/types/Volume/instances")
+def volumes_payload(url, request):
+    return httmock.response(200, json.dumps([{"id": "test1"}, {"id": "test2"}]),
+        headers={"Content-Type": "application/json", "Set-Cookie": "session"},
+        request=request)
+
+
+@httmock.urlmatch(path=r"/api/instances/Volume::test1/action/setVolumeName")
+def action_payload(url, request):
+    return httmock.response(200, json.dumps({}), request=request)
+
+
+@pytest.fixture
+def recorded(tmpdir):
+    path = str(tmpdir.join("cassette.json"))
+
+    tape = cassette.Cassette()
+    client = ScaleIOClient.from_args("gateway", "admin", "passwd",
+        adapter=cassette.RecordingAdapter(tape))
+
+    # Mock network below the recording adapter
+    with mock.patch("requests.adapters.HTTPAdapter.send",
+                    side_effect=lambda request, **kwargs: _mocked_send(request)):
+        assert len(client.get_instances_of("Volume")) == 2
+        client.perform_action_on("Volume", "test1", "setVolumeName", {"newName": "x"})
+
+    tape.save(path)
+    return path
+
+
+def _mocked_send(request):
+    with httmock.HTTMock(login_payload, volumes_payload, action_payload):
+        return requests.Session().send(request)
+
+
+def test_cassette_record(recorded):
+
+    with open(recorded) as f:
+        data = json.load(f)
+
+    interactions = data["interactions"]
+    assert [(i["method"], i["path"]) for i in interactions] == [
+        ("GET", "/api/login"),
+        ("GET", "/api/types/Volume/instances"),
+        ("POST", "/api/instances/Volume::test1/action/setVolumeName"),
+    ]
+
+    raw = json.dumps(data)
+    assert "secret_token" not in raw
+    assert "passwd" not in raw
+    assert "Set-Cookie" not in raw
+    assert interactions[0]["body"] == json.dumps(cassette.SCRUBBED_TOKEN)
+    assert json.loads(interactions[2]["request_body"]) == {"newName": "x"}
+
+
+def test_cassette_replay(recorded):
+
+    adapter = cassette.ReplayAdapter(cassette.Cassette.load(recorded))
+    client = ScaleIOClient.from_args("other_gateway", "admin", "passwd", adapter=adapter)
+
+    for _ in range(3):
+        assert client.get_instances_of("Volume") == [{"id": "test1"}, {"id": "test2"}]
+    assert [v["id"] for v in client.get_instances_of("Volume", stream=True)] == \
+        ["test1", "test2"]
+    assert client.perform_action_on("Volume", "test1", "setVolumeName",
+        {"newName": "y"}) == {}
+    assert client.session.pool_stats["requests"] == 6
+
+    with pytest.raises(exceptions.ScaleIOCassetteError):
+        client.get_instance_of("Volume", "unknown")
+
+
+def test_cassette_replay_latency(recorded):
+
+    tape = cassette.Cassette.load(recorded)
+    for interaction in tape.interactions:
+        interaction["latency"] = 0.5
+
+    client = ScaleIOClient.from_args("gateway", "admin", "passwd",
+        adapter=cassette.ReplayAdapter(tape, latency=2, cycle=False))
+
+    with mock.patch("time.sleep") as sleep:
+        client.get_instances_of("Volume")
+    assert sleep.call_args_list == [mock.call(1.0)] * 2
+
+    with pytest.raises(exceptions.ScaleIOCassetteError):
+        client.get_instances_of("Volume")
@@ -1,22 +1,48 @@
 from __future__ import unicode_literals
 
+import base64
 import collections
+import functools
+import gc
+import gzip
+import io
 import json
 import requests
+import threading
+import time
 
 import httmock
 import mock
+import psys
 import pytest
 
 from httmock import HTTMock
 from psys import Error
 from six import text_type as str
+from six.moves import BaseHTTPServer
 
 from pyscaleio import exceptions
-from pyscaleio.client import ScaleIOSession, ScaleIOClient
+from pyscaleio.client import ScaleIOSession, ScaleIOClient, ScaleIOAdapter
 from pyscaleio.manager import ScaleIOClientsManager
+from pyscaleio.transport import RequestsTransport, StubTransport, Urllib3Transport, TRANSPORTS
 import pyscaleio.client
+import pyscaleio.codec
 import pyscaleio.models
+import pyscaleio.ratelimit
+import pyscaleio.retry
+import pyscaleio.scheduler
+import pyscaleio.tokens
+
+
+def gzip_compress(data):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _basic_auth(user, passwd):
+    return "Basic " + psys.u(base64.b64encode(psys.b("{0}:{1}".format(user, passwd))))
 
 
 @pytest.fixture(scope="function")
@@ -26,6 +52,19 @@ def manager(request):
     return m
 
 
+@pytest.fixture(scope="function")
+def configure(request):
+    """Applies config options and restores them after test."""
+
+    def apply(**options):
+        for option in options:
+            name = option.upper()
+            request.addfinalizer(functools.partial(
+                setattr, pyscaleio.config, name, getattr(pyscaleio.config, name)))
+        pyscaleio.configure(**options)
+    return apply
+
+
 @pytest.fixture(scope="function")
 def mock_session(request):
     def generate_session(*args, **kwargs):
@@ -101,9 +140,9 @@ def test_session_initialize(mock_session, is_secure, scheme):
 
     assert not client.token
     assert isinstance(
-        client._ScaleIOSession__session,
-        requests.Session)
-    headers = client._ScaleIOSession__session.headers
+        client._ScaleIOSession__transport,
+        RequestsTransport)
+    headers = client.headers
     assert "Accept" in headers
     assert headers["Accept"] == "application/json; version=2.0"
     assert headers["Content-Type"] == "application/json"
@@ -111,17 +150,115 @@ def test_session_initialize(mock_session, is_secure, scheme):
     assert client.endpoint == "{0}://localhost/api/".format(scheme)
 
 
+@pytest.mark.parametrize("is_secure", [True, False])
+def test_session_pool_options(mock_session, is_secure):
+
+    client = mock_session(is_secure=is_secure,
+        pool_connections=2, pool_maxsize=32, pool_block=True)
+
+    adapter = client._ScaleIOSession__transport.session.get_adapter(client.endpoint)
+    assert isinstance(adapter, ScaleIOAdapter)
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block is True
+    assert adapter.keep_alive is True
+    assert client.headers["Connection"] == "keep-alive"
+
+    client = mock_session(keep_alive=False)
+    assert client.headers["Connection"] == "close"
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_session_pool_stats(mock_session, request, transport):
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = json.dumps("token" if "login" in self.path else {}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    request.addfinalizer(server.shutdown)
+
+    with mock.patch("pyscaleio.config.TRANSPORT", transport):
+        client = mock_session("127.0.0.1:{0}".format(server.server_port),
+            "admin", "passwd", is_secure=False)
+    assert isinstance(client._ScaleIOSession__transport, TRANSPORTS[transport])
+    assert client.pool_stats == {"requests": 0, "created": 0, "reused": 0}
+
+    for _ in range(5):
+        client.get("test/instance")
+
+    assert client.pool_stats == {"requests": 6, "created": 1, "reused": 5}
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+@pytest.mark.parametrize("compression", [True, False])
+def test_session_transfer_stats(mock_session, request, compression, transport):
+
+    payload = json.dumps([{"id": str(i), "name": "volume"} for i in range(100)]).encode()
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = json.dumps("token").encode() if "login" in self.path else payload
+            self.send_response(200)
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip_compress(body)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    request.addfinalizer(server.shutdown)
+
+    client = mock_session("127.0.0.1:{0}".format(server.server_port),
+        "admin", "passwd", is_secure=False, compression=compression,
+        transport=TRANSPORTS[transport]())
+    assert client.transfer_stats == {}
+
+    assert len(client.get("types/Volume/instances")) == 100
+    assert len(list(client.get("types/Volume/instances", stream=True))) == 100
+
+    stats = client.transfer_stats["GET /api/types/Volume/instances"]
+    assert stats["responses"] == 2
+    assert stats["uncompressed_bytes"] == 2 * len(payload)
+    if compression:
+        assert stats["compressed"] == 2
+        assert stats["compressed_bytes"] == 2 * len(gzip_compress(payload))
+        assert stats["compressed_bytes"] < stats["uncompressed_bytes"]
+    else:
+        assert stats["compressed"] == 0
+        assert stats["compressed_bytes"] == stats["uncompressed_bytes"]
+
+
 def test_session_login_positive(mock_session):
 
     client = mock_session()
     assert not client.token
-    assert not client._ScaleIOSession__session.auth
 
     with HTTMock(login_payload):
         client.login()
 
     assert client.token == "some_random_token_string"
-    assert client._ScaleIOSession__session.auth == ("admin", "some_random_token_string")
 
 
 @pytest.mark.parametrize(("code", "message", "exc"), [
@@ -141,7 +278,6 @@ def test_session_login_negative(mock_session, code, message, exc):
 
     client = mock_session()
     assert not client.token
-    assert not client._ScaleIOSession__session.auth
 
     with HTTMock(login_payload):
         with pytest.raises(exc) as e:
@@ -153,7 +289,6 @@ def test_session_login_negative(mock_session, code, message, exc):
         assert str(e) == message
 
     assert not client.token
-    assert not client._ScaleIOSession__session.auth
 
 
 def test_session_send_request(mock_session):
@@ -215,6 +350,693 @@ def test_session_send_request_retries(mock_session, effect, result, retries):
 
     assert login_payload.call["count"] == retries - 1
     assert request_payload.call["count"] == retries
+    assert client.token_stats["refreshes"] == retries - 1
+
+
+def test_session_send_request_single_refresh(mock_session):
+
+    tokens = {"valid": "fresh_token", "logins": 0}
+
+    @httmock.urlmatch(path=r".*login")
+    def login_payload(url, request):
+        time.sleep(0.1)
+        tokens["logins"] += 1
+        return httmock.response(200, json.dumps(tokens["valid"]),
+            request=request)
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        expected = requests.auth._basic_auth_str("admin", tokens["valid"])
+        if request.headers["Authorization"] != expected:
+            return httmock.response(401, json.dumps({
+                "message": "Unauthorized", "httpStatusCode": 401
+            }), request=request)
+        return httmock.response(200, json.dumps({"response": "test"}),
+            request=request)
+
+    client = mock_session()
+    client.token = "expired_token"
+
+    results = []
+    with HTTMock(login_payload, request_payload):
+        threads = [threading.Thread(
+            target=lambda: results.append(client.get("test/instance"))
+        ) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == [{"response": "test"}] * 8
+    assert tokens["logins"] == 1
+    assert client.token == "fresh_token"
+
+
+@pytest.mark.parametrize(("kw", "elapsed", "renewed"), [
+    ({"token_lifetime": 100, "token_idle_timeout": 0}, 99, False),
+    ({"token_lifetime": 100, "token_idle_timeout": 0}, 100, True),
+    ({"token_lifetime": 0, "token_idle_timeout": 10}, 9, False),
+    ({"token_lifetime": 0, "token_idle_timeout": 10}, 10, True),
+    ({"token_lifetime": 0, "token_idle_timeout": 0}, 10 ** 6, False),
+])
+def test_session_token_renewal(mock_session, kw, elapsed, renewed):
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        return httmock.response(200, json.dumps({"response": "test"}),
+            request=request)
+
+    client = mock_session(**kw)
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=1000):
+        with HTTMock(login_payload, request_payload):
+            client.get("test/instance")
+    assert client.token_issued_at == client.token_used_at == 1000
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=1000 + elapsed):
+        with HTTMock(login_payload, request_payload):
+            assert client.get("test/instance") == {"response": "test"}
+    assert client.token_used_at == 1000 + elapsed
+
+    assert client.token_stats == {
+        "logins": 2 if renewed else 1,
+        "renewals": 1 if renewed else 0,
+        "refreshes": 0,
+        "restored": 0,
+    }
+
+
+@pytest.mark.parametrize(("method", "effect", "result", "calls"), [
+    ("get", [503, 200], {"response": "test"}, 2),
+    ("get", [requests.ConnectionError(), 504, 200], {"response": "test"}, 3),
+    ("get", [502, 502, 502], exceptions.ScaleIOError, 3),
+    ("get", [requests.ReadTimeout()] * 3, requests.ReadTimeout, 3),
+    ("post", [503, 200], exceptions.ScaleIOError, 1),
+    ("post", [requests.ConnectTimeout(), 200], {"response": "test"}, 2),
+])
+def test_session_send_request_retry_policy(mock_session, method, effect, result, calls):
+
+    mock_handler = mock.Mock(side_effect=effect)
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        code = mock_handler()
+        if isinstance(code, Exception):
+            raise code
+        if code != 200:
+            return httmock.response(code, "<html>Bad Gateway</html>",
+                reason="Bad Gateway", request=request)
+        return httmock.response(code, json.dumps({"response": "test"}),
+            request=request)
+
+    policy = pyscaleio.retry.RetryPolicy(retries=3, backoff_factor=0)
+    client = mock_session(retry_policy=policy)
+    client.token = "some_token"
+
+    with HTTMock(request_payload):
+        if isinstance(result, type):
+            with pytest.raises(result):
+                getattr(client, method)("test/instance", None)
+        else:
+            assert getattr(client, method)("test/instance", None) == result
+
+    assert mock_handler.call_count == calls
+    stats = client.retry_stats["{0} /api/test/instance".format(method.upper())]
+    assert stats["requests"] == 1
+    assert stats["retries"] == calls - 1
+
+
+def test_session_timeouts(mock_session):
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        return httmock.response(200, json.dumps({}), request=request)
+
+    client = mock_session(timeout=7, connect_timeout=3)
+    client.token = "some_token"
+
+    with mock.patch.object(requests.Session, "request", autospec=True,
+                           side_effect=requests.Session.request) as m:
+        with mock.patch("pyscaleio.utils.monotonic", return_value=1000):
+            with HTTMock(request_payload):
+                client.get("test/instance")
+                with pyscaleio.deadline(5):
+                    client.get("test/instance")
+                with pyscaleio.deadline(60):
+                    client.get("test/instance")
+                with pyscaleio.deadline(0):
+                    with pytest.raises(exceptions.ScaleIODeadlineExceeded):
+                        client.get("test/instance")
+
+    assert [c[1]["timeout"] for c in m.call_args_list] == [(3, 7), (3, 5), (3, 7)]
+
+
+@pytest.mark.parametrize(("effect", "error", "calls"), [
+    (503, exceptions.ScaleIOError, 3),
+    (requests.ConnectionError(), exceptions.ScaleIODeadlineExceeded, 3),
+])
+def test_session_deadline_retries(mock_session, effect, error, calls):
+
+    clock = [1000]
+    mock_handler = mock.Mock(side_effect=[effect] * 10)
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        clock[0] += 4
+        code = mock_handler()
+        if isinstance(code, Exception):
+            raise code
+        return httmock.response(code, "<html>Unavailable</html>", request=request)
+
+    client = mock_session(retry_policy=pyscaleio.retry.RetryPolicy(
+        retries=10, backoff_factor=0, budget=False))
+    client.token = "some_token"
+
+    with mock.patch("pyscaleio.utils.monotonic", side_effect=lambda: clock[0]):
+        with HTTMock(request_payload):
+            with pyscaleio.deadline(10):
+                with pytest.raises(error) as e:
+                    client.get("test/instance")
+
+    assert mock_handler.call_count == calls
+    assert e.value.status_code == (503 if effect == 503 else 504)
+
+
+def test_session_gateways_failover(mock_session):
+
+    calls = collections.Counter()
+
+    @httmock.urlmatch(path=r".*login")
+    def login(url, request):
+        calls[url.netloc, "login"] += 1
+        return httmock.response(200, json.dumps("token_" + url.netloc), request=request)
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        calls[url.netloc, "request"] += 1
+        assert request.headers["Authorization"] == _basic_auth("admin", "token_" + url.netloc)
+        if url.netloc == "gw1":
+            raise requests.ConnectionError()
+        return httmock.response(200, json.dumps({"host": url.netloc}), request=request)
+
+    client = mock_session(["gw1", "gw2"], "admin", "passwd",
+        retry_policy=pyscaleio.retry.RetryPolicy(backoff_factor=0, budget=False))
+    assert client.host == "gw1"
+    assert client.hosts == ("gw1", "gw2")
+    assert client.endpoint == "https://gw1/api/"
+
+    with HTTMock(login, request_payload):
+        assert client.get("test/instance") == {"host": "gw2"}
+        assert client.endpoint == "https://gw2/api/"
+        assert client.token == "token_gw2"
+
+        assert client.get("test/instance") == {"host": "gw2"}
+
+    assert calls == {
+        ("gw1", "login"): 1, ("gw1", "request"): 1,
+        ("gw2", "login"): 1, ("gw2", "request"): 2,
+    }
+
+    stats = client.gateway_stats
+    assert stats["gw1"]["healthy"] is False
+    assert stats["gw1"]["errors"] == 1
+    assert stats["gw2"]["healthy"] is True
+    assert stats["gw2"]["requests"] == 2
+
+    @httmock.urlmatch(path=r".*logout")
+    def logout(url, request):
+        calls[url.netloc, "logout"] += 1
+        return httmock.response(200, request=request)
+
+    with HTTMock(logout):
+        client.logout()
+    assert client.token is None
+    assert calls["gw1", "logout"] == calls["gw2", "logout"] == 1
+
+
+def test_session_gateways_routing(mock_session):
+
+    client = mock_session(["gw1", "gw2", "gw3"], "admin", "passwd",
+        retry_policy=pyscaleio.retry.RetryPolicy(backoff_factor=0, budget=False))
+    gw1, gw2, gw3 = client._ScaleIOSession__gateways
+    gw1.succeeded(0.5)
+    gw2.succeeded(0.1)
+    gw3.failed(client.gateway_down_timeout)
+
+    @httmock.urlmatch(path=r".*login")
+    def login(url, request):
+        return httmock.response(200, json.dumps("token"), request=request)
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        return httmock.response(200, json.dumps({"host": url.netloc}), request=request)
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=0):
+        with HTTMock(login, request_payload):
+            client._ScaleIOSession__gateway = gw1
+            assert client.post("test/instance", "{}") == {"host": "gw1"}
+            assert client.get("test/instance") == {"host": "gw2"}
+            assert client.post("test/instance", "{}") == {"host": "gw2"}
+
+
+def test_session_circuit_breaker(mock_session):
+
+    clock = [1000]
+    down = [True]
+    mock_handler = mock.Mock()
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        mock_handler()
+        if down[0]:
+            raise requests.ConnectionError()
+        return httmock.response(200, json.dumps({}), request=request)
+
+    client = mock_session(
+        retry_policy=pyscaleio.retry.RetryPolicy(retries=1, budget=False),
+        breaker_failure_threshold=2, breaker_recovery_timeout=10, breaker_probe=False)
+    client.token = "some_token"
+
+    with mock.patch("pyscaleio.utils.monotonic", side_effect=lambda: clock[0]):
+        with HTTMock(request_payload):
+            for _ in range(2):
+                with pytest.raises(requests.ConnectionError):
+                    client.get("test/instance")
+
+            with pytest.raises(exceptions.ScaleIOCircuitOpenError) as e:
+                client.get("test/instance")
+            assert e.value.hosts == ("localhost",)
+            assert mock_handler.call_count == 2
+            assert client.gateway_stats["localhost"]["breaker"] == "open"
+
+            clock[0] += 10
+            down[0] = False
+            assert client.get("test/instance") == {}
+            assert client.gateway_stats["localhost"]["breaker"] == "closed"
+            assert mock_handler.call_count == 3
+
+
+def test_session_circuit_breaker_probe(mock_session):
+
+    down = [True]
+
+    @httmock.urlmatch(path=r"/api/(test/instance|version)")
+    def request_payload(url, request):
+        if down[0]:
+            raise requests.ConnectionError()
+        return httmock.response(200, json.dumps("2.0"), request=request)
+
+    client = mock_session(
+        retry_policy=pyscaleio.retry.RetryPolicy(retries=1, budget=False),
+        breaker_failure_threshold=1, breaker_recovery_timeout=0.01)
+    client.token = "some_token"
+    gateway = client._ScaleIOSession__gateways[0]
+
+    with HTTMock(request_payload):
+        with pytest.raises(requests.ConnectionError):
+            client.get("test/instance")
+        assert gateway.probing
+
+        down[0] = False
+        for _ in range(100):
+            if not gateway.probing:
+                break
+            time.sleep(0.01)
+
+    assert gateway.breaker.state == "closed"
+    assert gateway.breaker.stats["opened"] >= 1
+
+
+def test_session_circuit_breaker_probe_stop(mock_session):
+
+    @httmock.urlmatch(path=r"/api/(test/instance|version)")
+    def request_payload(url, request):
+        raise requests.ConnectionError()
+
+    def probed_gateway():
+        client = mock_session(
+            retry_policy=pyscaleio.retry.RetryPolicy(retries=1, budget=False),
+            breaker_failure_threshold=1, breaker_recovery_timeout=0.01)
+        client.token = "some_token"
+        with pytest.raises(requests.ConnectionError):
+            client.get("test/instance")
+        gateway = client._ScaleIOSession__gateways[0]
+        assert gateway.probing
+        return client, gateway
+
+    def wait_stopped(gateway):
+        for _ in range(100):
+            if not gateway.probing:
+                break
+            time.sleep(0.01)
+        assert not gateway.probing
+        assert gateway.breaker.state != "closed"
+
+    with HTTMock(request_payload, logout_payload):
+        # Gateway never recovers: probe stops with session
+        client, gateway = probed_gateway()
+        client.close()
+        wait_stopped(gateway)
+
+        client, gateway = probed_gateway()
+        client.logout()
+        wait_stopped(gateway)
+
+        client, gateway = probed_gateway()
+        del client
+        gc.collect()
+        wait_stopped(gateway)
+
+
+@pytest.mark.parametrize("error", [False, True])
+def test_session_coalesce(mock_session, error):
+
+    mock_handler = mock.Mock()
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        mock_handler(url.query)
+        time.sleep(0.2)
+        if error:
+            return httmock.response(500, json.dumps({
+                "message": "Error", "httpStatusCode": 500, "errorCode": 1
+            }), request=request)
+        return httmock.response(200, json.dumps({"items": [1, 2]}), request=request)
+
+    client = mock_session(coalesce=True)
+    client.token = "some_token"
+
+    results = []
+
+    def fetch(params=None):
+        try:
+            results.append(client.get("test/instance", params=params))
+        except exceptions.ScaleIOError as e:
+            results.append(e)
+
+    with HTTMock(request_payload):
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        threads.append(threading.Thread(target=fetch, args=({"a": 1},)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        fetch()
+        fetch()
+        if not error:
+            client.get("test/instance", coalesce=False)
+
+    assert sorted(c[0][0] for c in mock_handler.call_args_list) == \
+        sorted(["", "a=1", "", ""] + ([""] if not error else []))
+
+    assert len(results) == 11
+    if error:
+        assert all(isinstance(r, exceptions.ScaleIOError) for r in results)
+    else:
+        assert results == [{"items": [1, 2]}] * 11
+        assert len(set(id(r) for r in results)) == 11
+
+    stats = client.coalesce_stats
+    assert stats == {"requests": 4, "coalesced": 7}
+
+
+def test_session_token_store(mock_session, tmpdir):
+
+    calls = collections.Counter()
+
+    @httmock.urlmatch(path=r".*login")
+    def login(url, request):
+        calls["login"] += 1
+        return httmock.response(200,
+            json.dumps("token{0}".format(calls["login"])), request=request)
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        if request.headers["Authorization"] == _basic_auth("admin", "token1"):
+            if calls["expired"]:
+                return httmock.response(401, json.dumps({
+                    "message": "Unauthorized", "httpStatusCode": 401}), request=request)
+        return httmock.response(200, json.dumps({}), request=request)
+
+    store = pyscaleio.tokens.FileTokenStore(str(tmpdir.join("tokens.json")))
+
+    with HTTMock(login, request_payload):
+        first = mock_session(token_store=store)
+        first.get("test/instance")
+        assert first.token_stats["logins"] == 1
+        assert store.load("localhost", "admin")["token"] == "token1"
+
+        second = mock_session(token_store=store)
+        second.get("test/instance")
+        assert second.token == "token1"
+        assert second.token_stats["logins"] == 0
+        assert second.token_stats["restored"] == 1
+
+        other = mock_session("localhost", "other", "passwd", token_store=store)
+        other.get("test/instance")
+        assert other.token_stats["logins"] == 1
+
+        calls["expired"] = 1
+        third = mock_session(token_store=store)
+        third.get("test/instance")
+        assert third.token == "token3"
+        assert third.token_stats == {
+            "logins": 1, "renewals": 0, "refreshes": 1, "restored": 1}
+        assert store.load("localhost", "admin")["token"] == "token3"
+
+    with mock.patch("time.time", return_value=time.time() + 10 ** 6):
+        fourth = mock_session(token_store=store)
+        with HTTMock(login, request_payload):
+            fourth.get("test/instance")
+        assert fourth.token_stats["restored"] == 0
+
+    @httmock.urlmatch(path=r".*logout")
+    def logout(url, request):
+        return httmock.response(200, request=request)
+
+    with HTTMock(logout):
+        fourth.logout()
+    assert store.load("localhost", "admin") is None
+
+
+def test_session_rate_limiter(mock_session):
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        return httmock.response(200, json.dumps({}), request=request)
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=0):
+        limiter = pyscaleio.ratelimit.RateLimiter(
+            read_rate=10, read_burst=1, action_rate=1)
+        client = mock_session(rate_limiter=limiter)
+        client.token = "some_token"
+
+        with mock.patch("time.sleep") as sleep:
+            with HTTMock(request_payload):
+                for _ in range(3):
+                    client.get("test/instance")
+                client.post("test/instance", "{}")
+
+                with pyscaleio.deadline(0.5):
+                    with pytest.raises(exceptions.ScaleIODeadlineExceeded):
+                        client.post("test/instance", "{}")
+
+    assert sleep.call_args_list == [mock.call(0.1), mock.call(0.2)]
+    assert limiter.stats["read"]["delayed"] == 2
+    assert limiter.stats["action"]["acquired"] == 1
+
+
+def test_session_scheduler(mock_session):
+
+    active = collections.Counter()
+
+    @httmock.urlmatch(path=r"/api/test/instance")
+    def request_payload(url, request):
+        active["current"] += 1
+        active["max"] = max(active["max"], active["current"])
+        time.sleep(0.05)
+        active["current"] -= 1
+        return httmock.response(200, json.dumps({}), request=request)
+
+    client = mock_session(scheduler=pyscaleio.scheduler.RequestScheduler(max_concurrency=2))
+    client.token = "some_token"
+
+    def fetch(priority):
+        with pyscaleio.priority(priority):
+            client.get("test/instance")
+
+    with HTTMock(request_payload):
+        threads = [threading.Thread(target=fetch, args=(p,))
+            for p in ["background"] * 4 + ["interactive"] * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert active["max"] == 2
+    stats = client.scheduler.stats
+    assert stats["background"]["requests"] == 4
+    assert stats["interactive"]["requests"] == 2
+
+
+def stub_gateway(statuses=(), delay=0):
+    """Returns StubTransport of gateway that responds to requests with statuses."""
+
+    statuses = list(statuses)
+    active = collections.Counter()
+
+    def handler(request):
+        if request.path == "/api/login":
+            return 200, "some_token"
+
+        active["current"] += 1
+        active["max"] = max(active["max"], active["current"])
+        if delay:
+            time.sleep(delay)
+        active["current"] -= 1
+
+        status = statuses.pop(0) if statuses else 200
+        if status >= 400:
+            return status, {"message": "Error", "httpStatusCode": status, "errorCode": 0}
+        return status, {}
+
+    stub = StubTransport(handler)
+    stub.active = active
+    return stub
+
+
+def sent(stub, path="/api/test/instance"):
+    return [request for request in stub.requests if request.path == path]
+
+
+def concurrently(function, count):
+    threads = [threading.Thread(target=function) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def check_pool_options(mock_session, transport):
+    http = mock_session()._ScaleIOSession__transport
+    if isinstance(http, Urllib3Transport):
+        assert http.pool.connection_pool_kw["maxsize"] == 3
+        assert http.pool.connection_pool_kw["block"] is True
+    else:
+        adapter = http.session.get_adapter("https://localhost/api/")
+        assert (adapter._pool_maxsize, adapter._pool_block, adapter.keep_alive) == (3, True, False)
+
+    stub = stub_gateway()
+    mock_session(transport=stub).get("test/instance")
+    assert sent(stub)[0].headers["Connection"] == "close"
+
+
+def check_compression(mock_session, transport):
+    stub = stub_gateway()
+    mock_session(transport=stub).get("test/instance")
+    assert sent(stub)[0].headers["Accept-Encoding"] == "identity"
+
+
+def check_token_renewal(mock_session, transport):
+    stub = stub_gateway()
+    client = mock_session(transport=stub)
+    now = [0]
+    with mock.patch("pyscaleio.utils.monotonic", side_effect=lambda: now[0]):
+        client.get("test/instance")
+        now[0] = 30
+        client.get("test/instance")
+    assert len(sent(stub, "/api/login")) == 2
+
+
+def check_connect_timeout(mock_session, transport):
+    stub = stub_gateway()
+    mock_session(transport=stub).get("test/instance")
+    assert sent(stub)[0].timeout[0] == 1
+
+
+def check_network_timeout(mock_session, transport):
+    stub = stub_gateway()
+    mock_session(transport=stub).get("test/instance")
+    assert sent(stub)[0].timeout[1] == 3
+
+
+def check_request_retries(mock_session, transport):
+    stub = stub_gateway([503, 503, 503])
+    client = mock_session(transport=stub)
+    assert client.retry_policy.retries == 2
+
+    with mock.patch("time.sleep"):
+        with pytest.raises(exceptions.ScaleIOError):
+            client.get("test/instance")
+    assert len(sent(stub)) == 2
+
+
+def check_circuit_breaker(mock_session, transport):
+    stub = stub_gateway([503])
+    client = mock_session(transport=stub,
+        retry_policy=pyscaleio.retry.RetryPolicy(retries=1, budget=False))
+    threads = threading.active_count()
+
+    with pytest.raises(exceptions.ScaleIOError):
+        client.get("test/instance")
+    assert client.gateway_stats["localhost"]["healthy"] is False
+    with pytest.raises(exceptions.ScaleIOCircuitOpenError):
+        client.get("test/instance")
+    assert len(sent(stub)) == 1
+    assert threading.active_count() == threads
+
+
+def check_coalesce(mock_session, transport):
+    stub = stub_gateway(delay=0.2)
+    client = mock_session(transport=stub)
+    client.token = "some_token"
+
+    concurrently(lambda: client.get("test/instance"), 4)
+    assert len(sent(stub)) == 1
+
+
+def check_rate_limit(mock_session, transport):
+    stub = stub_gateway()
+    with mock.patch("pyscaleio.utils.monotonic", return_value=0):
+        client = mock_session(transport=stub)
+        client.token = "some_token"
+        with mock.patch("time.sleep") as sleep:
+            for _ in range(3):
+                client.get("test/instance")
+    assert sleep.call_args_list == [mock.call(0.5)]
+
+
+def check_scheduler(mock_session, transport):
+    stub = stub_gateway(delay=0.05)
+    client = mock_session(transport=stub)
+    client.token = "some_token"
+
+    concurrently(lambda: client.get("test/instance"), 3)
+    assert stub.active["max"] == 1
+
+
+@pytest.mark.parametrize(("options", "check"), [
+    ({"transport": "requests", "pool_maxsize": 3, "pool_block": True, "keep_alive": False},
+        check_pool_options),
+    ({"transport": "urllib3", "pool_maxsize": 3, "pool_block": True, "keep_alive": False},
+        check_pool_options),
+    ({"compression": False}, check_compression),
+    ({"token_lifetime": 10, "token_idle_timeout": 0}, check_token_renewal),
+    ({"connect_timeout": 1}, check_connect_timeout),
+    ({"network_timeout": 3}, check_network_timeout),
+    ({"request_retries": 2}, check_request_retries),
+    ({"breaker_failure_threshold": 1, "gateway_down_timeout": 5, "breaker_probe": False},
+        check_circuit_breaker),
+    ({"coalesce_requests": True}, check_coalesce),
+    ({"read_rate_limit": 2}, check_rate_limit),
+    ({"max_concurrent_requests": 1, "scheduler_aging": 0}, check_scheduler),
+])
+def test_session_configure(mock_session, configure, options, check):
+    """Options configured after import change behaviour of new sessions."""
+
+    configure(**options)
+    check(mock_session, options.get("transport"))
 
 
 def test_session_send_request_with_login(mock_session):
@@ -330,6 +1152,47 @@ def test_client_getters(mock_client):
         assert isinstance(result, list)
 
 
+def test_client_get_instances_stream(mock_client):
+
+    client = mock_client()
+
+    payload = [{"id": str(i), "name": None} for i in range(3)]
+    instances_of_payload = mock_instances_payload("Resource", payload)
+
+    with HTTMock(login_payload, instances_of_payload):
+        result = client.get_instances_of("Resource", stream=True)
+        assert not isinstance(result, list)
+        assert next(result) == {"id": "0"}
+        assert list(result) == [{"id": "1"}, {"id": "2"}]
+
+    @httmock.urlmatch(path=r".*/api/types/Resource/instances")
+    def malformed_payload(url, request):
+        return httmock.response(200, '[{"id": "0"}, {"id"', request=request)
+
+    with HTTMock(malformed_payload):
+        result = client.get_instances_of("Resource", stream=True)
+        assert next(result) == {"id": "0"}
+        with pytest.raises(exceptions.ScaleIOMalformedError):
+            next(result)
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_client_codec(mock_client, name):
+
+    pytest.importorskip(name)
+
+    @httmock.urlmatch(path=r".*/types/Volume/instances", method="post")
+    def create_instance_payload(url, request):
+        assert json.loads(psys.u(request.body)) == {"name": "test_volume"}
+        return httmock.response(201, {"id": "test"}, request=request)
+
+    client = mock_client(codec=pyscaleio.codec.get_codec(name))
+    assert client.session.codec.name == name
+
+    with HTTMock(login_payload, create_instance_payload):
+        assert client.create_instance_of("Volume", {"name": "test_volume"}) == "test"
+
+
 def test_client_create_instance(mock_client):
 
     client = mock_client()
@@ -0,0 +1,55 @@
+from __future__ import unicode_literals
+
+import mock
+import psys
+import pytest
+
+from pyscaleio import codec
+from pyscaleio import exceptions
+
+
+def available_codecs():
+    for klass in codec.CODECS:
+        try:
+            klass()
+        except ImportError:
+            yield pytest.param(klass, marks=pytest.mark.skip(
+                reason="{0} is not installed".format(klass.name)))
+        else:
+            yield klass
+
+
+@pytest.mark.parametrize("klass", list(available_codecs()))
+def test_codec_roundtrip(klass):
+
+    instance = klass()
+    payload = [{"id": "1", "name": "том", "sizeInKb": 8388608,
+                "useRmcache": False, "ancestorVolumeId": None}]
+
+    data = instance.dumps(payload)
+    assert instance.loads(data) == payload
+    assert instance.loads(psys.b(data)) == payload
+    assert instance.loads(psys.u(data)) == payload
+
+    with pytest.raises(ValueError):
+        instance.loads(b"<?xml version='1.0' encoding='UTF-8'?>")
+
+
+def test_get_codec():
+
+    assert isinstance(codec.get_codec("json"), codec.JSONCodec)
+    assert type(codec.get_codec("json")) is codec.JSONCodec
+
+    with pytest.raises(exceptions.ScaleIOInvalidParameters):
+        codec.get_codec("unknown")
+
+    modules = dict.fromkeys(["orjson", "simdjson", "ujson"])
+    with mock.patch.dict("sys.modules", modules):
+        assert type(codec.get_codec()) is codec.JSONCodec
+
+    try:
+        import orjson  # noqa
+    except ImportError:
+        pass
+    else:
+        assert type(codec.get_codec()) is codec.OrjsonCodec
@@ -25,3 +25,22 @@ def test_config_apply():
 
         with pytest.raises(exceptions.ScaleIOConfigError):
             pyscaleio.configure(unexist_field="value")
+
+
+@pytest.mark.parametrize("options", [
+    {"network_timeout": 0},
+    {"connect_timeout": 0},
+    {"breaker_recovery_timeout": 0},
+    {"retry_backoff_factor": -0.5},
+    {"retry_budget_ratio": -0.1},
+    {"retry_budget_ratio": 1.5},
+    {"log_body_sample_rate": 2.0},
+    {"response_cache_ttl": {"Volume": -1}},
+])
+def test_config_bounds(options):
+
+    with mock.patch("pyscaleio.config", autospec=True):
+        with pytest.raises(exceptions.ScaleIOConfigError):
+            pyscaleio.configure(**options)
+
+        pyscaleio.configure(retry_budget_ratio=0.5, log_body_sample_rate=0.0)
@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from pyscaleio import Inventory
+from pyscaleio.models import ProtectionDomain, Sdc, StoragePool, System, Volume, VTree
+
+
+def test_inventory_fetch(gateway, client):
+
+    inventory = Inventory.fetch(client=client)
+    assert gateway.stats["requests"] == 2  # login and instances
+
+    assert list(inventory) == [
+        "System", "ProtectionDomain", "StoragePool", "VTree", "Sdc", "Volume"]
+    assert isinstance(inventory.system, System)
+    assert inventory.system["id"] == gateway.cluster.system["id"]
+    assert len(inventory.protection_domains) == 1
+    assert len(inventory.storage_pools) == 2
+    assert len(inventory.vtrees) == 10
+    assert len(inventory.sdcs) == 2
+    assert len(inventory.volumes) == 10
+    assert all(isinstance(volume, Volume) for volume in inventory[Volume])
+
+    volume = inventory.volumes[5]
+    assert inventory.one(Volume, volume["id"]) is volume
+    assert inventory.one("StoragePool", volume["storagePoolId"])["id"] == volume["storagePoolId"]
+    with pytest.raises(KeyError):
+        inventory.one(Volume, "unknown")
+
+
+def test_inventory_fetch_missing(client):
+
+    payload = {
+        "System": client.get_instances_of("System")[0],
+        "protectionDomainList": client.get_instances_of("ProtectionDomain"),
+        "volumeList": [],
+    }
+
+    with mock.patch.object(client, "get_all_instances", return_value=payload), \
+            mock.patch.object(client, "get_instances_of", wraps=client.get_instances_of) as m:
+        inventory = Inventory.fetch(client=client)
+
+    assert sorted(c[0][0] for c in m.call_args_list) == ["Sdc", "StoragePool", "VTree"]
+    assert len(inventory[ProtectionDomain]) == 1
+    assert len(inventory[StoragePool]) == 2
+    assert len(inventory[VTree]) == 10
+    assert len(inventory[Sdc]) == 2
+    assert inventory[Volume] == ()
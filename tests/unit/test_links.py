@@ -0,0 +1,88 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from pyscaleio import exceptions
+from pyscaleio import links
+from pyscaleio import simulator
+from pyscaleio import ScaleIOClient
+from pyscaleio.models import StoragePool, Volume
+
+
+def test_links_follow(gateway, client):
+
+    volumes = Volume.all(client=client)
+    link = volumes[0].links[0]
+    assert isinstance(link, links.Link)
+    assert link == {"rel": links.SELF, "href": "/api/instances/Volume::" + volumes[0]["id"]}
+    assert volumes[0].follow(links.SELF)["name"] == volumes[0].name
+
+    requests = gateway.stats["requests"]
+    pools = [volume.follow(links.PARENT_REL.format(field="storagePoolId"))
+        for volume in volumes]
+    assert pools[0]["id"] == volumes[0]["storagePoolId"]
+    assert not any(pool.resolved for pool in pools)
+    assert gateway.stats["requests"] == requests
+
+    # All pending storage pools are fetched with single request
+    assert pools[0].name == StoragePool(volumes[0]["storagePoolId"], client=client).name
+    assert all(pool.resolved for pool in pools)
+    assert isinstance(pools[-1].resolve(), StoragePool)
+    assert dict(pools[-1]) == dict(StoragePool(pools[-1]["id"], client=client))
+    assert gateway.stats["requests"] == requests + 3
+
+    with pytest.raises(exceptions.ScaleIOInvalidParameters):
+        volumes[0].follow("/api/parent/relationship/unknownId")
+
+
+def test_links_follow_error(gateway, client):
+
+    volumes = Volume.all(client=client)
+    references = [volume.follow(links.SELF) for volume in volumes[:2]]
+    gateway.cluster.remove("Volume", volumes[0]["id"])
+
+    with pytest.raises(exceptions.ScaleIOError):
+        references[0].resolve()
+    assert references[1].name == volumes[1].name
+
+
+def test_links_related(gateway, client):
+
+    pools = StoragePool.all(client=client)
+    volumes = Volume.all(client=client)
+
+    requests = gateway.stats["requests"]
+    related = [pool.related("Volume") for pool in pools]
+    assert not related[0].resolved
+    # Pending collections are fetched with request per collection
+    assert sorted(v["id"] for r in related for v in r) == sorted(v["id"] for v in volumes)
+    assert gateway.stats["requests"] == requests + len(pools)
+    assert all(isinstance(volume, Volume) for volume in related[1])
+    assert all(volume["storagePoolId"] == pools[1]["id"] for volume in related[1])
+
+    single = pools[0].follow(links.RELATED_REL.format(resource="StoragePool", related="Volume"))
+    assert isinstance(single, links.LazyRelated)
+    assert [v["id"] for v in single] == [v["id"] for v in related[0]]
+    assert gateway.stats["requests"] == requests + len(pools) + 1
+
+
+def test_links_related_subset():
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=40, pools=8))
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway))
+
+    pools = StoragePool.all(client=client)
+    requests = gateway.stats["requests"]
+    related = [pool.related("Volume") for pool in pools[:2]]
+    related.append(pools[0].related("Volume"))
+
+    # Volumes of other pools aren't listed, the same pool is requested once
+    assert len(related[0]) + len(related[1]) == 10
+    assert gateway.stats["requests"] == requests + 2
+    assert [v["id"] for v in related[2]] == [v["id"] for v in related[0]]
+
+    pending = pools[2].related("Volume")
+    gateway.cluster.remove("StoragePool", pools[2]["id"])
+    with pytest.raises(exceptions.ScaleIOError):
+        pending.resolve()
@@ -16,6 +16,7 @@ from six import text_type as str
 import pyscaleio
 from pyscaleio import constants
 from pyscaleio import exceptions
+from pyscaleio import simulator
 
 from pyscaleio import ScaleIOClient
 from pyscaleio.manager import ScaleIOClientsManager
@@ -281,6 +282,144 @@ def test_model_all(client, modelklass):
         assert sorted(["test1", "test2"]) == sorted(v["id"] for v in volumes)
 
 
+def test_model_iter_all(client, modelklass):
+
+    klass = modelklass("Volume", (BaseResource,), {
+        "__scheme__": {
+            "name": String(optional=True)
+        }
+    })
+    payload = [{
+        "id": "test{0}".format(i),
+        "name": "test_volume{0}".format(i)
+    } for i in range(1, 3 + 1)]
+    volumes_payload = mock_resources_get("Volume", payload)
+
+    with httmock.HTTMock(login_payload, volumes_payload):
+        volumes = klass.iter_all()
+        assert not isinstance(volumes, list)
+
+        volume = next(volumes)
+        assert isinstance(volume, klass)
+        assert volume["id"] == "test1"
+        assert [v["id"] for v in volumes] == ["test2", "test3"]
+
+    with mock.patch(
+        "pyscaleio.ScaleIOClient.perform_action_on_type",
+        side_effect=[payload[1:2]]
+    ) as m:
+        volumes = list(klass.iter_all(instance_ids="test2"))
+        m.assert_called_once_with(
+            "Volume", "queryBySelectedIds", {"ids": ["test2"]})
+        assert [v["id"] for v in volumes] == ["test2"]
+
+
+def test_model_iter_all_early_termination(client, modelklass):
+
+    klass = modelklass("Volume", (BaseResource,), {})
+    consumed, closed = [], []
+
+    def get_instances_of(resource, **kwargs):
+        try:
+            for i in range(100):
+                consumed.append(i)
+                yield {"id": "test{0}".format(i)}
+        finally:
+            closed.append(resource)
+
+    with mock.patch("pyscaleio.ScaleIOClient.get_instances_of",
+                    side_effect=get_instances_of):
+        volumes = klass.iter_all()
+        assert [next(volumes)["id"] for _ in range(2)] == ["test0", "test1"]
+        volumes.close()
+
+    assert consumed == [0, 1]
+    assert closed == ["Volume"]
+
+    def mocked_action(name, action, args):
+        return [{"id": instance_id} for instance_id in args["ids"]]
+
+    instance_ids = ("test{0}".format(i) for i in range(10))
+    with mock.patch(
+        "pyscaleio.ScaleIOClient.perform_action_on_type",
+        side_effect=mocked_action
+    ) as m, mock.patch("pyscaleio.config.QUERY_CHUNK_SIZE", 3):
+        volumes = klass.iter_all(instance_ids=instance_ids)
+        assert m.call_count == 0
+
+        assert [next(volumes)["id"] for _ in range(4)] == ["test0", "test1", "test2", "test3"]
+        assert m.call_count == 2
+        m.assert_called_with("Volume", "queryBySelectedIds", {"ids": ["test3", "test4", "test5"]})
+        volumes.close()
+
+    assert m.call_count == 2
+    assert next(instance_ids) == "test6"
+
+
+def test_model_iter_all_prefetch():
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=10, pools=2))
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway))
+
+    with mock.patch("pyscaleio.config.QUERY_CHUNK_SIZE", 4):
+        volumes = Volume.iter_all(client=client, prefetch=["storagePoolId"])
+        volume = next(volumes)
+        # login, volumes and storage pools of the first chunk
+        assert gateway.stats["requests"] == 3
+        assert volume.parent("storagePoolId")["id"] == volume["storagePoolId"]
+
+        volumes = [volume] + list(volumes)
+        assert len(volumes) == 10
+        assert gateway.stats["requests"] == 5
+        assert all(v.parent("storagePoolId")["id"] == v["storagePoolId"] for v in volumes)
+        assert gateway.stats["requests"] == 5
+
+
+def test_model_deadline(client, modelklass):
+
+    klass = modelklass("Volume", (BaseResource,), {})
+    deadlines = []
+
+    def get_instances_of(resource, **kwargs):
+        deadlines.append(pyscaleio.utils.get_deadline())
+        return iter([{"id": "test1"}, {"id": "test2"}])
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=1000):
+        with mock.patch("pyscaleio.ScaleIOClient.get_instances_of",
+                        side_effect=get_instances_of):
+            assert len(klass.all(deadline=5)) == 2
+            assert len(klass.all()) == 2
+
+            volumes = klass.iter_all(deadline=10)
+            assert pyscaleio.utils.get_deadline() is None
+            assert [v["id"] for v in volumes] == ["test1", "test2"]
+
+            with pyscaleio.deadline(3):
+                klass.all(deadline=5)
+
+    assert deadlines == [1005, None, 1010, 1003]
+
+
+def test_model_priority(client, modelklass):
+
+    klass = modelklass("Volume", (BaseResource,), {})
+    priorities = []
+
+    def get_instances_of(resource, **kwargs):
+        priorities.append(pyscaleio.scheduler.get_priority())
+        return iter([{"id": "test1"}])
+
+    with mock.patch("pyscaleio.ScaleIOClient.get_instances_of",
+                    side_effect=get_instances_of):
+        klass.all(priority="interactive")
+        list(klass.iter_all(priority="background"))
+        with pyscaleio.priority("background"):
+            klass.all()
+
+    assert priorities == ["interactive", "background", "background"]
+
+
 def test_model_all_by_ids(client, modelklass):
 
     klass = modelklass("Volume", (BaseResource,), {
@@ -308,6 +447,104 @@ def test_model_all_by_ids(client, modelklass):
         assert volumes[0]["id"] == "test2"
 
 
+def test_model_all_by_ids_chunked(client, modelklass):
+
+    klass = modelklass("Volume", (BaseResource,), {})
+    payload = dict(("test{0}".format(i), {"id": "test{0}".format(i)}) for i in range(10))
+
+    def mocked_action(name, action, args):
+        if "test7" in args["ids"]:
+            raise exceptions.ScaleIOError(500, "Could not find the volume", 3)
+        # Gateway doesn't keep order of ids
+        return [payload[instance_id] for instance_id in reversed(args["ids"])
+            if instance_id in payload]
+
+    instance_ids = ["test{0}".format(i) for i in (5, 1, 1, 3, 9, 0, 2, 8, 4)]
+    with mock.patch(
+        "pyscaleio.ScaleIOClient.perform_action_on_type",
+        side_effect=mocked_action
+    ) as m, mock.patch("pyscaleio.config.QUERY_CHUNK_SIZE", 3):
+        volumes = klass.all(instance_ids=instance_ids)
+        assert m.call_count == 3
+        assert [v["id"] for v in volumes] == \
+            ["test5", "test1", "test1", "test3", "test9", "test0", "test2", "test8", "test4"]
+
+        with pytest.raises(exceptions.ScaleIOQueryError) as e:
+            klass.all(instance_ids=["test0", "test1", "test7", "test2"])
+        assert e.value.status_code == 500
+        assert e.value.failed_ids == ["test0", "test1", "test7"]
+        assert [i["id"] for i in e.value.instances] == ["test2"]
+
+        with pytest.raises(exceptions.ScaleIOQueryError) as e:
+            klass.all(instance_ids=["test0", "unknown", "test0"])
+        assert e.value.missing_ids == ["unknown"]
+        assert e.value.errors == []
+        assert [i["id"] for i in e.value.instances] == ["test0", "test0"]
+
+
+def test_model_prefetch():
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=30, pools=3, domains=2))
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway))
+
+    volumes = Volume.all(client=client,
+        prefetch=["storagePoolId.protectionDomainId", "vtreeId", "ancestorVolumeId"])
+    # login, volumes, storage pools, vtrees and protection domains
+    assert gateway.stats["requests"] == 5
+
+    for volume in volumes:
+        pool = volume.parent("storagePoolId")
+        assert isinstance(pool, StoragePool)
+        assert pool["id"] == volume["storagePoolId"]
+        assert pool.parent("protectionDomainId")["id"] == pool["protectionDomainId"]
+        assert volume.parent("vtreeId")["id"] == volume["vtreeId"]
+        assert volume.parent("ancestorVolumeId") is None
+    assert len(set(id(volume.parent("storagePoolId")) for volume in volumes)) == 3
+    assert gateway.stats["requests"] == 5
+
+    volume = Volume.all(client=client, instance_ids=[volumes[0]["id"]])[0]
+    assert volume.parent("storagePoolId") is volume.parent("storagePoolId")
+    assert gateway.stats["requests"] == 7
+
+    with pytest.raises(exceptions.ScaleIOInvalidParameters):
+        volume.parent("systemId")
+    with pytest.raises(exceptions.ScaleIOInvalidParameters):
+        Volume.all(client=client, prefetch=["storagePoolId.unknownId"])
+
+
+def test_model_prefetch_dangling_parent():
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=10, pools=2))
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        adapter=simulator.SimulatorAdapter(gateway))
+    removed = StoragePool.all(client=client)[0]["id"]
+    perform_action_on_type = client.perform_action_on_type
+
+    def query(resource, action, data):
+        # Storage pool is removed between listing of volumes and prefetch
+        return [instance for instance in perform_action_on_type(resource, action, data)
+            if instance["id"] != removed]
+
+    with mock.patch.object(client, "perform_action_on_type", side_effect=query):
+        volumes = Volume.all(client=client, prefetch=["storagePoolId"])
+    assert len(volumes) == 10
+
+    requests = gateway.stats["requests"]
+    orphans = [volume for volume in volumes if volume["storagePoolId"] == removed]
+    assert orphans and "storagePoolId" not in orphans[0]._parents
+    assert all("storagePoolId" in volume._parents
+        for volume in volumes if volume["storagePoolId"] != removed)
+    assert orphans[0].parent("storagePoolId")["id"] == removed
+    assert gateway.stats["requests"] == requests + 1
+
+    error = exceptions.ScaleIOQueryError(
+        "StoragePool", [], [([removed], exceptions.ScaleIOError(500, "Failed"))], 2)
+    with mock.patch.object(client, "perform_action_on_type", side_effect=error):
+        with pytest.raises(exceptions.ScaleIOQueryError):
+            Volume.all(client=client, prefetch=["storagePoolId"])
+
+
 def test_volume_model(client):
 
     volume_payload = mock_resource_get(Volume._get_name(), "test",
@@ -0,0 +1,47 @@
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from pyscaleio import exceptions
+from pyscaleio.ratelimit import RateLimiter, TokenBucket
+
+
+def test_token_bucket():
+
+    clock = [0]
+    with mock.patch("pyscaleio.utils.monotonic", side_effect=lambda: clock[0]):
+        bucket = TokenBucket(rate=2, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0.5
+        assert bucket.reserve() == 1
+
+        with pytest.raises(exceptions.ScaleIODeadlineExceeded):
+            bucket.reserve(deadline=1)
+
+        clock[0] = 10
+        assert bucket.reserve(deadline=10) == 0
+
+    assert bucket.stats == {
+        "acquired": 5, "delayed": 2, "wait_time": 1.5, "max_wait_time": 1}
+
+
+def test_token_bucket_acquire():
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=0):
+        bucket = TokenBucket(rate=4, burst=1)
+        with mock.patch("time.sleep") as sleep:
+            assert bucket.acquire() == 0
+            assert bucket.acquire() == 0.25
+    sleep.assert_called_once_with(0.25)
+
+
+def test_rate_limiter():
+
+    limiter = RateLimiter(read_rate=0, action_rate=10)
+    assert limiter.read is None
+    assert limiter.acquire("get") == 0
+    assert limiter.acquire("post") == 0
+    assert limiter.stats == {"action": {
+        "acquired": 1, "delayed": 0, "wait_time": 0, "max_wait_time": 0}}
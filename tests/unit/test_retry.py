@@ -0,0 +1,101 @@
+from __future__ import unicode_literals
+
+import mock
+import pytest
+import requests
+
+from pyscaleio import retry
+
+
+@pytest.mark.parametrize(("method", "kw", "result"), [
+    ("get", {"status_code": 503}, True),
+    ("get", {"status_code": 500}, False),
+    ("post", {"status_code": 503}, False),
+    ("get", {"exc": requests.ConnectionError()}, True),
+    ("post", {"exc": requests.ConnectionError()}, False),
+    ("post", {"exc": requests.ConnectTimeout()}, True),
+    ("get", {"exc": ValueError()}, False),
+])
+def test_policy_is_retryable(method, kw, result):
+
+    assert retry.RetryPolicy().is_retryable(method, **kw) is result
+
+
+@pytest.mark.parametrize(("attempt", "limit"), [
+    (1, 0.5), (2, 1), (3, 2), (10, 10),
+])
+def test_policy_backoff(attempt, limit):
+
+    policy = retry.RetryPolicy(backoff_factor=0.5, backoff_max=10)
+    with mock.patch("random.uniform", side_effect=lambda a, b: b) as m:
+        assert policy.backoff(attempt) == limit
+    m.assert_called_once_with(0, limit)
+
+
+def test_policy_delay():
+
+    policy = retry.RetryPolicy(retries=3, backoff_factor=0, budget=False)
+    endpoint = "GET /api/test"
+
+    policy.started(endpoint)
+    assert policy.delay(endpoint, 1) == 0
+    assert policy.delay(endpoint, 2) == 0
+    assert policy.delay(endpoint, 3) is None
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=100):
+        assert policy.delay(endpoint, 1, deadline=100) is None
+        assert policy.delay(endpoint, 1, deadline=101) == 0
+
+    assert policy.stats.as_dict() == {endpoint: {
+        "requests": 1, "retries": 3, "exhausted": 2, "denied": 0
+    }}
+
+
+def test_retry_budget():
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=0):
+        budget = retry.RetryBudget(ratio=0.5, min_per_second=1, capacity=2)
+        assert budget.withdraw()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+
+        budget.deposit()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert budget.withdraw()
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=10):
+        assert budget.balance == 2
+
+    policy = retry.RetryPolicy(backoff_factor=0, budget=budget)
+    with mock.patch("pyscaleio.utils.monotonic", return_value=10):
+        assert policy.delay("GET /api/test", 1) == 0
+        assert policy.delay("GET /api/test", 1) == 0
+        assert policy.delay("GET /api/test", 1) is None
+    assert policy.stats.as_dict()["GET /api/test"]["denied"] == 1
+
+
+def test_retry_configure():
+
+    with mock.patch.multiple("pyscaleio.config", RETRY_BACKOFF_FACTOR=2, RETRY_BACKOFF_MAX=3,
+                             RETRY_BUDGET_RATIO=0.5, RETRY_BUDGET_MIN_PER_SECOND=2):
+        policy = retry.RetryPolicy()
+    assert (policy.backoff_factor, policy.backoff_max) == (2, 3)
+    assert (policy.budget.ratio, policy.budget.min_per_second) == (0.5, 2)
+    assert policy.budget.capacity == 20
+
+
+def test_retry_shared_budget():
+
+    with mock.patch("pyscaleio.utils.monotonic", return_value=0):
+        policies = [retry.RetryPolicy(retries=3, backoff_factor=0) for _ in range(3)]
+        assert policies[0].budget is policies[1].budget is retry.shared_budget()
+
+        # Sessions retry within single budget during gateway-wide outage
+        capacity = policies[0].budget.capacity
+        retries = [policy.delay("GET /api/test", 1) for policy in policies * capacity]
+    assert len([delay for delay in retries if delay is not None]) == capacity
+
+    assert retry.RetryPolicy(budget=False).budget is False
+    with mock.patch("pyscaleio.config.RETRY_BUDGET_RATIO", 0.5):
+        assert retry.RetryPolicy().budget is not policies[0].budget
@@ -0,0 +1,94 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import mock
+import pytest
+
+from pyscaleio import exceptions
+from pyscaleio import scheduler
+from pyscaleio import utils
+
+
+def test_priority_context():
+
+    assert scheduler.get_priority() == scheduler.NORMAL
+    with scheduler.priority(scheduler.BACKGROUND):
+        assert scheduler.get_priority() == scheduler.BACKGROUND
+        with scheduler.priority(None):
+            assert scheduler.get_priority() == scheduler.BACKGROUND
+        with scheduler.priority(scheduler.INTERACTIVE):
+            assert scheduler.get_priority() == scheduler.INTERACTIVE
+    assert scheduler.get_priority() == scheduler.NORMAL
+
+    with pytest.raises(exceptions.ScaleIOInvalidParameters):
+        with scheduler.priority("urgent"):
+            pass
+
+
+def test_scheduler_max_concurrency():
+
+    assert pytest.raises(exceptions.ScaleIOInvalidParameters, scheduler.RequestScheduler)
+
+    with mock.patch("pyscaleio.config.MAX_CONCURRENT_REQUESTS", 3):
+        sched = scheduler.RequestScheduler()
+    assert sched.max_concurrency == 3
+    assert sched.limits[scheduler.BACKGROUND] == 1
+
+
+def test_scheduler_order():
+
+    sched = scheduler.RequestScheduler(max_concurrency=1, aging=0)
+    order = []
+
+    def worker(name):
+        with scheduler.priority(name):
+            with sched.slot():
+                order.append(name)
+
+    blocker = sched.acquire()
+
+    threads = []
+    for name in (scheduler.BACKGROUND, scheduler.NORMAL, scheduler.INTERACTIVE):
+        thread = threading.Thread(target=worker, args=(name,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+
+    sched.release(blocker)
+    for thread in threads:
+        thread.join()
+
+    assert order == [scheduler.INTERACTIVE, scheduler.NORMAL, scheduler.BACKGROUND]
+
+    stats = sched.stats
+    assert stats[scheduler.NORMAL]["requests"] == 2
+    assert stats[scheduler.BACKGROUND]["delayed"] == 1
+    assert all(s["active"] == 0 for s in stats.values())
+
+
+def test_scheduler_class_limit():
+
+    sched = scheduler.RequestScheduler(max_concurrency=2,
+        limits={scheduler.BACKGROUND: 1})
+
+    with scheduler.priority(scheduler.BACKGROUND):
+        slot = sched.acquire()
+        with pytest.raises(exceptions.ScaleIODeadlineExceeded):
+            sched.acquire(deadline=utils.monotonic() + 0.05)
+
+    with sched.slot():
+        pass
+    sched.release(slot)
+
+
+def test_scheduler_aging():
+
+    sched = scheduler.RequestScheduler(max_concurrency=1, aging=1)
+    now = utils.monotonic()
+    old = (scheduler.BACKGROUND, 0, now - 5)
+    new = (scheduler.INTERACTIVE, 1, now)
+
+    urgency = sched._RequestScheduler__urgency
+    assert urgency(old, now) < urgency(new, now)
@@ -0,0 +1,177 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from pyscaleio import constants
+from pyscaleio import exceptions
+from pyscaleio import simulator
+from pyscaleio import ScaleIOClient
+from pyscaleio.models import ProtectionDomain, Sdc, StoragePool, System, Volume, VTree
+
+
+def test_simulator_generate():
+
+    cluster = simulator.Cluster.generate(volumes=100, pools=4, domains=2, sdcs=10)
+    instances = cluster.instances
+
+    assert len(instances["System"]) == 1
+    assert len(instances["ProtectionDomain"]) == 2
+    assert len(instances["StoragePool"]) == 4
+    assert len(instances["Sdc"]) == 10
+    assert len(instances["Volume"]) == 100
+    assert len(instances["VTree"]) == 100
+    assert sum(1 for volume in instances["Volume"].values() if volume["mappedSdcInfo"]) == 50
+
+    ids = [instance_id for name in instances for instance_id in instances[name]]
+    assert len(ids) == len(set(ids))
+
+
+def test_simulator_models(client):
+
+    assert System.all()[0].is_restricted is False
+    assert len(ProtectionDomain.all()) == 1
+    assert len(StoragePool.all()) == 2
+    assert len(Sdc.all_approved()) == 2
+    assert len(VTree.all()) == 10
+
+    volumes = Volume.all()
+    assert len(volumes) == 10
+    assert [v["id"] for v in Volume.iter_all()] == [v["id"] for v in volumes]
+    assert Volume.all(instance_ids=[volumes[1]["id"]])[0].name == "volume1"
+
+    volume = Volume.one_by_name("volume3")
+    assert volume["id"] == volumes[3]["id"]
+    assert volume.size == 8 * constants.GIGABYTE
+    assert {"rel": "/api/parent/relationship/storagePoolId",
+            "href": "/api/instances/StoragePool::" + volume["storagePoolId"]} in volume.links
+
+    sdc = Sdc.all()[0]
+    assert Sdc.one_by_ip(sdc.ip)["id"] == sdc["id"]
+
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        Volume("unknown")
+    assert e.value.status_code == 500
+    assert e.value.error_code == simulator.NOT_FOUND_ERROR_CODE
+
+
+def test_simulator_volume_lifecycle(client):
+
+    pool = StoragePool.all()[0]
+    sdc = Sdc.all()[-1]
+
+    volume = pool.create_volume(4, name="test")
+    assert volume.size == 8 * constants.GIGABYTE
+    assert volume.type == constants.VOLUME_TYPE_THIN
+
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        volume.resize(10)
+    assert e.value.status_code == 400
+    volume.resize(16)
+    volume.rename("renamed")
+    volume.update()
+    assert volume.size == 16 * constants.GIGABYTE
+    assert volume.name == "renamed"
+
+    volume.export(sdc_id=sdc["id"])
+    with pytest.raises(exceptions.ScaleIOError):
+        volume.export(sdc_guid=sdc.guid)
+    volume.throttle(sdc_id=sdc["id"], iops=1000, mbps=2)
+    volume.update()
+    assert volume.exports[0] == {
+        "sdcId": sdc["id"], "sdcIp": sdc.ip, "limitIops": 1000, "limitBwInMbps": 2}
+
+    snapshot = volume.snapshot(name="snapshot")
+    assert snapshot.type == constants.VOLUME_TYPE_SNAPSHOT
+    assert snapshot["ancestorVolumeId"] == volume["id"]
+    assert snapshot["vtreeId"] == volume["vtreeId"]
+
+    with pytest.raises(exceptions.ScaleIOError):
+        volume.delete()
+    volume.unexport()
+    volume.delete(constants.VOLUME_REMOVE_DESCENDANTS)
+
+    for instance in (volume, snapshot):
+        with pytest.raises(exceptions.ScaleIOError):
+            instance.update()
+    with pytest.raises(exceptions.ScaleIOError):
+        VTree(volume["vtreeId"])
+
+
+def test_simulator_storage_pool(client):
+
+    domain = ProtectionDomain.all()[0]
+
+    pool = StoragePool.create(domain["id"], name="pool")
+    assert pool.checksum_enabled is False
+    assert StoragePool.one_by_name("pool", domain.name)["id"] == pool["id"]
+
+    volume = pool.create_volume(8)
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        pool.delete()
+    assert "Storage Pool has volumes" in str(e.value)
+
+    volume.delete()
+    pool.delete()
+    with pytest.raises(exceptions.ScaleIOError):
+        pool.update()
+
+
+def test_simulator_relationships(gateway, client):
+
+    pool = StoragePool.all(client=client)[0]
+
+    status, volumes = gateway.handle("GET",
+        "/api/instances/StoragePool::{0}/relationships/Volume".format(pool["id"]),
+        auth=("admin", client.session.token))
+    assert status == 200
+    assert sorted(v["id"] for v in volumes) == \
+        sorted(v["id"] for v in Volume.all(client=client) if v["storagePoolId"] == pool["id"])
+
+    instances = client.get_all_instances()
+    assert instances["System"]["id"] == client.system["id"]
+    assert len(instances["volumeList"]) == 10
+
+
+def test_simulator_auth(gateway, client):
+
+    assert gateway.handle("GET", "/api/version") == (401, {
+        "message": "Unauthorized", "httpStatusCode": 401, "errorCode": 0})
+
+    assert client.get_version() == simulator.VERSION
+    gateway.expire_tokens()
+    assert client.get_version() == simulator.VERSION
+    assert gateway.stats["logins"] == 2
+
+    bad_client = ScaleIOClient.from_args("simulator", "admin", "wrong",
+        adapter=simulator.SimulatorAdapter(gateway))
+    with pytest.raises(exceptions.ScaleIOAuthError):
+        bad_client.get_version()
+
+
+def test_simulator_error_injection(gateway, client):
+
+    client.session.login()
+    gateway.fail_next(2, status=503)
+    assert client.get_version() == simulator.VERSION
+    assert gateway.stats["injected_errors"] == 2
+
+    gateway.fail_next(status=400)
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        client.get_version()
+    assert e.value.status_code == 400
+
+    gateway.error_rate = 1
+    with pytest.raises(exceptions.ScaleIOError) as e:
+        client.perform_action_on_type("Sdc", "queryAllApprovedSdc", {})
+    assert e.value.status_code == 503
+
+
+def test_simulator_server(gateway):
+
+    with simulator.SimulatorServer(gateway, compress_min_size=0) as server:
+        client = ScaleIOClient.from_args(server.address, "admin", "password", False)
+        assert len(Volume.all(client=client)) == 10
+
+        stats = client.session.transfer_stats["GET /api/types/Volume/instances"]
+        assert stats["compressed"] == 1
+        assert stats["compressed_bytes"] < stats["uncompressed_bytes"]
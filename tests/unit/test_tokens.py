@@ -0,0 +1,42 @@
+from __future__ import unicode_literals
+
+import os
+import stat
+
+import mock
+
+from pyscaleio.tokens import FileTokenStore
+
+
+def test_token_store(tmpdir):
+
+    path = str(tmpdir.join("tokens.json"))
+    store = FileTokenStore(path)
+    assert store.load("gw1", "admin") is None
+
+    with mock.patch("time.time", return_value=100):
+        store.save("gw1", "admin", "token1")
+    store.save("gw2", "admin", "token2", issued_at=200)
+
+    assert store.load("gw1", "admin") == {"token": "token1", "issued_at": 100}
+    assert store.load("gw2", "admin") == {"token": "token2", "issued_at": 200}
+    assert store.load("gw1", "other") is None
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    store.delete("gw1", "admin", "stale_token")
+    assert store.load("gw1", "admin")["token"] == "token1"
+    store.delete("gw1", "admin", "token1")
+    assert store.load("gw1", "admin") is None
+    store.delete("gw2", "admin")
+    assert store.load("gw2", "admin") is None
+
+
+def test_token_store_corrupted(tmpdir):
+
+    path = tmpdir.join("tokens.json")
+    path.write("{corrupted")
+
+    store = FileTokenStore(str(path))
+    assert store.load("gw1", "admin") is None
+    store.save("gw1", "admin", "token1")
+    assert store.load("gw1", "admin")["token"] == "token1"
@@ -0,0 +1,163 @@
+from __future__ import unicode_literals
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from six.moves import BaseHTTPServer, socketserver
+
+from pyscaleio import exceptions
+from pyscaleio import simulator
+from pyscaleio import transport
+from pyscaleio import ScaleIOClient
+from pyscaleio.client import ScaleIOSession
+
+
+@pytest.fixture
+def http_server(request):
+    """Starts HTTP server that echoes requests (and sleeps on '/slow')."""
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.startswith("/slow"):
+                time.sleep(0.5)
+            self.reply()
+
+        def do_POST(self):
+            self.reply(self.rfile.read(int(self.headers["Content-Length"])).decode())
+
+        def reply(self, data=None):
+            body = json.dumps({
+                "method": self.command,
+                "path": self.path,
+                "authorization": self.headers.get("Authorization"),
+                "data": data,
+            }).encode()
+            self.send_response(200 if "error" not in self.path else 500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass  # client of '/slow' may go away on timeout
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+
+    request.addfinalizer(stop)
+    return "http://127.0.0.1:{0}".format(server.server_port)
+
+
+@pytest.mark.parametrize("name", ["requests", "urllib3"])
+def test_transport_request(http_server, name):
+
+    http = transport.TRANSPORTS[name]()
+
+    response = http.request("get", http_server + "/api/test", params={"a": "1"},
+        auth=("admin", "token"), timeout=(1, 1))
+    response.raise_for_status()
+    assert json.loads(response.content.decode(response.encoding)) == {
+        "method": "GET",
+        "path": "/api/test?a=1",
+        "authorization": requests.auth._basic_auth_str("admin", "token"),
+        "data": None,
+    }
+
+    response = http.request("post", http_server + "/api/test", data="{\"x\": 1}", stream=True)
+    assert json.loads(b"".join(response.iter_content(3)).decode())["data"] == "{\"x\": 1}"
+    response.close()
+
+    response = http.request("get", http_server + "/api/error")
+    with pytest.raises(requests.HTTPError) as e:
+        response.raise_for_status()
+    assert e.value.response.status_code == 500
+    assert e.value.response.reason == "Internal Server Error"
+
+    assert http.stats.as_dict() == {"requests": 3, "created": 1, "reused": 2}
+    http.close()
+
+
+@pytest.mark.parametrize("name", ["requests", "urllib3"])
+def test_transport_errors(http_server, name):
+
+    http = transport.TRANSPORTS[name]()
+
+    with pytest.raises(requests.ReadTimeout):
+        http.request("get", http_server + "/slow", timeout=(1, 0.1))
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    with pytest.raises(requests.ConnectionError) as e:
+        http.request("get", "http://127.0.0.1:{0}/api/test".format(port), timeout=1)
+    assert not isinstance(e.value, requests.ConnectTimeout)
+    http.close()
+
+
+def test_stub_transport():
+
+    tokens = ["token1", "token2"]
+
+    def handler(request):
+        if request.path == "/api/login":
+            return 200, tokens.pop(0)
+        if request.auth != ("admin", "token2"):
+            return 401, {"message": "Unauthorized", "httpStatusCode": 401, "errorCode": 0}
+        if request.method == "POST":
+            return 200, {"received": request.json}
+        return 200, [{"id": "1"}], {"Content-Type": "application/json; charset=utf-8"}
+
+    stub = transport.StubTransport(handler)
+    session = ScaleIOSession("localhost", "admin", "passwd", transport=stub)
+
+    assert session.get("types/Volume/instances") == [{"id": "1"}]
+    assert session.token_stats["refreshes"] == 1
+    assert list(session.get("types/Volume/instances", stream=True)) == [{"id": "1"}]
+    assert session.post("instances/Volume::1/action/setVolumeName", "{\"name\": \"x\"}") == \
+        {"received": {"name": "x"}}
+
+    assert [(r.method, r.path) for r in stub.requests] == [
+        ("GET", "/api/login"),
+        ("GET", "/api/types/Volume/instances"),
+        ("GET", "/api/login"),
+        ("GET", "/api/types/Volume/instances"),
+        ("GET", "/api/types/Volume/instances"),
+        ("POST", "/api/instances/Volume::1/action/setVolumeName"),
+    ]
+    assert stub.requests[1].headers["Accept"] == "application/json; version=2.0"
+    assert session.pool_stats["requests"] == 6
+
+    with pytest.raises(exceptions.ScaleIONotBothParameters):
+        ScaleIOSession("localhost", "admin", "passwd", transport=stub, adapter=object())
+
+
+def test_stub_transport_simulator():
+
+    gateway = simulator.Simulator(simulator.Cluster.generate(volumes=3, sdcs=1))
+    client = ScaleIOClient.from_args("simulator", "admin", "password",
+        transport=transport.StubTransport(
+            lambda r: gateway.handle(r.method, r.url, r.json, r.auth)))
+
+    assert len(client.get_instances_of("Volume")) == 3
+    assert client.get_version() == simulator.VERSION
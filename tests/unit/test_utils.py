@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import json
+import threading
 import pytest
 
 from pyscaleio import utils
@@ -31,3 +33,59 @@ def test_bool_to_str(inputs, result):
             utils.bool_to_str(inputs)
     else:
         assert utils.bool_to_str(inputs) == result
+
+
+@pytest.mark.parametrize("payload", [
+    [],
+    [{"id": "1", "links": [{"rel": "self", "href": "/api/instances/Volume::1"}]}],
+    [{"id": str(i), "name": "vol \\ \"{0}\" ]".format(i), "size": i * 1024,
+      "enabled": True, "parent": None} for i in range(5)],
+    [1, 23, 4.5, "six", None, False, [7, [8]]],
+])
+def test_iter_json_array(payload):
+
+    data = json.dumps(payload, indent=1)
+    for size in (1, 2, 3, 7, len(data)):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        assert list(utils.iter_json_array(chunks)) == payload
+
+
+@pytest.mark.parametrize("data", [
+    "", "{}", "[{}", "[{} {}]", "[1,]", "[{\"a\": }]",
+])
+def test_iter_json_array_malformed(data):
+
+    with pytest.raises(ValueError):
+        list(utils.iter_json_array([data]))
+
+
+def test_iter_json_array_lazy():
+
+    chunks = iter(['[{"id": 1}, ', '{"id": 2}, ', "{"])
+    items = utils.iter_json_array(chunks)
+
+    assert next(items) == {"id": 1}
+    assert next(items) == {"id": 2}
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_parallel_map():
+
+    threads = set()
+
+    def function(item):
+        threads.add(threading.current_thread().name)
+        if item == 3:
+            raise ValueError(item)
+        return item, utils.get_deadline()
+
+    with utils.deadline(at=100) as at:
+        results = utils.parallel_map(function, range(5), 3)
+
+    assert [result for result, _ in results] == [(0, at), (1, at), (2, at), None, (4, at)]
+    assert isinstance(results[3][1], ValueError)
+    assert threading.current_thread().name not in threads
+    assert len(threads) <= 3
+
+    assert utils.parallel_map(function, [1], 3) == [((1, None), None)]